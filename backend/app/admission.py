@@ -0,0 +1,142 @@
+# app/admission.py
+# Admission control for research submissions.
+#
+# A submission is rejected (HTTP 429 with Retry-After, see backend/api.py) when the
+# research queue is too deep, too many runs are in flight, or the caller exceeded
+# its per-window submission rate. Redis errors fail open: admission control must
+# never be the reason the API is down.
+import logging
+import math
+import threading
+import time
+
+import redis
+from django.conf import settings
+
+from .metrics import ADMISSION_REJECTIONS
+from .queues import get_redis, in_flight_counts, queue_depths
+
+logger = logging.getLogger(__name__)
+
+RATE_KEY_PREFIX = 'admission:rate:'
+RUN_SECONDS_SAMPLE = 50
+RUN_SECONDS_CACHE_TTL = 60
+
+_run_seconds = {'value': None, 'expires': 0.0}
+_run_seconds_lock = threading.Lock()
+
+
+class AdmissionRejected(Exception):
+    """A submission was refused; ``retry_after`` is in whole seconds"""
+
+    def __init__(self, reason: str, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.reason = reason
+        self.detail = detail
+        self.retry_after = max(1, int(retry_after))
+
+
+def average_run_seconds() -> float:
+    """Mean duration of recent completed runs, cached for RUN_SECONDS_CACHE_TTL seconds"""
+    from .models import TaskStatus
+
+    with _run_seconds_lock:
+        if _run_seconds['value'] is not None and time.monotonic() < _run_seconds['expires']:
+            return _run_seconds['value']
+
+    runs = (
+        TaskStatus.objects
+        .filter(status='COMPLETED', started_at__isnull=False, completed_at__isnull=False)
+        .order_by('-id')
+        .values_list('started_at', 'completed_at')[:RUN_SECONDS_SAMPLE]
+    )
+    durations = [(completed - started).total_seconds() for started, completed in runs]
+    value = sum(durations) / len(durations) if durations else settings.ADMISSION_DEFAULT_RUN_SECONDS
+
+    with _run_seconds_lock:
+        _run_seconds.update(value=value, expires=time.monotonic() + RUN_SECONDS_CACHE_TTL)
+    return value
+
+
+def expected_wait_seconds(queued: int, in_flight: int, run_seconds: float) -> float:
+    """Time until a run submitted now starts, assuming ADMISSION_WORKER_SLOTS parallel runs"""
+    slots = max(1, settings.ADMISSION_WORKER_SLOTS)
+    ahead = queued + in_flight - slots + 1
+    if ahead <= 0:
+        return 0.0
+    return math.ceil(ahead / slots) * run_seconds
+
+
+def backlog() -> dict:
+    """Current research backlog and the wait a new submission should expect"""
+    queued = queue_depths([settings.RESEARCH_QUEUE])[settings.RESEARCH_QUEUE]
+    in_flight = sum(in_flight_counts().values())
+    run_seconds = average_run_seconds()
+    return {
+        'queued': queued,
+        'in_flight': in_flight,
+        'worker_slots': settings.ADMISSION_WORKER_SLOTS,
+        'average_run_seconds': round(run_seconds, 1),
+        'expected_wait_seconds': round(expected_wait_seconds(queued, in_flight, run_seconds), 1),
+        'accepting': queued < settings.ADMISSION_MAX_QUEUE_DEPTH and in_flight < settings.ADMISSION_MAX_IN_FLIGHT,
+    }
+
+
+def client_identity(request) -> str:
+    """User id from the bearer token, else the client address"""
+    from .auth_api import verify_token
+
+    auth_header = request.headers.get('Authorization', '')
+    if auth_header.startswith('Bearer '):
+        payload = verify_token(auth_header.split(' ', 1)[1])
+        if payload:
+            return f"user:{payload['user_id']}"
+    return f"ip:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+
+def _check_user_rate(identity: str):
+    window = settings.ADMISSION_USER_RATE_WINDOW
+    now = time.time()
+    bucket = int(now // window)
+    key = f"{RATE_KEY_PREFIX}{identity}:{bucket}"
+
+    pipe = get_redis().pipeline()
+    pipe.incr(key)
+    pipe.expire(key, window)
+    count, _ = pipe.execute()
+
+    if count > settings.ADMISSION_USER_RATE:
+        raise AdmissionRejected(
+            'user_rate',
+            f"Rate limit of {settings.ADMISSION_USER_RATE} research requests per {window}s exceeded",
+            (bucket + 1) * window - now
+        )
+
+
+def admit(request):
+    """Raise AdmissionRejected if a new research run should not be queued now"""
+    if not settings.ADMISSION_CONTROL_ENABLED:
+        return
+
+    try:
+        state = backlog()
+        if state['queued'] >= settings.ADMISSION_MAX_QUEUE_DEPTH:
+            raise AdmissionRejected(
+                'queue_depth',
+                f"Research queue is full ({state['queued']} waiting)",
+                state['expected_wait_seconds']
+            )
+        if state['in_flight'] >= settings.ADMISSION_MAX_IN_FLIGHT:
+            raise AdmissionRejected(
+                'in_flight',
+                f"Too many research runs in progress ({state['in_flight']})",
+                state['average_run_seconds']
+            )
+        # Last, so a submission refused for capacity doesn't use up the caller's quota
+        _check_user_rate(client_identity(request))
+    except AdmissionRejected as exc:
+        ADMISSION_REJECTIONS.labels(exc.reason).inc()
+        logger.warning(f"Admission rejected ({exc.reason}): {exc.detail}")
+        raise
+    except redis.RedisError as exc:
+        logger.warning(f"Admission control unavailable, admitting request: {exc}")
@@ -1,22 +1,68 @@
 # agents/supply_chain_graph.py
+# Only imported by Celery workers (lazily, from app/tasks.py). The API process
+# enqueues tasks by name and never loads langgraph/langchain/tavily.
+from functools import lru_cache
 from typing import TypedDict, List
 from pydantic import BaseModel, Field
 from langgraph.graph import StateGraph, START, END
 from langchain_google_genai import ChatGoogleGenerativeAI
 from tavily import TavilyClient
+from tavily import client as tavily_client
+from tavily.exceptions import InvalidAPIKeyError, BadRequestError, ForbiddenError
 from django.conf import settings
+import contextvars
 import os
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.utils import timezone
+from .metrics import ANALYST_ROUTES, NOVELTY_CHECKS, observe_node, record_llm_usage
+from .fingerprint import content_fingerprint, minhash, similarity
+from .articles import get_articles
+from .deadline import node_timeout
+from .http_transport import PooledRequests, attach
+from .providers import call_provider
 
 class Source(BaseModel):
     url: str = Field(description="URL of the source article")
     title: str = Field(description="Title of the source article")
 
-tavily = TavilyClient(api_key=settings.TAVILY_API_KEY)
-llm = ChatGoogleGenerativeAI(
-    model="gemini-2.5-flash",
-    temperature=0,
-    google_api_key=settings.GOOGLE_API_KEY
-)
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def get_tavily():
+    """Per-process Tavily client, built on first use; its requests go through the shared pool"""
+    # The SDK calls requests.post() for every search, which opens a new connection
+    tavily_client.requests = PooledRequests()
+    return TavilyClient(api_key=settings.TAVILY_API_KEY, timeout=settings.TAVILY_REQUEST_TIMEOUT)
+
+
+@lru_cache(maxsize=None)
+def get_llm(model: str):
+    """Per-process Gemini chat model for ``model``, built on first use"""
+    # Retries are handled by call_provider so they show up in the provider metrics
+    llm = ChatGoogleGenerativeAI(
+        model=model,
+        temperature=0,
+        google_api_key=settings.GOOGLE_API_KEY,
+        max_retries=0,
+        timeout=settings.GEMINI_REQUEST_TIMEOUT,
+        transport=settings.GEMINI_TRANSPORT
+    )
+    # The REST transport's requests session joins the shared pool
+    session = getattr(getattr(llm.client, "_transport", None), "_session", None)
+    if session is not None:
+        attach(session)
+    return llm
+
+
+@lru_cache(maxsize=None)
+def get_structured_llm(model: str):
+    """Per-process structured-output wrapper of ``model`` returning AnalystOutput"""
+    # include_raw keeps the underlying message so token usage can be recorded.
+    return get_llm(model).with_structured_output(AnalystOutput, include_raw=True)
 
 
 class AgentState(TypedDict):
@@ -27,6 +73,14 @@ class AgentState(TypedDict):
     critical_alerts: List[str]
     fragility_score: int
     risk_metrics: List[dict]
+    analyst_route: List[dict]
+    deadline: float  # epoch seconds, see app/deadline.py
+    hedge: bool
+    fingerprint: str
+    minhash: List[int]
+    novelty: dict
+    carried_over_from: int | None  # SupplyChainReport id whose analysis was reused
+    analysis_mode: dict  # single or map_reduce (with chunk counts)
 
 
 class RiskMetric(BaseModel):
@@ -44,6 +98,7 @@ class AnalystOutput(BaseModel):
 
 
 # 2. Define the Nodes
+@observe_node
 def researcher_node(state):
     """
     Step 1: Search for recent supply chain disruptions based on the industry.
@@ -54,11 +109,15 @@ def researcher_node(state):
     print(f"--- AGENT RESEARCHING: {query} ---")
 
     # We use 'advanced' search depth for high-quality C-suite data
-    search_result = tavily.search(
+    search_result = call_provider(
+        "tavily", "search", get_tavily().search,
         query=query, 
         topic="news", 
         search_depth="advanced",
-        max_results=5
+        max_results=5,
+        no_retry=(InvalidAPIKeyError, BadRequestError, ForbiddenError),
+        timeout=node_timeout(state, "researcher_node"),
+        hedge=state.get("hedge", False)
     )
 
     # Tavily returns a list of results with 'content' and 'url'
@@ -78,8 +137,120 @@ def researcher_node(state):
 
     return {"raw_data": raw_data, "sources": sources}
 
-def risk_analyst_node(state):
-    raw_text = "\n\n".join(state["raw_data"])
+@observe_node
+def article_fetcher_node(state):
+    """
+    Optional step: replace Tavily's snippets with the full article text
+    (see app/articles.py). Articles that can't be fetched in time keep their snippet.
+    """
+    sources = state.get("sources", [])
+    articles = get_articles(
+        [source["url"] for source in sources],
+        budget=node_timeout(state, "article_fetcher_node")
+    )
+
+    # raw_data and sources are built from the same search results, in order
+    raw_data = list(state.get("raw_data", []))
+    for index, source in enumerate(sources):
+        text = articles.get(source["url"])
+        if text and index < len(raw_data):
+            raw_data[index] = f"Source: {source['url']}\nContent: {text[:settings.ARTICLE_MAX_CHARS]}"
+
+    return {"raw_data": raw_data}
+
+@observe_node
+def novelty_node(state):
+    """
+    Step 2: Fingerprint the research and compare it with the industry's last report.
+    If it is (nearly) unchanged, that report's analysis is carried over and the
+    analyst is skipped (see after_novelty).
+    """
+    from .models import SupplyChainReport
+
+    sources, passages = state.get("sources", []), state.get("raw_data", [])
+    sketch = minhash(sources, passages)
+    update = {
+        "fingerprint": content_fingerprint(sources, passages),
+        "minhash": sketch,
+        "carried_over_from": None,
+    }
+    if not settings.NOVELTY_CHECK_ENABLED or not passages:
+        return update
+
+    previous = (
+        SupplyChainReport.objects
+        .filter(industry=state["industry"])
+        .select_related("carried_over_from")
+        .order_by("-created_at")
+        .first()
+    )
+    if previous is None:
+        NOVELTY_CHECKS.labels("no_previous").inc()
+        update["novelty"] = {"outcome": "no_previous"}
+        return update
+
+    score = 1.0 if previous.fingerprint == update["fingerprint"] else similarity(sketch, previous.minhash)
+    # Carry-overs point at the report that was actually analysed
+    origin = previous.carried_over_from or previous
+    if score < settings.NOVELTY_SIMILARITY_THRESHOLD:
+        outcome = "novel"
+    elif timezone.now() - origin.created_at > timedelta(days=settings.NOVELTY_MAX_AGE_DAYS):
+        outcome = "expired"
+    else:
+        outcome = "carried_over"
+
+    NOVELTY_CHECKS.labels(outcome).inc()
+    update["novelty"] = {"outcome": outcome, "similarity": round(score, 3), "previous_report_id": previous.id}
+    logger.info(f"Novelty check for {state['industry']}: {update['novelty']}")
+
+    if outcome == "carried_over":
+        update.update({
+            "carried_over_from": origin.id,
+            "risk_report": origin.executive_summary,
+            "critical_alerts": origin.critical_alerts,
+            "fragility_score": origin.fragility_score,
+            "risk_metrics": origin.risk_metrics,
+            "sources": origin.sources,
+        })
+    return update
+
+def after_novelty(state):
+    # A carried-over analysis was already synthesized
+    return "carried_over" if state.get("carried_over_from") else "novel"
+
+def route_analyst_model(raw_data, raw_text, chunked=False):
+    """
+    Pick the starting tier of ANALYST_MODEL_CASCADE for this input.
+    Low-signal inputs (few sources) always start on the first, cheapest tier;
+    otherwise the first tier whose max_input_chars fits the input is used.
+    Map-reduce chunks are routed by size only: a chunk of one or two long
+    sources is a slice of a large input, not a low-signal one.
+    Returns (tier index, reason).
+    """
+    cascade = settings.ANALYST_MODEL_CASCADE
+    if not chunked and len(raw_data) <= settings.ANALYST_LOW_SIGNAL_SOURCES:
+        return 0, "low_signal"
+    for index, tier in enumerate(cascade):
+        limit = tier.get("max_input_chars")
+        if limit is None or len(raw_text) <= limit:
+            return index, "size"
+    return len(cascade) - 1, "size"
+
+def invoke_analyst(model, messages, timeout=None, hedge=False):
+    """Structured-output call to ``model``; returns LangChain's include_raw dict"""
+    # We use .with_structured_output to force the LLM to use our Pydantic model.
+    structured_llm = get_structured_llm(model)
+
+    result = call_provider("gemini", model, structured_llm.invoke, messages, timeout=timeout, hedge=hedge)
+    record_llm_usage(model, getattr(result["raw"], "usage_metadata", None))
+    return result
+
+def analyze(state, raw_data, chunk=None):
+    """
+    Run the analyst model cascade over ``raw_data``.
+    Returns (AnalystOutput, route entries).
+    """
+    raw_text = "\n\n".join(raw_data)
     industry = state["industry"]
     
     # The System Prompt defines the persona
@@ -94,13 +265,105 @@ def risk_analyst_node(state):
     4. Provide a punchy Executive Summary.
     """
 
-    # We use .with_structured_output to force the LLM to use our Pydantic model
-    structured_llm = llm.with_structured_output(AnalystOutput)
-
-    analysis = structured_llm.invoke([
+    messages = [
         ("system", system_prompt),
         ("human", f"Data: {raw_text}")
-    ])
+    ]
+
+    cascade = settings.ANALYST_MODEL_CASCADE
+    tier, reason = route_analyst_model(raw_data, raw_text, chunked=chunk is not None)
+    route = []
+
+    # Escalate to the next tier whenever structured-output parsing fails
+    while True:
+        model = cascade[tier]["model"]
+        start = time.perf_counter()
+        # Recomputed per attempt so an escalation only gets what is left
+        timeout = node_timeout(state, "risk_analyst_node")
+        result = invoke_analyst(model, messages, timeout=timeout, hedge=state.get("hedge", False))
+        analysis = result["parsed"]
+
+        ANALYST_ROUTES.labels(model=model, reason=reason).inc()
+        route.append({
+            "model": model,
+            "reason": reason,
+            "input_chars": len(raw_text),
+            "latency": round(time.perf_counter() - start, 3),
+            "outcome": "ok" if analysis is not None else "parse_error",
+        })
+        if chunk is not None:
+            route[-1]["chunk"] = chunk
+        logger.info(f"Analyst route for {industry}: {route[-1]}")
+
+        if analysis is not None:
+            return analysis, route
+        if tier == len(cascade) - 1:
+            raise result["parsing_error"] or ValueError("Analyst returned no structured output")
+        tier, reason = tier + 1, "escalation"
+
+def chunk_sources(raw_data, max_chars):
+    """Consecutive groups of sources of at most ``max_chars`` (an oversized source is its own chunk)"""
+    chunks, current, size = [], [], 0
+    for item in raw_data:
+        if current and size + len(item) > max_chars:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += len(item)
+    if current:
+        chunks.append(current)
+    return chunks
+
+def reduce_analyses(partials, fallback_sources):
+    """
+    Merge partial analyses (AnalystOutput, number of sources) into one result.
+    Metrics, alerts and sources are de-duplicated, and the fragility score is the
+    source-weighted mean, but never more than one point below the worst chunk
+    so a severe finding in one chunk isn't averaged away.
+    """
+    weights = sum(count for _, count in partials)
+    mean = sum(analysis.fragility_score * count for analysis, count in partials) / weights
+    worst = max(analysis.fragility_score for analysis, _ in partials)
+    fragility = max(1, min(10, max(round(mean), worst - 1)))
+
+    # The same risk reported by several chunks keeps its highest impact
+    metrics = {}
+    for analysis, _ in partials:
+        for metric in analysis.risk_metrics:
+            key = (metric.category.strip().lower(), " ".join(metric.description.lower().split()))
+            if key not in metrics or metric.impact_score > metrics[key]["impact_score"]:
+                metrics[key] = metric.dict()
+    metrics = sorted(metrics.values(), key=lambda metric: metric["impact_score"], reverse=True)
+
+    alerts = list(dict.fromkeys(
+        alert for analysis, _ in partials for alert in analysis.critical_alerts
+    ))
+
+    sources = {}
+    for analysis, _ in partials:
+        for source in analysis.sources or []:
+            sources.setdefault(source.url, source.dict())
+
+    # Most severe chunk first
+    ordered = sorted(partials, key=lambda partial: partial[0].fragility_score, reverse=True)
+    return {
+        "risk_report": "\n\n".join(analysis.executive_summary for analysis, _ in ordered),
+        "critical_alerts": alerts,
+        "fragility_score": fragility,
+        "risk_metrics": metrics,
+        "sources": list(sources.values()) or fallback_sources,
+    }
+
+@observe_node
+def risk_analyst_node(state):
+    raw_data = state["raw_data"]
+    raw_chars = sum(len(item) for item in raw_data)
+
+    # Large source sets are analysed as parallel chunks and merged (map-reduce)
+    if raw_chars > settings.ANALYST_MAP_REDUCE_THRESHOLD_CHARS and len(raw_data) > 1:
+        return map_reduce_analysis(state, raw_data)
+
+    analysis, route = analyze(state, raw_data)
 
     # Return the structured data to update the State
     return {
@@ -108,9 +371,44 @@ def risk_analyst_node(state):
         "critical_alerts": analysis.critical_alerts,
         "fragility_score": analysis.fragility_score,
         "risk_metrics": [m.dict() for m in analysis.risk_metrics], # Format for JSON/Django
-        "sources": [s.dict() for s in analysis.sources] if analysis.sources else state.get("sources", [])
+        "sources": [s.dict() for s in analysis.sources] if analysis.sources else state.get("sources", []),
+        "analyst_route": route,
+        "analysis_mode": {"mode": "single"}
     }
 
+def map_reduce_analysis(state, raw_data):
+    """Analyse chunks of ``raw_data`` concurrently and merge them; failed chunks are dropped"""
+    chunks = chunk_sources(raw_data, settings.ANALYST_CHUNK_CHARS)
+    partials, route, errors = [], [], []
+
+    with ThreadPoolExecutor(max_workers=min(len(chunks), settings.ANALYST_MAP_CONCURRENCY)) as executor:
+        # Each chunk runs in a copy of this context, so profiling and query stats follow it
+        futures = [
+            executor.submit(contextvars.copy_context().run, analyze, state, chunk, index)
+            for index, chunk in enumerate(chunks)
+        ]
+        for index, future in enumerate(futures):
+            try:
+                analysis, chunk_route = future.result()
+            except Exception as exc:
+                logger.warning(f"Analyst chunk {index + 1}/{len(chunks)} failed: {exc!r}")
+                errors.append(exc)
+                route.append({"chunk": index, "outcome": "error", "error": type(exc).__name__})
+                continue
+            partials.append((analysis, len(chunks[index])))
+            route.extend(chunk_route)
+
+    if not partials:
+        raise errors[0]
+
+    logger.info(f"Map-reduce analysis: {len(partials)}/{len(chunks)} chunks for {state['industry']}")
+    return {
+        **reduce_analyses(partials, state.get("sources", [])),
+        "analyst_route": route,
+        "analysis_mode": {"mode": "map_reduce", "chunks": len(chunks), "failed_chunks": len(errors)},
+    }
+
+@observe_node
 def synthesizer_node(state):
     """
     Final polish: De-duplicate alerts and ensure formatting is consistent.
@@ -126,14 +424,27 @@ def synthesizer_node(state):
     return {"critical_alerts": alerts}
 
 # 3. Build the Graph
-workflow = StateGraph(AgentState)
-workflow.add_node("researcher", researcher_node)
-workflow.add_node("analyst", risk_analyst_node)
-workflow.add_node("synthesizer", synthesizer_node)
+def build_workflow():
+    workflow = StateGraph(AgentState)
+    workflow.add_node("researcher", researcher_node)
+    workflow.add_node("novelty_check", novelty_node)
+    workflow.add_node("analyst", risk_analyst_node)
+    workflow.add_node("synthesizer", synthesizer_node)
+
+    workflow.add_edge(START, "researcher")
+    if settings.ARTICLE_FETCH_ENABLED:
+        workflow.add_node("article_fetcher", article_fetcher_node)
+        workflow.add_edge("researcher", "article_fetcher")
+        workflow.add_edge("article_fetcher", "novelty_check")
+    else:
+        workflow.add_edge("researcher", "novelty_check")
+    workflow.add_conditional_edges("novelty_check", after_novelty, {"novel": "analyst", "carried_over": END})
+    workflow.add_edge("analyst", "synthesizer")
+    workflow.add_edge("synthesizer", END)
+    return workflow
 
-workflow.add_edge(START, "researcher")
-workflow.add_edge("researcher", "analyst")
-workflow.add_edge("analyst", "synthesizer")
-workflow.add_edge("synthesizer", END)
 
-supply_chain_app = workflow.compile()
\ No newline at end of file
+@lru_cache(maxsize=1)
+def get_supply_chain_app():
+    """Compiled graph, built once per worker process on first use"""
+    return build_workflow().compile()
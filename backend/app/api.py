@@ -1,11 +1,23 @@
 # app/api.py
+import time
 import uuid
 from typing import List
+from asgiref.sync import sync_to_async
 from ninja import Router, Schema
-from django.shortcuts import get_object_or_404
+from ninja.errors import HttpError
+from redis import RedisError
+from datetime import datetime, timedelta, timezone as dt_timezone
+from django.db.models import Avg, Count, Max, OuterRef, Q, Subquery
+from django.http import HttpResponse
+from django.shortcuts import aget_object_or_404, get_object_or_404
 from django.utils import timezone
-from .models import TaskStatus, SupplyChainReport
-from .tasks import run_research_task, setup_scheduled_research
+from .models import TaskStatus, SupplyChainReport, TaskProfile, RiskMetric
+from .profiling import load_pstats_bytes, should_profile
+from .state_store import OVERRIDABLE_STATUSES, apply_live_state, get_state_store
+from .dispatch import enqueue_research, enqueue_scheduled_research
+from .admission import admit, backlog
+from .db_router import primary_reads, replica_reads, stick_to_primary
+from .retention import read_archived_report, tasks_pruned_at
 
 # We use a Router so this can be plugged into backend/api.py
 router = Router()
@@ -13,6 +25,7 @@ router = Router()
 # --- INPUT SCHEMAS ---
 class ResearchRequest(Schema):
     industry: str
+    profile: bool = False
 
 class CancelTaskRequest(Schema):
     reason: str = "User requested cancellation"
@@ -30,6 +43,12 @@ class TaskStatusSchema(Schema):
     error_message: str | None = None
     duration: float | None = None
 
+class TaskDeltaSchema(Schema):
+    tasks: List[TaskStatusSchema]
+    cursor: str
+    # True when ``tasks`` is the complete list rather than the changes
+    reset: bool = False
+
 class RiskMetricSchema(Schema):
     category: str
     impact_score: int
@@ -49,6 +68,52 @@ class ReportSchema(Schema):
     sources: List[SourceSchema]
     created_at: str
     task_id: str = None
+    carried_over: bool = False
+    carried_over_from: int | None = None
+    # Archived reports keep their sources only in the retention archive (see app/retention.py);
+    # the task report endpoint reads them back from there
+    archived: bool = False
+
+class TaskProfileSchema(Schema):
+    task_id: str
+    profiler: str
+    wall_time: float
+    created_at: str
+    summary: dict
+
+class RiskMetricRecordSchema(Schema):
+    id: int
+    report_id: int
+    industry: str
+    category: str
+    impact_score: int
+    description: str
+    created_at: str
+
+class RiskCategorySummarySchema(Schema):
+    category: str
+    metric_count: int
+    report_count: int
+    avg_impact: float
+    max_impact: int
+
+class IndustrySummarySchema(Schema):
+    industry: str
+    report_id: int
+    task_id: str | None = None
+    fragility_score: int
+    previous_fragility_score: int | None = None
+    delta: int | None = None
+    alert_count: int
+    created_at: str
+
+class BacklogSchema(Schema):
+    queued: int
+    in_flight: int
+    worker_slots: int
+    average_run_seconds: float
+    expected_wait_seconds: float
+    accepting: bool
 
 class TaskResponse(Schema):
     task: TaskStatusSchema
@@ -61,7 +126,10 @@ def submit_research_request(request, data: ResearchRequest):
     """
     Submit a new research request asynchronously.
     Returns a task status that can be polled for completion.
+    Responds 429 with Retry-After when the backlog or the caller's rate is over its limit.
     """
+    admit(request)
+    
     # Generate unique task ID
     task_id = str(uuid.uuid4())
     
@@ -70,11 +138,14 @@ def submit_research_request(request, data: ResearchRequest):
         task_id=task_id,
         task_type='MANUAL',
         industry=data.industry,
-        status='PENDING'
+        status='PENDING',
+        profile_requested=should_profile(data.profile)
     )
+    # The client's next polls must see this row even if the replicas lag
+    stick_to_primary(request)
     
     # Queue the research task
-    run_research_task.delay(task_id, data.industry)
+    enqueue_research(task_id, data.industry)
     
     return TaskStatusSchema(
         task_id=str(task_status.task_id),
@@ -89,12 +160,26 @@ def submit_research_request(request, data: ResearchRequest):
         duration=task_status.duration
     )
 
+@router.get("/research/backlog/", response=BacklogSchema)
+@replica_reads
+def get_research_backlog(request):
+    """
+    Current research backlog and the expected wait before a new request starts.
+    """
+    try:
+        return BacklogSchema(**backlog())
+    except RedisError:
+        raise HttpError(503, "Backlog is unavailable")
+
 @router.get("/research/requests/{task_id}/status", response=TaskStatusSchema)
-def get_task_status(request, task_id: str):
+@replica_reads
+async def get_task_status(request, task_id: str):
     """
     Get the status of a research task.
     """
-    task_status = get_object_or_404(TaskStatus, task_id=task_id)
+    task_status = await aget_object_or_404(TaskStatus, task_id=task_id)
+    # In-flight progress is served from the live state store, not the database
+    apply_live_state(task_status, await get_state_store().aget(task_id))
     
     return TaskStatusSchema(
         task_id=str(task_status.task_id),
@@ -110,22 +195,29 @@ def get_task_status(request, task_id: str):
     )
 
 @router.get("/research/requests/{task_id}/report", response=ReportSchema)
-def get_task_report(request, task_id: str):
+@replica_reads
+async def get_task_report(request, task_id: str):
     """
     Get the completed research report for a task.
     Only returns data if the task is completed successfully.
     """
-    task_status = get_object_or_404(TaskStatus, task_id=task_id)
+    # select_related so the report is loaded in the same (async) query
+    task_status = await aget_object_or_404(
+        TaskStatus.objects.select_related('report'), task_id=task_id
+    )
     
     if task_status.status != 'COMPLETED':
-        from ninja import HttpError
         raise HttpError(400, "Task is not completed yet")
     
     if not task_status.report:
-        from ninja import HttpError
         raise HttpError(404, "Report not found for this task")
     
     report = task_status.report
+    sources = report.sources
+    if report.archived:
+        # Sources were moved to the retention archive; the file is read off the event loop
+        record = await sync_to_async(read_archived_report, thread_sensitive=False)(report)
+        sources = record['sources'] if record else []
     
     return ReportSchema(
         id=report.id,
@@ -134,25 +226,46 @@ def get_task_report(request, task_id: str):
         executive_summary=report.executive_summary,
         critical_alerts=report.critical_alerts,
         risk_metrics=report.risk_metrics,
-        sources=report.sources,
+        sources=sources,
         created_at=report.created_at.isoformat(),
-        task_id=task_id
+        task_id=task_id,
+        carried_over=report.carried_over,
+        carried_over_from=report.carried_over_from_id,
+        archived=report.archived
     )
 
-@router.get("/research/requests/", response=List[TaskStatusSchema])
-def list_tasks(request, status: str = None, limit: int = 50):
+@router.get("/research/requests/{task_id}/profile", response=TaskProfileSchema)
+@replica_reads
+def get_task_profile(request, task_id: str, raw: bool = False):
     """
-    List research tasks with optional status filter and limit.
+    Get the profiler capture for a task submitted with profile=true (or sampled).
+    Pass raw=true to download the pstats file for snakeviz / pstats.Stats.
     """
-    queryset = TaskStatus.objects.all().order_by('-created_at')
+    profile = get_object_or_404(TaskProfile, task_status__task_id=task_id)
     
-    if status:
-        queryset = queryset.filter(status=status)
+    if raw:
+        response = HttpResponse(load_pstats_bytes(profile), content_type='application/octet-stream')
+        response['Content-Disposition'] = f'attachment; filename="task-{task_id}.pstats"'
+        return response
     
-    queryset = queryset[:limit]
+    return TaskProfileSchema(
+        task_id=task_id,
+        profiler=profile.profiler,
+        wall_time=profile.wall_time,
+        created_at=profile.created_at.isoformat(),
+        summary=profile.summary
+    )
+
+# The next cursor lags the read by this much, so rows committed a little after
+# their updated_at (or stamped by a host with a skewed clock) are not skipped
+CURSOR_OVERLAP_SECONDS = 5
+
+async def _task_schemas(rows) -> List[TaskStatusSchema]:
+    live_states = await get_state_store().aget_many([row.task_id for row in rows])
     
     tasks = []
-    for task_status in queryset:
+    for task_status in rows:
+        apply_live_state(task_status, live_states.get(str(task_status.task_id)))
         tasks.append(TaskStatusSchema(
             task_id=str(task_status.task_id),
             task_type=task_status.task_type,
@@ -165,18 +278,84 @@ def list_tasks(request, status: str = None, limit: int = 50):
             error_message=task_status.error_message,
             duration=task_status.duration
         ))
-    
     return tasks
 
+async def _task_list(status: str | None, limit: int) -> List[TaskStatusSchema]:
+    queryset = TaskStatus.objects.all().order_by('-created_at')
+    
+    if status:
+        # Live state can move tasks into or out of a status before it is flushed
+        live = await get_state_store().aall_active()
+        entering = [tid for tid, state in live.items() if state.get('status') == status]
+        leaving = [tid for tid, state in live.items() if state.get('status') != status]
+        queryset = queryset.filter(
+            Q(status=status) | Q(task_id__in=entering, status__in=OVERRIDABLE_STATUSES)
+        ).exclude(task_id__in=leaving, status__in=OVERRIDABLE_STATUSES)
+    
+    return await _task_schemas([task_status async for task_status in queryset[:limit]])
+
+async def _pruned_after(since_ts: float) -> bool:
+    """Whether retention deleted tasks after the cursor; deletions are not in the delta"""
+    try:
+        pruned_at = await sync_to_async(tasks_pruned_at, thread_sensitive=False)()
+    except RedisError:
+        # Unknown: the full list is always right
+        return True
+    return pruned_at is not None and pruned_at > since_ts
+
+async def _task_changes(since: str, status: str | None, limit: int) -> TaskDeltaSchema:
+    try:
+        since_ts = float(since or 0)
+        since_at = datetime.fromtimestamp(since_ts, tz=dt_timezone.utc)
+    except (ValueError, OverflowError, OSError):
+        raise HttpError(400, "Invalid cursor")
+    # Taken before reading, so anything written during the read is in the next delta
+    cursor = f"{time.time() - CURSOR_OVERLAP_SECONDS:.6f}"
+    
+    if not since_ts or await _pruned_after(since_ts):
+        return TaskDeltaSchema(tasks=await _task_list(status, limit), cursor=cursor, reset=True)
+    
+    # In-flight progress lives in the state store and only reaches updated_at on flush
+    live = await get_state_store().achanged_since(since_ts)
+    changed = TaskStatus.objects.filter(
+        Q(updated_at__gt=since_at) | Q(task_id__in=list(live))
+    ).order_by('-created_at')
+    rows = [task_status async for task_status in changed[:limit + 1]]
+    
+    if len(rows) > limit:
+        # More changed than the client shows: cheaper to send the list again
+        return TaskDeltaSchema(tasks=await _task_list(status, limit), cursor=cursor, reset=True)
+    return TaskDeltaSchema(tasks=await _task_schemas(rows), cursor=cursor)
+
+@router.get("/research/requests/", response=List[TaskStatusSchema] | TaskDeltaSchema)
+@replica_reads
+async def list_tasks(request, status: str = None, limit: int = 50, since: str = None):
+    """
+    List research tasks with optional status filter and limit.
+    
+    With ``since`` (the cursor of the previous response, or 0 on the first
+    call) only the tasks changed after the cursor are returned, whatever
+    their status, so clients can drop tasks that left their filter.
+    ``reset`` marks a response that holds the complete list instead; it is
+    also sent when the retention prune deleted tasks after the cursor.
+    """
+    if since is not None:
+        # The cursor comes from this host's clock: a replica lagging by more than
+        # CURSOR_OVERLAP_SECONDS would lose changes for good, so deltas read the primary
+        with primary_reads():
+            return await _task_changes(since, status, limit)
+    return await _task_list(status, limit)
+
 @router.delete("/research/requests/{task_id}/")
 def cancel_task(request, task_id: str, data: CancelTaskRequest = None):
     """
     Cancel a pending or processing task.
     """
     task_status = get_object_or_404(TaskStatus, task_id=task_id)
+    store = get_state_store()
+    apply_live_state(task_status, store.get(task_id))
     
     if task_status.is_completed:
-        from ninja import HttpError
         raise HttpError(400, "Cannot cancel a completed task")
     
     # Update task status to cancelled
@@ -184,6 +363,8 @@ def cancel_task(request, task_id: str, data: CancelTaskRequest = None):
     task_status.completed_at = timezone.now()
     task_status.error_message = data.reason if data else "Cancelled by user"
     task_status.save()
+    store.delete(task_id)
+    stick_to_primary(request)
     
     # Note: We don't revoke the Celery task here as it's more complex
     # The task will continue running but the result will be ignored
@@ -196,13 +377,126 @@ def trigger_scheduled_research(request):
     Manually trigger the scheduled research task setup.
     This will create research tasks for industries that don't have recent reports.
     """
-    result = setup_scheduled_research.delay()
+    result = enqueue_scheduled_research()
     
     return {
         "message": "Scheduled research setup triggered",
         "task_id": result.id
     }
 
+@router.get("/risks/metrics/", response=List[RiskMetricRecordSchema])
+@replica_reads
+async def list_risk_metrics(
+    request,
+    category: str = None,
+    industry: str = None,
+    min_impact: int = None,
+    days: int = 30,
+    limit: int = 20
+):
+    """
+    List individual risk metrics across reports, highest impact first.
+    e.g. ?category=Geopolitical&min_impact=8&days=30&limit=20
+    """
+    queryset = RiskMetric.objects.filter(
+        created_at__gte=timezone.now() - timedelta(days=days)
+    ).order_by('-impact_score', '-created_at')
+    
+    if category:
+        queryset = queryset.filter(category=category)
+    if industry:
+        queryset = queryset.filter(industry=industry)
+    if min_impact is not None:
+        queryset = queryset.filter(impact_score__gte=min_impact)
+    
+    return [
+        RiskMetricRecordSchema(
+            id=metric.id,
+            report_id=metric.report_id,
+            industry=metric.industry,
+            category=metric.category,
+            impact_score=metric.impact_score,
+            description=metric.description,
+            created_at=metric.created_at.isoformat()
+        )
+        async for metric in queryset[:limit]
+    ]
+
+@router.get("/risks/categories/", response=List[RiskCategorySummarySchema])
+@replica_reads
+async def summarize_risk_categories(request, industry: str = None, days: int = 30):
+    """
+    Per-category risk summary over the last ``days`` days, most frequent first.
+    """
+    queryset = RiskMetric.objects.filter(created_at__gte=timezone.now() - timedelta(days=days))
+    
+    if industry:
+        queryset = queryset.filter(industry=industry)
+    
+    summary = queryset.values('category').annotate(
+        metric_count=Count('id'),
+        report_count=Count('report', distinct=True),
+        avg_impact=Avg('impact_score'),
+        max_impact=Max('impact_score')
+    ).order_by('-metric_count', 'category')
+    
+    return [
+        RiskCategorySummarySchema(
+            category=row['category'],
+            metric_count=row['metric_count'],
+            report_count=row['report_count'],
+            avg_impact=round(row['avg_impact'], 2),
+            max_impact=row['max_impact']
+        )
+        async for row in summary
+    ]
+
+def _latest_reports_per_industry():
+    """
+    Latest report of every industry with the previous run's score, as one query.
+    Both the latest row and its predecessor are picked by correlated subqueries
+    that the (industry, created_at) index serves, so only those rows are read.
+    """
+    per_industry = SupplyChainReport.objects.filter(industry=OuterRef('industry')).order_by('-created_at')
+    # The aggregate turns this into GROUP BY industry, so the latest-id subquery runs once per industry
+    latest_ids = (
+        SupplyChainReport.objects
+        .order_by()
+        .values('industry')
+        .annotate(latest_at=Max('created_at'))
+        .annotate(latest_id=Subquery(per_industry.values('id')[:1]))
+        .values('latest_id')
+    )
+
+    return SupplyChainReport.objects.filter(id__in=latest_ids).annotate(
+        previous_fragility_score=Subquery(per_industry.values('fragility_score')[1:2])
+    ).order_by('industry').values(
+        'id', 'industry', 'fragility_score', 'previous_fragility_score',
+        'critical_alerts', 'created_at', 'task_status__task_id'
+    )
+
+@router.get("/reports/latest/", response=List[IndustrySummarySchema])
+@replica_reads
+async def latest_reports_summary(request):
+    """
+    Headline fields of the latest report for every industry, for the dashboard.
+    """
+    summaries = []
+    async for row in _latest_reports_per_industry():
+        previous = row['previous_fragility_score']
+        summaries.append(IndustrySummarySchema(
+            industry=row['industry'],
+            report_id=row['id'],
+            task_id=str(row['task_status__task_id']) if row['task_status__task_id'] else None,
+            fragility_score=row['fragility_score'],
+            previous_fragility_score=previous,
+            delta=row['fragility_score'] - previous if previous is not None else None,
+            alert_count=len(row['critical_alerts']),
+            created_at=row['created_at'].isoformat()
+        ))
+    
+    return summaries
+
 # Keep the old endpoints for backward compatibility (but mark as deprecated)
 @router.post("/run-research", response=ReportSchema)
 def trigger_research_legacy(request, data: ResearchRequest):
@@ -210,7 +504,6 @@ def trigger_research_legacy(request, data: ResearchRequest):
     LEGACY: This endpoint is deprecated. Use /research/requests/ instead.
     This creates a task and waits for completion (not recommended for production).
     """
-    from ninja import HttpError
     raise HttpError(410, "This endpoint is deprecated. Use /research/requests/ for async processing.")
 
 @router.get("/reports", response=List[ReportSchema])
@@ -219,7 +512,6 @@ def list_reports_legacy(request):
     LEGACY: This endpoint is deprecated. Use /research/requests/ instead.
     Returns all previous research reports for the dashboard history.
     """
-    from ninja import HttpError
     raise HttpError(410, "This endpoint is deprecated. Use /research/requests/ for task management.")
 
 @router.get("/reports/{report_id}", response=ReportSchema)
@@ -228,5 +520,4 @@ def get_report_legacy(request, report_id: int):
     LEGACY: This endpoint is deprecated. Use /research/requests/{task_id}/report instead.
     Fetches a single specific report by ID.
     """
-    from ninja import HttpError
     raise HttpError(410, "This endpoint is deprecated. Use /research/requests/{task_id}/report instead.")
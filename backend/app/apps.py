@@ -3,3 +3,8 @@ from django.apps import AppConfig
 
 class AppConfig(AppConfig):
     name = 'app'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from .query_stats import install
+        connection_created.connect(install, dispatch_uid='app.query_stats.install')
@@ -0,0 +1,293 @@
+# app/articles.py
+# Full-article fetching for the optional article_fetcher graph stage.
+#
+# Article URLs are fetched concurrently (ARTICLE_FETCH_CONCURRENCY overall,
+# ARTICLE_FETCH_PER_HOST per host), the main text is extracted with the stdlib
+# HTML parser and stored zlib-compressed in ArticleContent, keyed by the sha256
+# of the text. Article maps each normalized URL to its content, so a URL fetched
+# for any earlier report is served from the database instead of the network.
+# Downloads use their own connection pool: the many one-off article hosts would
+# otherwise evict the provider connections kept in app/http_transport.py.
+import codecs
+import hashlib
+import logging
+import re
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor, wait
+from functools import lru_cache
+from html.parser import HTMLParser
+from urllib.parse import urlsplit, urlunsplit
+
+import requests
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from requests.adapters import HTTPAdapter
+from requests.compat import chardet
+
+from .metrics import ARTICLE_FETCHES
+
+logger = logging.getLogger(__name__)
+
+USER_AGENT = 'SupplyChainResearchAgent/1.0 (+article fetcher)'
+HTML_TYPES = ('text/html', 'application/xhtml+xml')
+
+# Boilerplate containers whose text is never article content
+SKIP_TAGS = {'title', 'script', 'style', 'noscript', 'template', 'svg', 'nav', 'header', 'footer', 'aside', 'form', 'button', 'iframe'}
+# Containers that usually hold the article itself
+MAIN_TAGS = {'article', 'main'}
+BLOCK_TAGS = {'p', 'div', 'section', 'article', 'main', 'li', 'br', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'blockquote', 'pre', 'tr'}
+VOID_TAGS = {'br', 'img', 'hr', 'input', 'meta', 'link', 'source', 'wbr', 'area', 'base', 'col', 'embed', 'param', 'track'}
+# Blocks shorter than this are usually menus, bylines or share buttons
+MIN_BLOCK_CHARS = 40
+
+_WHITESPACE = re.compile(r'\s+')
+
+
+class _TextExtractor(HTMLParser):
+    """Collects text blocks, remembering which ones were inside <article>/<main>"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.blocks = []  # (text, in_main)
+        self._current = []
+        self._skip_depth = 0
+        self._main_depth = 0
+
+    def _flush(self):
+        text = _WHITESPACE.sub(' ', ''.join(self._current)).strip()
+        if text:
+            self.blocks.append((text, self._main_depth > 0))
+        self._current = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in VOID_TAGS:
+            if tag == 'br':
+                self._current.append(' ')
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main_depth += 1
+
+    def handle_endtag(self, tag):
+        if tag in VOID_TAGS:
+            return
+        if tag in SKIP_TAGS:
+            self._skip_depth = max(0, self._skip_depth - 1)
+        if tag in BLOCK_TAGS:
+            self._flush()
+        if tag in MAIN_TAGS:
+            self._main_depth = max(0, self._main_depth - 1)
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self._current.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+def extract_text(html: str) -> str:
+    """
+    Main text of an HTML page: the blocks inside <article>/<main> when there are
+    any, otherwise every block of at least MIN_BLOCK_CHARS characters.
+    """
+    parser = _TextExtractor()
+    parser.feed(html)
+    parser.close()
+
+    main = [text for text, in_main in parser.blocks if in_main]
+    blocks = main if sum(len(text) for text in main) >= MIN_BLOCK_CHARS else [
+        text for text, _ in parser.blocks if len(text) >= MIN_BLOCK_CHARS
+    ]
+    return '\n\n'.join(blocks)
+
+
+def normalize_url(url: str) -> str:
+    """Lowercased scheme/host, no fragment, no trailing slash on the path"""
+    parts = urlsplit(url.strip())
+    path = parts.path.rstrip('/') or '/'
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, parts.query, ''))
+
+
+def url_hash(url: str) -> str:
+    return hashlib.sha256(normalize_url(url).encode()).hexdigest()
+
+
+def compress(text: str) -> bytes:
+    return zlib.compress(text.encode('utf-8'), 6)
+
+
+def decompress(data) -> str:
+    return zlib.decompress(bytes(data)).decode('utf-8')
+
+
+@lru_cache(maxsize=1)
+def get_article_session() -> requests.Session:
+    """Process-wide session for article downloads, separate from the provider pool"""
+    adapter = HTTPAdapter(
+        pool_connections=settings.ARTICLE_FETCH_CONCURRENCY,
+        pool_maxsize=settings.ARTICLE_FETCH_PER_HOST,
+        max_retries=0,
+    )
+    session = requests.Session()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+_META_CHARSET = re.compile(rb"""<meta[^>]+charset\s*=\s*["']?([\w.:-]+)""", re.IGNORECASE)
+
+
+def _charset(response, body: bytes) -> str:
+    """
+    Charset of an HTML body: the Content-Type charset, else a <meta charset>,
+    else UTF-8 if the body is valid UTF-8, else a detected one. requests assumes
+    ISO-8859-1 for text/* without a charset, which garbles UTF-8 pages.
+    """
+    content_type = response.headers.get('Content-Type', '')
+    if 'charset' in content_type.lower() and response.encoding:
+        return response.encoding
+    match = _META_CHARSET.search(body[:4096])
+    if match:
+        return match.group(1).decode('ascii')
+    try:
+        # Not final: the body may be cut off in the middle of a character
+        codecs.getincrementaldecoder('utf-8')().decode(body, final=False)
+        return 'utf-8'
+    except UnicodeDecodeError:
+        return chardet.detect(body)['encoding'] or 'utf-8'
+
+
+def _download(url: str, timeout: float) -> str | None:
+    """Article HTML for ``url`` (None if it is not an HTML page), capped at ARTICLE_MAX_BYTES"""
+    response = get_article_session().get(
+        url, timeout=timeout, stream=True, headers={'User-Agent': USER_AGENT}
+    )
+    with response:
+        response.raise_for_status()
+        content_type = response.headers.get('Content-Type', '').split(';')[0].strip().lower()
+        if content_type and content_type not in HTML_TYPES:
+            return None
+        body = bytearray()
+        for chunk in response.iter_content(64 * 1024):
+            body.extend(chunk)
+            if len(body) >= settings.ARTICLE_MAX_BYTES:
+                break
+        body = bytes(body[:settings.ARTICLE_MAX_BYTES])
+        return body.decode(_charset(response, body), errors='replace')
+
+
+class ArticleFetcher:
+    """Concurrent fetcher with per-host limits; network and parsing only, no database access"""
+
+    def __init__(self, concurrency=None, per_host=None, timeout=None):
+        self.concurrency = concurrency or settings.ARTICLE_FETCH_CONCURRENCY
+        self.per_host = per_host or settings.ARTICLE_FETCH_PER_HOST
+        self.timeout = timeout or settings.ARTICLE_FETCH_TIMEOUT
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    def _host_slots(self, url):
+        host = urlsplit(url).netloc.lower()
+        with self._lock:
+            if host not in self._hosts:
+                self._hosts[host] = threading.BoundedSemaphore(self.per_host)
+            return self._hosts[host]
+
+    def _fetch_one(self, url):
+        with self._host_slots(url):
+            html = _download(url, self.timeout)
+        return extract_text(html) if html else ''
+
+    def fetch(self, urls, budget: float | None = None) -> dict:
+        """
+        Map of url -> extracted text for the URLs fetched within ``budget`` seconds.
+        Failed, non-HTML and empty pages are left out.
+        """
+        results = {}
+        executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix='article-fetch')
+        try:
+            futures = {executor.submit(self._fetch_one, url): url for url in urls}
+            done, pending = wait(futures, timeout=budget)
+            for future in done:
+                url = futures[future]
+                try:
+                    text = future.result()
+                except Exception as exc:
+                    # Network errors, but also unknown encodings or parser failures on odd pages
+                    ARTICLE_FETCHES.labels('error').inc()
+                    logger.info(f"Article fetch failed for {url}: {exc!r}")
+                    continue
+                if text:
+                    ARTICLE_FETCHES.labels('fetched').inc()
+                    results[url] = text
+                else:
+                    ARTICLE_FETCHES.labels('error').inc()
+            for future in pending:
+                future.cancel()
+                ARTICLE_FETCHES.labels('timeout').inc()
+        finally:
+            # Running downloads are bounded by ARTICLE_FETCH_TIMEOUT; don't wait for them
+            executor.shutdown(wait=False, cancel_futures=True)
+        return results
+
+
+def load_articles(urls) -> dict:
+    """Map of url -> stored text for the URLs already in the article store"""
+    from .models import Article
+
+    hashes = {}
+    for url in urls:
+        # Different spellings of one URL share a hash
+        hashes.setdefault(url_hash(url), []).append(url)
+    articles = {}
+    for article in Article.objects.filter(url_hash__in=hashes).select_related('content'):
+        text = decompress(article.content.text)
+        articles.update((url, text) for url in hashes[article.url_hash])
+    return articles
+
+
+def store_article(url: str, text: str):
+    """Save fetched article text (deduplicated by content hash)"""
+    from .models import Article, ArticleContent
+
+    digest = hashlib.sha256(text.encode('utf-8')).hexdigest()
+    try:
+        with transaction.atomic():
+            content, _ = ArticleContent.objects.get_or_create(
+                sha256=digest,
+                defaults={'text': compress(text), 'size': len(text.encode('utf-8'))}
+            )
+            Article.objects.get_or_create(
+                url_hash=url_hash(url),
+                defaults={'url': url, 'content': content}
+            )
+    except IntegrityError:
+        # Another run stored the same article concurrently
+        pass
+
+
+def get_articles(urls, budget: float | None = None, fetcher: ArticleFetcher | None = None) -> dict:
+    """
+    Full text for each URL: from the store when any earlier run fetched it,
+    otherwise downloaded (within ``budget`` seconds) and stored.
+    """
+    urls = list(dict.fromkeys(urls))
+    articles = load_articles(urls)
+    ARTICLE_FETCHES.labels('cached').inc(len(articles))
+
+    missing = [url for url in urls if url not in articles]
+    if missing:
+        start = time.monotonic()
+        fetched = (fetcher or ArticleFetcher()).fetch(missing, budget=budget)
+        for url, text in fetched.items():
+            store_article(url, text)
+        articles.update(fetched)
+        logger.info(f"Fetched {len(fetched)}/{len(missing)} articles in {time.monotonic() - start:.2f}s")
+    return articles
@@ -8,6 +8,7 @@ from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
 from django.conf import settings
 from django.http import HttpRequest
+from .db_router import replica_reads, stick_to_primary
 
 router = Router()
 
@@ -105,6 +106,10 @@ def signup(request, data: SignupRequest):
         password=data.password
     )
     
+    # Reads right after signup (as the new user or still anonymous) must find the user
+    stick_to_primary(request)
+    stick_to_primary(identity=f"user:{user.id}")
+    
     # Generate token
     token = generate_token(user)
     
@@ -118,6 +123,7 @@ def signup(request, data: SignupRequest):
     )
 
 @router.post("/login", response=AuthResponse)
+@replica_reads
 def login(request, data: LoginRequest):
     """
     Login with username and password.
@@ -140,6 +146,7 @@ def login(request, data: LoginRequest):
     )
 
 @router.get("/me", response=UserSchema)
+@replica_reads
 def get_current_user(request):
     """
     Get current user from token.
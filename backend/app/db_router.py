@@ -0,0 +1,102 @@
+# app/db_router.py
+# Read-replica routing.
+#
+# Every write, and every read outside a read-only API endpoint (workers, admin,
+# submissions), uses the 'default' (primary) database. Views decorated with
+# @replica_reads read from one of DATABASE_REPLICAS instead, so dashboard polling
+# doesn't compete with the workers' writes. A client that just submitted or
+# cancelled a task stays on the primary for DATABASE_REPLICA_STICKY_SECONDS, so
+# it reads its own writes despite replication lag.
+import logging
+import random
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+
+import redis
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+
+from .admission import client_identity
+from .queues import get_redis
+
+logger = logging.getLogger(__name__)
+
+STICKY_KEY_PREFIX = 'db_sticky:'
+
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+class ReplicaRouter:
+    """Sends reads inside @replica_reads views to a random replica; everything else to default"""
+
+    def db_for_read(self, model, **hints):
+        if settings.DATABASE_REPLICAS and _replica_reads.get():
+            return random.choice(settings.DATABASE_REPLICAS)
+        return 'default'
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # No opinion: migrate only targets a replica when asked to (local SQLite setups)
+        return None
+
+
+def stick_to_primary(request=None, identity: str | None = None):
+    """Keep a client's replica-routed reads on the primary for DATABASE_REPLICA_STICKY_SECONDS"""
+    if not settings.DATABASE_REPLICAS:
+        return
+    identity = identity or client_identity(request)
+    try:
+        get_redis().set(f"{STICKY_KEY_PREFIX}{identity}", 1, ex=settings.DATABASE_REPLICA_STICKY_SECONDS)
+    except redis.RedisError as exc:
+        logger.warning(f"Could not pin {identity} to the primary database: {exc}")
+
+
+def _replica_allowed(request) -> bool:
+    if not settings.DATABASE_REPLICAS:
+        return False
+    try:
+        return not get_redis().exists(f"{STICKY_KEY_PREFIX}{client_identity(request)}")
+    except redis.RedisError:
+        # Stickiness unknown: the primary is always up to date
+        return False
+
+
+@contextmanager
+def primary_reads():
+    """Read from the primary inside the block, even within a @replica_reads view"""
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+def replica_reads(view):
+    """Route the view's reads to a replica unless the client recently wrote (see stick_to_primary)"""
+    if iscoroutinefunction(view):
+        @wraps(view)
+        async def async_wrapper(request, *args, **kwargs):
+            token = _replica_reads.set(
+                await sync_to_async(_replica_allowed, thread_sensitive=False)(request)
+            )
+            try:
+                return await view(request, *args, **kwargs)
+            finally:
+                _replica_reads.reset(token)
+        return async_wrapper
+
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        token = _replica_reads.set(_replica_allowed(request))
+        try:
+            return view(request, *args, **kwargs)
+        finally:
+            _replica_reads.reset(token)
+    return wrapper
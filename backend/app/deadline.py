@@ -0,0 +1,39 @@
+# app/deadline.py
+# End-to-end deadline for a research run, split across the graph nodes.
+#
+# The task puts an absolute ``deadline`` (epoch seconds) into the graph state; each
+# node asks for its budget, which becomes the timeout of its outbound calls.
+import time
+from django.conf import settings
+
+
+class DeadlineExceeded(Exception):
+    """The run (or one of its provider calls) ran out of its time budget"""
+
+
+def deadline_for(task_type: str) -> float:
+    """Absolute deadline for a new run of ``task_type``"""
+    budgets = settings.RESEARCH_DEADLINE_SECONDS
+    return time.time() + budgets.get(task_type, budgets['DEFAULT'])
+
+
+def node_timeout(state, node: str) -> float | None:
+    """
+    Seconds available to ``node``: its share of what is left of the run's deadline,
+    relative to the nodes that still have to run (unused time flows forward).
+    Returns None when the run has no deadline; raises DeadlineExceeded when it has passed.
+    """
+    deadline = state.get("deadline")
+    if not deadline:
+        return None
+
+    remaining = deadline - time.time()
+    if remaining <= 0:
+        raise DeadlineExceeded(f"Deadline passed before {node} started")
+
+    shares = settings.NODE_BUDGET_SHARES
+    nodes = list(shares)
+    if node not in shares:
+        return remaining
+    later = nodes[nodes.index(node):]
+    return remaining * shares[node] / sum(shares[n] for n in later)
@@ -0,0 +1,17 @@
+# app/dispatch.py
+# Enqueue Celery tasks by name so the API process never imports app.tasks/app.agent
+# (and with them langgraph, langchain_google_genai and tavily).
+from celery import current_app
+
+RUN_RESEARCH_TASK = 'app.tasks.run_research_task'
+SETUP_SCHEDULED_RESEARCH_TASK = 'app.tasks.setup_scheduled_research'
+
+
+def enqueue_research(task_id: str, industry: str):
+    """Queue run_research_task for an existing TaskStatus record"""
+    return current_app.send_task(RUN_RESEARCH_TASK, args=[task_id, industry])
+
+
+def enqueue_scheduled_research(**kwargs):
+    """Queue setup_scheduled_research with optional industries/force_update kwargs"""
+    return current_app.send_task(SETUP_SCHEDULED_RESEARCH_TASK, kwargs=kwargs)
@@ -0,0 +1,81 @@
+# app/fingerprint.py
+# Content fingerprints of the research a run is based on.
+#
+# ``content_fingerprint`` identifies exactly identical research; ``minhash`` is a
+# MinHash sketch of word shingles over the sources and passages, whose agreement
+# with another sketch estimates their Jaccard similarity. Both are stored on
+# SupplyChainReport so the next run for the industry can tell whether the news changed.
+import hashlib
+import random
+import re
+import struct
+
+from django.conf import settings
+
+# Mersenne prime used by the (a * x + b) mod p permutations
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_SEED = 1
+
+_WORD = re.compile(r"\w+")
+
+
+def _permutations(num_perm: int):
+    """Fixed (a, b) coefficients, so sketches stay comparable across processes"""
+    rng = random.Random(_SEED)
+    return [(rng.randint(1, _PRIME - 1), rng.randint(0, _PRIME - 1)) for _ in range(num_perm)]
+
+
+_PERMUTATIONS = {}
+
+
+def _hash(token: str) -> int:
+    return struct.unpack('<I', hashlib.blake2b(token.encode(), digest_size=4).digest())[0]
+
+
+def shingles(text: str, size: int = 5) -> set:
+    """Lowercased word ``size``-grams of ``text`` (the whole text if shorter)"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+
+def _tokens(sources, passages) -> set:
+    tokens = {f"url:{source.get('url', '')}" for source in sources}
+    for passage in passages:
+        tokens |= shingles(passage)
+    return tokens
+
+
+def content_fingerprint(sources, passages) -> str:
+    """sha256 over the sorted source URLs and normalized passages"""
+    digest = hashlib.sha256()
+    for url in sorted(source.get('url', '') for source in sources):
+        digest.update(url.encode() + b"\0")
+    for passage in sorted(" ".join(_WORD.findall(p.lower())) for p in passages):
+        digest.update(passage.encode() + b"\0")
+    return digest.hexdigest()
+
+
+def minhash(sources, passages, num_perm: int = None) -> list:
+    """MinHash sketch (``num_perm`` 32-bit values) of the sources' URLs and passage shingles"""
+    num_perm = num_perm or settings.MINHASH_PERMUTATIONS
+    if num_perm not in _PERMUTATIONS:
+        _PERMUTATIONS[num_perm] = _permutations(num_perm)
+    permutations = _PERMUTATIONS[num_perm]
+
+    hashes = [_hash(token) for token in _tokens(sources, passages)]
+    if not hashes:
+        return [_MAX_HASH] * num_perm
+    return [
+        min(((a * h + b) % _PRIME) & _MAX_HASH for h in hashes)
+        for a, b in permutations
+    ]
+
+
+def similarity(sketch_a, sketch_b) -> float:
+    """Estimated Jaccard similarity of two sketches (0.0 if they are not comparable)"""
+    if not sketch_a or len(sketch_a) != len(sketch_b):
+        return 0.0
+    return sum(1 for a, b in zip(sketch_a, sketch_b) if a == b) / len(sketch_a)
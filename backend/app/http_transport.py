@@ -0,0 +1,138 @@
+# app/http_transport.py
+# Per-process pooled HTTP transport shared by the Tavily and Gemini (REST) clients.
+#
+# One urllib3 pool manager per worker process keeps TLS connections to each
+# provider open across tasks, so a run doesn't pay a handshake per request.
+import logging
+import socket
+import threading
+
+import requests
+from django.conf import settings
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection
+
+from .metrics import HTTP_POOL_CONNECTIONS, HTTP_POOL_IDLE, HTTP_POOL_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_adapter = None
+_session = None
+
+
+def _keepalive_socket_options():
+    """TCP keep-alive so idle pooled connections survive NAT/LB idle timeouts"""
+    options = list(HTTPConnection.default_socket_options)
+    options.append((socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1))
+    idle = settings.HTTP_KEEPALIVE_IDLE
+    for name, value in (('TCP_KEEPIDLE', idle), ('TCP_KEEPINTVL', max(1, idle // 3)), ('TCP_KEEPCNT', 3)):
+        if hasattr(socket, name):
+            options.append((socket.IPPROTO_TCP, getattr(socket, name), value))
+    return options
+
+
+class KeepAliveAdapter(HTTPAdapter):
+    """HTTPAdapter with TCP keep-alive on every pooled connection"""
+
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = _keepalive_socket_options()
+        super().init_poolmanager(*args, **kwargs)
+
+
+def get_adapter() -> HTTPAdapter:
+    """The process-wide adapter (and so connection pool) shared by all provider clients"""
+    global _adapter
+    with _lock:
+        if _adapter is None:
+            _adapter = KeepAliveAdapter(
+                pool_connections=settings.HTTP_POOL_CONNECTIONS,
+                pool_maxsize=settings.HTTP_POOL_MAXSIZE,
+                pool_block=settings.HTTP_POOL_BLOCK,
+                # Retries are handled by call_provider
+                max_retries=0,
+            )
+        return _adapter
+
+
+def attach(session: requests.Session) -> requests.Session:
+    """Route a session's requests through the shared pool"""
+    adapter = get_adapter()
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session() -> requests.Session:
+    """Process-wide session on the shared pool"""
+    global _session
+    if _session is None:
+        session = attach(requests.Session())
+        with _lock:
+            if _session is None:
+                _session = session
+    return _session
+
+
+class PooledRequests:
+    """
+    Stand-in for the ``requests`` module whose request functions use the shared
+    pool. For SDKs that call ``requests.post(...)`` directly (each call would
+    otherwise open a fresh connection); everything else is the real module.
+    """
+
+    def __getattr__(self, name):
+        return getattr(requests, name)
+
+    def request(self, method, url, **kwargs):
+        return get_session().request(method, url, **kwargs)
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+
+def warm_up(urls=None) -> int:
+    """
+    Open a pooled connection (DNS + TCP + TLS) to each provider ahead of the first task.
+    Errors are logged and ignored. Returns the number of hosts reached.
+    """
+    reached = 0
+    for url in urls or settings.HTTP_WARMUP_URLS:
+        try:
+            get_session().head(url, timeout=settings.HTTP_WARMUP_TIMEOUT)
+            reached += 1
+        except requests.RequestException as exc:
+            logger.warning(f"Connection warm-up to {url} failed: {exc}")
+    refresh_pool_metrics()
+    return reached
+
+
+def pool_stats() -> list:
+    """Per-host pool statistics: connections opened, requests served, idle connections"""
+    if _adapter is None:
+        return []
+    pools = _adapter.poolmanager.pools
+    stats = []
+    for key in pools.keys():
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        stats.append({
+            'host': f"{pool.scheme}://{pool.host}:{pool.port}",
+            'connections_opened': pool.num_connections,
+            'requests': pool.num_requests,
+            # The pool queue is pre-filled with None placeholders for unopened slots
+            'idle_connections': sum(1 for conn in list(pool.pool.queue) if conn is not None) if pool.pool is not None else 0,
+            'max_size': pool.pool.maxsize if pool.pool is not None else 0,
+        })
+    return stats
+
+
+def refresh_pool_metrics():
+    for stat in pool_stats():
+        HTTP_POOL_CONNECTIONS.labels(stat['host']).set(stat['connections_opened'])
+        HTTP_POOL_REQUESTS.labels(stat['host']).set(stat['requests'])
+        HTTP_POOL_IDLE.labels(stat['host']).set(stat['idle_connections'])
@@ -0,0 +1,233 @@
+# app/management/commands/benchmark_api.py
+import json
+import random
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Max, Min
+from django.test import Client, override_settings
+
+from app.models import TaskStatus
+from app.query_stats import COUNT_HEADER
+
+from .seed_synthetic_data import BENCH_PASSWORD, BENCH_USER_PREFIX
+
+API_PREFIX = '/api'
+SCENARIOS = ['list_tasks', 'list_tasks_status', 'list_tasks_delta', 'task_status', 'task_report', 'reports_latest', 'auth_login', 'auth_me']
+
+
+def percentile(sorted_values, q):
+    """Nearest-rank percentile (q in 0-100) of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = max(0, min(len(sorted_values) - 1, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def sample_task_ids(queryset, size, rng):
+    """Random task ids by primary-key range (ORDER BY RANDOM() is too slow on big tables)"""
+    bounds = TaskStatus.objects.aggregate(low=Min('id'), high=Max('id'))
+    if bounds['low'] is None:
+        return []
+    span = range(bounds['low'], bounds['high'] + 1)
+    ids = rng.sample(span, min(len(span), size * 2))
+    return [str(task_id) for task_id in queryset.filter(id__in=ids).values_list('task_id', flat=True)[:size]]
+
+
+class InProcessTransport:
+    """Django test client per thread; counts the queries each request runs"""
+
+    def __init__(self):
+        self._local = threading.local()
+
+    def _client(self):
+        if not hasattr(self._local, 'client'):
+            self._local.client = Client()
+        return self._local.client
+
+    def request(self, method, path, body=None, headers=None):
+        queries = []
+
+        def count(execute, sql, params, many, context):
+            queries.append(sql)
+            return execute(sql, params, many, context)
+
+        client = self._client()
+        kwargs = {'headers': headers or {}}
+        if body is not None:
+            kwargs.update(data=json.dumps(body), content_type='application/json')
+        with connection.execute_wrapper(count):
+            response = getattr(client, method)(path, **kwargs)
+        return response.status_code, response.content, len(queries)
+
+    def close(self):
+        connection.close()
+
+
+class HttpTransport:
+    """requests.Session per thread against a running server (--base-url); queries come from X-DB-Query-Count"""
+
+    def __init__(self, base_url):
+        import requests
+        self._requests = requests
+        self.base_url = base_url.rstrip('/')
+        self._local = threading.local()
+
+    def request(self, method, path, body=None, headers=None):
+        if not hasattr(self._local, 'session'):
+            self._local.session = self._requests.Session()
+        response = self._local.session.request(method.upper(), self.base_url + path, json=body, headers=headers)
+        # Set by QueryStatsMiddleware when the server has QUERY_STATS_ENABLED
+        queries = response.headers.get(COUNT_HEADER)
+        return response.status_code, response.content, int(queries) if queries is not None else None
+
+    def close(self):
+        session = getattr(self._local, 'session', None)
+        if session is not None:
+            session.close()
+            del self._local.session
+
+
+class Command(BaseCommand):
+    help = 'Load test the read and auth endpoints and report latency percentiles and queries per request'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario')
+        parser.add_argument('--concurrency', type=int, default=8)
+        parser.add_argument('--scenarios', default=','.join(SCENARIOS), help=f'Comma-separated subset of {SCENARIOS}')
+        parser.add_argument('--base-url', default=None, help='Benchmark a running server instead of the in-process test client')
+        parser.add_argument('--sample-size', type=int, default=1000, help='Task ids sampled for the per-task scenarios')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--json', action='store_true', help='Print results as JSON')
+
+    def handle(self, *args, **options):
+        scenarios = [name for name in options['scenarios'].split(',') if name]
+        unknown = set(scenarios) - set(SCENARIOS)
+        if unknown:
+            raise CommandError(f'Unknown scenarios: {", ".join(sorted(unknown))}')
+
+        rng = random.Random(options['seed'])
+        task_ids = sample_task_ids(TaskStatus.objects.all(), options['sample_size'], rng)
+        completed_ids = sample_task_ids(
+            TaskStatus.objects.filter(status='COMPLETED', report__isnull=False), options['sample_size'], rng
+        )
+        if not task_ids:
+            raise CommandError('No tasks to benchmark; run seed_synthetic_data first')
+
+        if options['base_url']:
+            transport = HttpTransport(options['base_url'])
+        else:
+            transport = InProcessTransport()
+            if settings.DEBUG:
+                self.stderr.write('DEBUG=True: Django keeps every query in memory, latencies are pessimistic')
+
+        token = self.login(transport) if {'auth_me'} & set(scenarios) else None
+
+        # The in-process client talks to 'testserver'
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            results = [
+                self.run_scenario(name, transport, rng, task_ids, completed_ids, token, options)
+                for name in scenarios
+            ]
+
+        if options['json']:
+            self.stdout.write(json.dumps(results, indent=2))
+        else:
+            self.print_table(results)
+
+    def login(self, transport):
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            status, content, _ = transport.request(
+                'post', f'{API_PREFIX}/auth/login',
+                body={'username': f'{BENCH_USER_PREFIX}0', 'password': BENCH_PASSWORD}
+            )
+        if status != 200:
+            raise CommandError(f'Benchmark login failed ({status}); run seed_synthetic_data with --users >= 1')
+        return json.loads(content)['token']
+
+    def build_request(self, name, rng, task_ids, completed_ids, token):
+        """(method, path, body, headers) for one request of scenario ``name``"""
+        base = f'{API_PREFIX}/supply-chain'
+        if name == 'list_tasks':
+            return 'get', f'{base}/research/requests/?limit=50', None, None
+        if name == 'list_tasks_status':
+            status = rng.choice(['COMPLETED', 'FAILED', 'PROCESSING'])
+            return 'get', f'{base}/research/requests/?status={status}&limit=50', None, None
+        if name == 'list_tasks_delta':
+            # Steady-state dashboard poll: nothing changed in the last few seconds
+            return 'get', f'{base}/research/requests/?limit=50&since={time.time() - 5:.6f}', None, None
+        if name == 'task_status':
+            return 'get', f'{base}/research/requests/{rng.choice(task_ids)}/status', None, None
+        if name == 'task_report':
+            return 'get', f'{base}/research/requests/{rng.choice(completed_ids or task_ids)}/report', None, None
+        if name == 'reports_latest':
+            return 'get', f'{base}/reports/latest/', None, None
+        if name == 'auth_login':
+            body = {'username': f'{BENCH_USER_PREFIX}0', 'password': BENCH_PASSWORD}
+            return 'post', f'{API_PREFIX}/auth/login', body, None
+        if name == 'auth_me':
+            return 'get', f'{API_PREFIX}/auth/me', None, {'Authorization': f'Bearer {token}'}
+        raise CommandError(f'Unknown scenario {name}')
+
+    def run_scenario(self, name, transport, rng, task_ids, completed_ids, token, options):
+        requests = [self.build_request(name, rng, task_ids, completed_ids, token) for _ in range(options['requests'])]
+        latencies, query_counts, errors = [], [], 0
+        lock = threading.Lock()
+
+        def send(request):
+            nonlocal errors
+            method, path, body, headers = request
+            start = time.perf_counter()
+            try:
+                status, _, queries = transport.request(method, path, body, headers)
+            except Exception:
+                status, queries = None, None
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                if queries is not None:
+                    query_counts.append(queries)
+                if status is None or status >= 400:
+                    errors += 1
+
+        def worker(chunk):
+            try:
+                for request in chunk:
+                    send(request)
+            finally:
+                transport.close()
+
+        concurrency = max(1, options['concurrency'])
+        chunks = [requests[i::concurrency] for i in range(concurrency)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            list(executor.map(worker, chunks))
+        wall = time.perf_counter() - started
+
+        latencies.sort()
+        to_ms = lambda value: round(value * 1000, 2) if value is not None else None
+        return {
+            'scenario': name,
+            'requests': len(latencies),
+            'errors': errors,
+            'concurrency': concurrency,
+            'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+            'p50_ms': to_ms(percentile(latencies, 50)),
+            'p95_ms': to_ms(percentile(latencies, 95)),
+            'p99_ms': to_ms(percentile(latencies, 99)),
+            'max_ms': to_ms(latencies[-1] if latencies else None),
+            'queries_avg': round(statistics.mean(query_counts), 2) if query_counts else None,
+            'queries_max': max(query_counts) if query_counts else None,
+        }
+
+    def print_table(self, results):
+        columns = ['scenario', 'requests', 'errors', 'throughput_rps', 'p50_ms', 'p95_ms', 'p99_ms', 'max_ms', 'queries_avg', 'queries_max']
+        widths = [max(len(column), *(len(str(row[column])) for row in results)) for column in columns]
+        self.stdout.write('  '.join(column.ljust(width) for column, width in zip(columns, widths)))
+        for row in results:
+            self.stdout.write('  '.join(str(row[column] if row[column] is not None else '-').ljust(width) for column, width in zip(columns, widths)))
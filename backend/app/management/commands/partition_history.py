@@ -0,0 +1,83 @@
+# app/management/commands/partition_history.py
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from app.retention import PARTITIONED_TABLES, ensure_partitions, is_partitioned, partition_statements
+
+
+class Command(BaseCommand):
+    help = (
+        'Convert history tables to monthly range partitions (Postgres only). '
+        'The copy runs in one transaction and locks the table: run it in a maintenance window. '
+        'Tables that are already partitioned only get their upcoming partitions.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--table', action='append', choices=sorted(PARTITIONED_TABLES), help='Table to convert (default: all)')
+        parser.add_argument('--dry-run', action='store_true', help='Print the SQL without running it')
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError('Table partitioning needs PostgreSQL')
+
+        for table in options['table'] or sorted(PARTITIONED_TABLES):
+            if is_partitioned(table):
+                ensured = ensure_partitions()
+                self.stdout.write(f'{table} is already partitioned; partitions in place: {", ".join(ensured)}')
+                continue
+
+            statements = self.conversion_statements(table, PARTITIONED_TABLES[table])
+            if options['dry_run']:
+                self.stdout.write(';\n'.join(statements) + ';')
+                continue
+            with transaction.atomic(), connection.cursor() as cursor:
+                for statement in statements:
+                    cursor.execute(statement)
+            self.stdout.write(self.style.SUCCESS(f'Partitioned {table} by month on {PARTITIONED_TABLES[table]}'))
+
+    def conversion_statements(self, table, column):
+        """
+        Rename the table, create a partitioned copy under the original name,
+        move the rows, drop the old table and recreate its sequence, indexes and
+        foreign keys (same names, so Django migrations keep finding them). The
+        primary key becomes (id, <column>): Postgres needs the partition column
+        in every unique key.
+        """
+        quote = connection.ops.quote_name
+        legacy = f'{table}_unpartitioned'
+        sequence = f'{table}_id_seq'
+
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT min({quote(column)}) FROM {quote(table)}')
+            start = cursor.fetchone()[0] or timezone.now()
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE schemaname = current_schema() AND tablename = %s "
+                "AND indexname <> %s",
+                [table, f'{table}_pkey']
+            )
+            indexes = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [table]
+            )
+            foreign_keys = cursor.fetchall()
+
+        return [
+            f'ALTER TABLE {quote(table)} RENAME TO {quote(legacy)}',
+            f'CREATE TABLE {quote(table)} (LIKE {quote(legacy)} INCLUDING DEFAULTS INCLUDING STORAGE) '
+            f'PARTITION BY RANGE ({quote(column)})',
+            *(statement for _, statement in partition_statements(table, start)),
+            f'CREATE TABLE {quote(table + "_default")} PARTITION OF {quote(table)} DEFAULT',
+            f'INSERT INTO {quote(table)} SELECT * FROM {quote(legacy)}',
+            f'DROP TABLE {quote(legacy)}',
+            # Identity columns on partitioned tables need Postgres 17; a sequence works everywhere
+            f'CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id',
+            f"SELECT setval('{sequence}', COALESCE((SELECT max(id) FROM {quote(table)}), 0) + 1, false)",
+            f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval('{sequence}')",
+            f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(table + "_pkey")} PRIMARY KEY (id, {quote(column)})',
+            # The definitions name the original table, which is now the partitioned one
+            *indexes,
+            *(f'ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}' for name, definition in foreign_keys),
+        ]
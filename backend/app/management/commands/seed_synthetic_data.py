@@ -0,0 +1,179 @@
+# app/management/commands/seed_synthetic_data.py
+import random
+import uuid
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from app.models import RiskMetric, SupplyChainReport, TaskStatus
+
+SYNTHETIC_SUFFIX = ' (synthetic)'
+BENCH_USER_PREFIX = 'bench-user-'
+BENCH_PASSWORD = 'bench-password'
+
+BASE_INDUSTRIES = [
+    'Automotive', 'Technology', 'Healthcare', 'Manufacturing', 'Energy',
+    'Pharmaceuticals', 'Semiconductors', 'Retail', 'Aerospace', 'Agriculture',
+    'Chemicals', 'Textiles', 'Shipping', 'Food & Beverage', 'Mining',
+    'Telecommunications', 'Construction', 'Electronics', 'Steel', 'Logistics',
+]
+
+# Roughly what production looks like: most runs complete, few are in flight
+STATUS_WEIGHTS = {'COMPLETED': 85, 'FAILED': 7, 'CANCELLED': 3, 'PENDING': 3, 'PROCESSING': 2}
+TASK_TYPE_WEIGHTS = {'SCHEDULED': 70, 'MANUAL': 28, 'RETRY': 2}
+RISK_CATEGORIES = {'Logistics': 45, 'Labor': 25, 'Geopolitical': 20, 'Regulatory': 7, 'Climate': 3}
+
+
+@contextmanager
+def explicit_timestamps(*models):
+    """Let bulk_create keep the created_at/updated_at values we set instead of auto_now(_add)"""
+    fields = [
+        model._meta.get_field(name)
+        for model in models
+        for name in ('created_at', 'updated_at')
+        if any(field.name == name for field in model._meta.fields)
+    ]
+    saved = [(field.auto_now, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now = field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, (auto_now, auto_now_add) in zip(fields, saved):
+            field.auto_now, field.auto_now_add = auto_now, auto_now_add
+
+
+class Command(BaseCommand):
+    help = 'Seed the database with synthetic tasks and reports for load benchmarks (see benchmark_api)'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--tasks', type=int, default=100_000, help='Number of TaskStatus rows to create')
+        parser.add_argument('--industries', type=int, default=50, help='Number of distinct industries')
+        parser.add_argument('--days', type=int, default=365, help='Spread created_at over this many days')
+        parser.add_argument('--users', type=int, default=5, help='Benchmark users for the auth endpoints')
+        parser.add_argument('--batch-size', type=int, default=5_000)
+        parser.add_argument('--no-risk-metrics', action='store_true', help='Skip RiskMetric rows')
+        parser.add_argument('--seed', type=int, default=42)
+        parser.add_argument('--clear', action='store_true', help='Delete previously seeded synthetic data first')
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+
+        if options['clear']:
+            self.clear()
+
+        industries = self.industry_names(options['industries'])
+        # Zipf-like skew: a handful of industries get most of the runs
+        industry_weights = [1 / (rank + 1) ** 1.1 for rank in range(len(industries))]
+
+        self.create_users(options['users'])
+
+        remaining = options['tasks']
+        created_tasks = created_reports = 0
+        now = timezone.now()
+
+        while remaining > 0:
+            size = min(options['batch_size'], remaining)
+            reports, metrics = self.create_batch(
+                rng, size, industries, industry_weights, now, options['days'],
+                with_metrics=not options['no_risk_metrics']
+            )
+            created_tasks += size
+            created_reports += reports
+            remaining -= size
+            self.stdout.write(f'{created_tasks}/{options["tasks"]} tasks ({created_reports} reports, {metrics} risk metrics in batch)')
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Seeded {created_tasks} tasks and {created_reports} reports across {len(industries)} industries'
+            )
+        )
+
+    @staticmethod
+    def industry_names(count):
+        names = []
+        for index in range(count):
+            base = BASE_INDUSTRIES[index % len(BASE_INDUSTRIES)]
+            suffix = f' {index // len(BASE_INDUSTRIES) + 1}' if index >= len(BASE_INDUSTRIES) else ''
+            names.append(f'{base}{suffix}{SYNTHETIC_SUFFIX}')
+        return names
+
+    def create_users(self, count):
+        for index in range(count):
+            username = f'{BENCH_USER_PREFIX}{index}'
+            if not User.objects.filter(username=username).exists():
+                User.objects.create_user(username=username, email=f'{username}@example.com', password=BENCH_PASSWORD)
+
+    def create_batch(self, rng, size, industries, industry_weights, now, days, with_metrics):
+        statuses = rng.choices(list(STATUS_WEIGHTS), weights=list(STATUS_WEIGHTS.values()), k=size)
+        task_types = rng.choices(list(TASK_TYPE_WEIGHTS), weights=list(TASK_TYPE_WEIGHTS.values()), k=size)
+        task_industries = rng.choices(industries, weights=industry_weights, k=size)
+
+        tasks, reports = [], []
+        for status, task_type, industry in zip(statuses, task_types, task_industries):
+            # In-flight tasks are recent; the rest are spread over the window
+            age = timedelta(minutes=rng.uniform(0, 30)) if status in ('PENDING', 'PROCESSING') else timedelta(seconds=rng.uniform(0, days * 86400))
+            created_at = now - age
+            task = TaskStatus(
+                task_id=uuid.uuid4(),
+                task_type=task_type,
+                industry=industry,
+                status=status,
+                progress=100 if status == 'COMPLETED' else rng.choice([0, 10, 25, 50, 90]),
+                created_at=created_at,
+            )
+            if status != 'PENDING':
+                task.started_at = created_at + timedelta(seconds=rng.uniform(0.5, 30))
+            if status in ('COMPLETED', 'FAILED', 'CANCELLED'):
+                task.completed_at = task.started_at + timedelta(seconds=rng.lognormvariate(3.5, 0.5))
+            if status == 'FAILED':
+                task.error_message = rng.choice(['Gemini request timed out', 'Tavily rate limit exceeded', 'Deadline exceeded'])
+            task.updated_at = task.completed_at or task.started_at or created_at
+            if status == 'COMPLETED':
+                reports.append((task, self.build_report(rng, industry, task.completed_at)))
+            tasks.append(task)
+
+        metric_count = 0
+        with transaction.atomic(), explicit_timestamps(TaskStatus, SupplyChainReport):
+            SupplyChainReport.objects.bulk_create([report for _, report in reports])
+            for task, report in reports:
+                task.report = report
+            TaskStatus.objects.bulk_create(tasks)
+            if with_metrics:
+                rows = [row for _, report in reports for row in RiskMetric.rows_for(report)]
+                RiskMetric.objects.bulk_create(rows, batch_size=5_000)
+                metric_count = len(rows)
+        return len(reports), metric_count
+
+    @staticmethod
+    def build_report(rng, industry, created_at):
+        fragility = max(1, min(10, round(rng.gauss(5.5, 2))))
+        categories = rng.choices(list(RISK_CATEGORIES), weights=list(RISK_CATEGORIES.values()), k=rng.randint(2, 5))
+        return SupplyChainReport(
+            industry=industry,
+            fragility_score=fragility,
+            executive_summary=f'Synthetic summary for {industry}. ' * rng.randint(5, 20),
+            critical_alerts=[f'Synthetic alert {i}' for i in range(rng.randint(0, 4))],
+            risk_metrics=[
+                {
+                    'category': category,
+                    'impact_score': max(1, min(10, round(rng.gauss(fragility, 1.5)))),
+                    'description': f'Synthetic {category.lower()} risk'
+                }
+                for category in categories
+            ],
+            sources=[{'url': f'https://example.com/{uuid.uuid4().hex[:12]}', 'title': 'Synthetic source'} for _ in range(5)],
+            created_at=created_at,
+        )
+
+    def clear(self):
+        reports = SupplyChainReport.objects.filter(industry__endswith=SYNTHETIC_SUFFIX)
+        tasks = TaskStatus.objects.filter(industry__endswith=SYNTHETIC_SUFFIX)
+        deleted_tasks, _ = tasks.delete()
+        deleted_reports, _ = reports.delete()
+        User.objects.filter(username__startswith=BENCH_USER_PREFIX).delete()
+        self.stdout.write(self.style.WARNING(f'Deleted {deleted_tasks} task and {deleted_reports} report rows (incl. related)'))
@@ -1,9 +1,12 @@
 # app/management/commands/setup_scheduled_tasks.py
 from django.core.management.base import BaseCommand
-from django_celery_beat.models import PeriodicTask, CrontabSchedule
+from django.conf import settings
+from django_celery_beat.models import PeriodicTask, CrontabSchedule, IntervalSchedule
 from datetime import timedelta
 import json
 
+DISPATCH_TASK_NAME = 'daily_research_dispatch'
+LEGACY_TASK_PREFIX = 'daily_research_'
 
 class Command(BaseCommand):
     help = 'Setup scheduled research tasks for key industries'
@@ -11,17 +14,6 @@ class Command(BaseCommand):
     def handle(self, *args, **options):
         """Create periodic tasks for automated research"""
         
-        # Key industries to monitor
-        industries = [
-            'Automotive',
-            'Technology', 
-            'Healthcare',
-            'Manufacturing',
-            'Energy',
-            'Pharmaceuticals',
-            'Semiconductors'
-        ]
-        
         # Create or get crontab schedule (daily at 9 AM UTC)
         schedule, created = CrontabSchedule.objects.get_or_create(
             minute='0',
@@ -36,35 +28,108 @@ class Command(BaseCommand):
                 self.style.SUCCESS('Created daily schedule at 9:00 AM UTC')
             )
         
-        # Create periodic task for each industry
-        for industry in industries:
-            task_name = f'daily_research_{industry.lower()}'
-            
-            # Check if task already exists
-            if PeriodicTask.objects.filter(name=task_name).exists():
-                self.stdout.write(
-                    self.style.WARNING(f'Periodic task "{task_name}" already exists')
-                )
-                continue
-            
-            # Create the periodic task
-            PeriodicTask.objects.create(
-                crontab=schedule,
-                name=task_name,
-                task='app.tasks.setup_scheduled_research',
-                enabled=True,
-                kwargs=json.dumps({
-                    'industries': [industry],
-                    'force_update': True
-                })
+        # One dispatcher spreads the industries over SCHEDULED_RESEARCH_WINDOW
+        # (see app/scheduling.py) instead of one 9:00 task per industry
+        removed, _ = PeriodicTask.objects.filter(
+            name__startswith=LEGACY_TASK_PREFIX
+        ).exclude(name=DISPATCH_TASK_NAME).delete()
+        if removed:
+            self.stdout.write(
+                self.style.WARNING(f'Removed {removed} per-industry periodic tasks')
             )
-            
+        
+        _, created = PeriodicTask.objects.update_or_create(
+            name=DISPATCH_TASK_NAME,
+            defaults={
+                'crontab': schedule,
+                'task': 'app.tasks.dispatch_scheduled_research',
+                'enabled': True,
+                'kwargs': json.dumps({'force_update': True}),
+            }
+        )
+        
+        if created:
             self.stdout.write(
-                self.style.SUCCESS(f'Created periodic task: {task_name}')
+                self.style.SUCCESS(f'Created periodic task: {DISPATCH_TASK_NAME}')
             )
         
+        self.setup_result_cleanup()
+        self.setup_retention()
+        self.setup_task_state_sync()
+        
+        industries = settings.SCHEDULED_RESEARCH_INDUSTRIES
         self.stdout.write(
             self.style.SUCCESS(
-                f'Successfully setup {len(industries)} scheduled research tasks'
+                f'Successfully setup scheduled research for {len(industries)} industries '
+                f'over {settings.SCHEDULED_RESEARCH_WINDOW // 60} minutes'
+            )
+        )
+
+    def setup_result_cleanup(self):
+        """Daily cleanup of legacy django_celery_results rows (daily at 3:30 AM UTC)"""
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute='30',
+            hour='3',
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*'
+        )
+        
+        _, created = PeriodicTask.objects.update_or_create(
+            name='cleanup_celery_results',
+            defaults={
+                'crontab': schedule,
+                'task': 'app.tasks.cleanup_celery_results',
+                'enabled': True,
+            }
+        )
+        
+        if created:
+            self.stdout.write(
+                self.style.SUCCESS('Created periodic task: cleanup_celery_results')
+            )
+
+    def setup_retention(self):
+        """Daily retention pass over task and report history (daily at 4:00 AM UTC)"""
+        schedule, _ = CrontabSchedule.objects.get_or_create(
+            minute='0',
+            hour='4',
+            day_of_week='*',
+            day_of_month='*',
+            month_of_year='*'
+        )
+        
+        _, created = PeriodicTask.objects.update_or_create(
+            name='apply_retention_policies',
+            defaults={
+                'crontab': schedule,
+                'task': 'app.tasks.apply_retention_policies',
+                'enabled': True,
+            }
+        )
+        
+        if created:
+            self.stdout.write(
+                self.style.SUCCESS('Created periodic task: apply_retention_policies')
+            )
+
+    def setup_task_state_sync(self):
+        """Flush live task state to TaskStatus every TASK_STATE_FLUSH_INTERVAL seconds"""
+        schedule, _ = IntervalSchedule.objects.get_or_create(
+            every=settings.TASK_STATE_FLUSH_INTERVAL,
+            period=IntervalSchedule.SECONDS
+        )
+        
+        _, created = PeriodicTask.objects.update_or_create(
+            name='sync_task_state',
+            defaults={
+                'interval': schedule,
+                'task': 'app.tasks.sync_task_state',
+                'enabled': True,
+            }
+        )
+        
+        if created:
+            self.stdout.write(
+                self.style.SUCCESS('Created periodic task: sync_task_state')
             )
-        )
\ No newline at end of file
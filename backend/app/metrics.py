@@ -0,0 +1,205 @@
+# app/metrics.py
+import logging
+import os
+import time
+from functools import wraps
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+    start_http_server,
+)
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger(__name__)
+
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120, 300)
+
+NODE_LATENCY = Histogram(
+    'supply_chain_agent_node_duration_seconds',
+    'Latency of each LangGraph agent node',
+    ['node'],
+    buckets=LATENCY_BUCKETS,
+)
+PROVIDER_LATENCY = Histogram(
+    'supply_chain_provider_request_duration_seconds',
+    'Latency of outbound Tavily/Gemini calls (per attempt)',
+    ['provider', 'operation'],
+    buckets=LATENCY_BUCKETS,
+)
+PROVIDER_ERRORS = Counter(
+    'supply_chain_provider_errors_total',
+    'Failed outbound Tavily/Gemini calls (per attempt)',
+    ['provider', 'operation', 'error'],
+)
+PROVIDER_RETRIES = Counter(
+    'supply_chain_provider_retries_total',
+    'Retried outbound Tavily/Gemini calls',
+    ['provider', 'operation'],
+)
+PROVIDER_HEDGES = Counter(
+    'supply_chain_provider_hedged_requests_total',
+    'Duplicate requests issued after a call passed its p95 latency',
+    ['provider', 'operation'],
+)
+# Pooled HTTP transport (app/http_transport.py), summed across worker processes
+HTTP_POOL_CONNECTIONS = Gauge(
+    'supply_chain_http_pool_connections_opened',
+    'Connections (TLS handshakes) opened by the shared provider pool',
+    ['host'],
+    multiprocess_mode='livesum',
+)
+HTTP_POOL_REQUESTS = Gauge(
+    'supply_chain_http_pool_requests',
+    'Requests served by the shared provider pool',
+    ['host'],
+    multiprocess_mode='livesum',
+)
+HTTP_POOL_IDLE = Gauge(
+    'supply_chain_http_pool_idle_connections',
+    'Idle keep-alive connections in the shared provider pool',
+    ['host'],
+    multiprocess_mode='livesum',
+)
+LLM_TOKENS = Counter(
+    'supply_chain_llm_tokens_total',
+    'LLM tokens consumed, split into prompt and completion',
+    ['model', 'kind'],
+)
+ANALYST_ROUTES = Counter(
+    'supply_chain_analyst_model_routes_total',
+    'Analyst model cascade decisions (reason: size, low_signal, escalation)',
+    ['model', 'reason'],
+)
+NOVELTY_CHECKS = Counter(
+    'supply_chain_novelty_checks_total',
+    'Novelty check outcomes (carried_over, novel, expired, no_previous)',
+    ['outcome'],
+)
+ADMISSION_REJECTIONS = Counter(
+    'supply_chain_admission_rejections_total',
+    'Research submissions rejected by admission control (reason: queue_depth, in_flight, user_rate)',
+    ['reason'],
+)
+ARTICLE_FETCHES = Counter(
+    'supply_chain_article_fetches_total',
+    'Full-article lookups (outcome: cached, fetched, error, timeout)',
+    ['outcome'],
+)
+# Per API request / Celery task SQL stats (app/query_stats.py); name is the URL
+# route or the task name
+DB_QUERIES = Histogram(
+    'supply_chain_db_queries',
+    'SQL queries run by one API request or Celery task',
+    ['kind', 'name'],
+    buckets=(1, 2, 5, 10, 20, 50, 100, 250, 500, 1000),
+)
+DB_QUERY_DURATION = Histogram(
+    'supply_chain_db_query_duration_seconds',
+    'Total SQL time of one API request or Celery task',
+    ['kind', 'name'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10),
+)
+TASK_OUTCOMES = Counter(
+    'supply_chain_task_outcomes_total',
+    'Research task outcomes',
+    ['task_type', 'outcome'],
+)
+
+
+def observe_node(func):
+    """Decorator recording the latency of a graph node under its function name"""
+    @wraps(func)
+    def wrapper(state):
+        start = time.perf_counter()
+        try:
+            return func(state)
+        finally:
+            NODE_LATENCY.labels(node=func.__name__).observe(time.perf_counter() - start)
+    return wrapper
+
+
+def record_llm_usage(model: str, usage: dict | None):
+    """Record prompt/completion token counts from a LangChain ``usage_metadata`` dict"""
+    if not usage:
+        return
+    LLM_TOKENS.labels(model=model, kind='prompt').inc(usage.get('input_tokens', 0))
+    LLM_TOKENS.labels(model=model, kind='completion').inc(usage.get('output_tokens', 0))
+
+
+def record_task_outcome(task_type: str, outcome: str):
+    TASK_OUTCOMES.labels(task_type=task_type, outcome=outcome).inc()
+
+
+class QueueHealthCollector:
+    """
+    Scrape-time collector for Celery queue depth and in-flight research tasks.
+    Queue depth is read from the Redis broker and in-flight counts from the live
+    task state store, so they are correct regardless of how many web or worker
+    processes exist.
+    """
+
+    def collect(self):
+        from .queues import in_flight_counts, queue_depths
+
+        depth = GaugeMetricFamily(
+            'supply_chain_celery_queue_depth',
+            'Messages waiting in each Celery queue',
+            labels=['queue'],
+        )
+        try:
+            for queue, size in queue_depths().items():
+                depth.add_metric([queue], size)
+        except Exception as exc:
+            logger.warning(f"Could not read Celery queue depth: {exc}")
+        yield depth
+
+        in_flight = GaugeMetricFamily(
+            'supply_chain_tasks_in_flight',
+            'Research tasks currently processing',
+            labels=['task_type'],
+        )
+        try:
+            for task_type, total in in_flight_counts().items():
+                in_flight.add_metric([task_type], total)
+        except Exception as exc:
+            logger.warning(f"Could not count in-flight tasks: {exc}")
+        yield in_flight
+
+
+def _process_registry():
+    """Registry that aggregates all processes when PROMETHEUS_MULTIPROC_DIR is set"""
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return registry
+    return REGISTRY
+
+
+def render_latest():
+    """Exposition payload for the web process, including queue health"""
+    return generate_latest(_process_registry()) + generate_latest(_queue_health_registry())
+
+
+def _queue_health_registry():
+    registry = CollectorRegistry()
+    registry.register(QueueHealthCollector())
+    return registry
+
+
+def start_worker_metrics_server(port: int):
+    """Expose worker-side metrics (node, provider, token and outcome series) on ``port``"""
+    start_http_server(port, registry=_process_registry())
+    logger.info(f"Celery worker metrics listening on :{port}")
+
+
+def mark_process_dead(pid: int):
+    if os.environ.get('PROMETHEUS_MULTIPROC_DIR'):
+        multiprocess.mark_process_dead(pid)
+
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:16
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_add_sources_field'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstatus',
+            name='profile_requested',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.CreateModel(
+            name='TaskProfile',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profiler', models.CharField(default='cProfile', max_length=20)),
+                ('wall_time', models.FloatField(help_text='Wall-clock seconds spent in the profiled run')),
+                ('summary', models.JSONField(default=dict, help_text='Hot functions and time breakdown by area')),
+                ('stats', models.BinaryField(help_text='zlib-compressed marshalled pstats data')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('task_status', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='profile', to='app.taskstatus')),
+            ],
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:23
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_task_profile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplychainreport',
+            name='analysis_meta',
+            field=models.JSONField(default=dict, help_text='How the analysis was produced (model routing, latencies)'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:29
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_report_analysis_meta'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RiskMetric',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('industry', models.CharField(max_length=100)),
+                ('category', models.CharField(max_length=100)),
+                ('impact_score', models.IntegerField()),
+                ('description', models.TextField(blank=True, default='')),
+                ('created_at', models.DateTimeField()),
+                ('report', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metric_rows', to='app.supplychainreport')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['category', 'impact_score', 'created_at'], name='riskmetric_cat_impact_created'), models.Index(fields=['industry', 'created_at'], name='riskmetric_industry_created')],
+            },
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Backfill RiskMetric rows from the risk_metrics JSON of existing reports
+
+from django.db import migrations
+
+BATCH_SIZE = 1000
+
+
+def backfill_risk_metrics(apps, schema_editor):
+    # Historical models have no custom methods, so this mirrors RiskMetric.rows_for
+    SupplyChainReport = apps.get_model('app', 'SupplyChainReport')
+    RiskMetric = apps.get_model('app', 'RiskMetric')
+
+    rows = []
+    reports = SupplyChainReport.objects.only('id', 'industry', 'risk_metrics', 'created_at')
+    for report in reports.iterator(chunk_size=BATCH_SIZE):
+        for metric in report.risk_metrics or []:
+            if not isinstance(metric, dict):
+                continue
+            rows.append(RiskMetric(
+                report_id=report.id,
+                industry=report.industry,
+                category=str(metric.get('category', '')).strip()[:100],
+                impact_score=int(metric.get('impact_score') or 0),
+                description=metric.get('description') or '',
+                created_at=report.created_at,
+            ))
+        if len(rows) >= BATCH_SIZE:
+            RiskMetric.objects.bulk_create(rows)
+            rows = []
+    if rows:
+        RiskMetric.objects.bulk_create(rows)
+
+
+def clear_risk_metrics(apps, schema_editor):
+    apps.get_model('app', 'RiskMetric').objects.all().delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_risk_metric'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_risk_metrics, clear_risk_metrics),
+    ]
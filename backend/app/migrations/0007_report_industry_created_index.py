@@ -0,0 +1,17 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_backfill_risk_metrics'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='supplychainreport',
+            index=models.Index(fields=['industry', 'created_at'], name='report_industry_created'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_report_industry_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplychainreport',
+            name='carried_over_from',
+            field=models.ForeignKey(blank=True, help_text='Report whose analysis was reused because the research had not changed', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='carry_overs', to='app.supplychainreport'),
+        ),
+        migrations.AddField(
+            model_name='supplychainreport',
+            name='fingerprint',
+            field=models.CharField(blank=True, default='', help_text='sha256 of the research sources and passages', max_length=64),
+        ),
+        migrations.AddField(
+            model_name='supplychainreport',
+            name='minhash',
+            field=models.JSONField(default=list, help_text='MinHash sketch of the research sources and passages'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_report_novelty_fingerprint'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArticleContent',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('sha256', models.CharField(max_length=64, unique=True)),
+                ('text', models.BinaryField(help_text='zlib-compressed UTF-8 article text')),
+                ('size', models.IntegerField(help_text='Uncompressed size in bytes')),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Article',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('url', models.TextField()),
+                ('url_hash', models.CharField(help_text='sha256 of the normalized URL', max_length=64, unique=True)),
+                ('fetched_at', models.DateTimeField(auto_now_add=True)),
+                ('content', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='articles', to='app.articlecontent')),
+            ],
+        ),
+    ]
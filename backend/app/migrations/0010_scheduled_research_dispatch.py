@@ -0,0 +1,84 @@
+# Replace the per-industry daily_research_<industry> periodic tasks created by
+# setup_scheduled_tasks with the single staggered dispatcher (app/scheduling.py)
+
+import json
+
+from django.conf import settings
+from django.db import migrations
+from django.utils import timezone
+
+DISPATCH_TASK_NAME = 'daily_research_dispatch'
+LEGACY_TASK_PREFIX = 'daily_research_'
+LEGACY_TASK = 'app.tasks.setup_scheduled_research'
+
+
+def _schedule_changed(apps):
+    # Historical models send no signals, so tell beat to reload explicitly
+    PeriodicTasks = apps.get_model('django_celery_beat', 'PeriodicTasks')
+    PeriodicTasks.objects.update_or_create(ident=1, defaults={'last_update': timezone.now()})
+
+
+def to_dispatcher(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    legacy = list(
+        PeriodicTask.objects.filter(name__startswith=LEGACY_TASK_PREFIX, task=LEGACY_TASK)
+        .exclude(name=DISPATCH_TASK_NAME)
+    )
+    if not legacy:
+        return
+
+    industries = []
+    for task in legacy:
+        for industry in json.loads(task.kwargs or '{}').get('industries', []):
+            if industry not in industries:
+                industries.append(industry)
+
+    kwargs = {'force_update': True}
+    # Keep an industry list that differs from the configured one
+    if industries and sorted(industries) != sorted(settings.SCHEDULED_RESEARCH_INDUSTRIES):
+        kwargs['industries'] = industries
+
+    PeriodicTask.objects.update_or_create(
+        name=DISPATCH_TASK_NAME,
+        defaults={
+            'crontab_id': legacy[0].crontab_id,
+            'task': 'app.tasks.dispatch_scheduled_research',
+            'enabled': any(task.enabled for task in legacy),
+            'kwargs': json.dumps(kwargs),
+        }
+    )
+    PeriodicTask.objects.filter(pk__in=[task.pk for task in legacy]).delete()
+    _schedule_changed(apps)
+
+
+def to_per_industry(apps, schema_editor):
+    PeriodicTask = apps.get_model('django_celery_beat', 'PeriodicTask')
+    dispatcher = PeriodicTask.objects.filter(name=DISPATCH_TASK_NAME).first()
+    if dispatcher is None:
+        return
+
+    kwargs = json.loads(dispatcher.kwargs or '{}')
+    for industry in kwargs.get('industries') or settings.SCHEDULED_RESEARCH_INDUSTRIES:
+        PeriodicTask.objects.get_or_create(
+            name=f'{LEGACY_TASK_PREFIX}{industry.lower()}',
+            defaults={
+                'crontab_id': dispatcher.crontab_id,
+                'task': LEGACY_TASK,
+                'enabled': dispatcher.enabled,
+                'kwargs': json.dumps({'industries': [industry], 'force_update': True}),
+            }
+        )
+    dispatcher.delete()
+    _schedule_changed(apps)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_article_store'),
+        ('django_celery_beat', '0019_alter_periodictasks_options'),
+    ]
+
+    operations = [
+        migrations.RunPython(to_dispatcher, to_per_industry),
+    ]
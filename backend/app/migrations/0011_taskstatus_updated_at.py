@@ -0,0 +1,28 @@
+# Generated by Django 5.2.9 on 2026-10-19 21:10
+
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models.functions import Coalesce
+
+
+def backfill_updated_at(apps, schema_editor):
+    # Existing rows last changed when they finished (or started), not at migration time
+    TaskStatus = apps.get_model('app', 'TaskStatus')
+    TaskStatus.objects.update(updated_at=Coalesce('completed_at', 'started_at', 'created_at'))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_scheduled_research_dispatch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='taskstatus',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+    ]
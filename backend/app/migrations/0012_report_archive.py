@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 17:52
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_taskstatus_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='supplychainreport',
+            name='archive_file',
+            field=models.CharField(blank=True, default='', help_text='Archive path relative to RETENTION_ARCHIVE_DIR', max_length=255),
+        ),
+        migrations.AddField(
+            model_name='supplychainreport',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='supplychainreport',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['created_at'], name='report_unarchived_created'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Remove the RiskMetric rows written for carried-over reports; they duplicate
+# the rows of the report whose analysis was reused
+
+from django.db import migrations
+
+
+def drop_carried_over_rows(apps, schema_editor):
+    RiskMetric = apps.get_model('app', 'RiskMetric')
+    RiskMetric.objects.filter(report__carried_over_from__isnull=False).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_report_archive'),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_carried_over_rows, migrations.RunPython.noop),
+    ]
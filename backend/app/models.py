@@ -30,11 +30,17 @@ class TaskStatus(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     started_at = models.DateTimeField(null=True, blank=True)
     completed_at = models.DateTimeField(null=True, blank=True)
+    # Bumped on every write; the delta cursor of list_tasks (queryset .update()
+    # calls must set it explicitly)
+    updated_at = models.DateTimeField(auto_now=True, db_index=True)
     
     # Error handling
     error_message = models.TextField(null=True, blank=True)
     retry_count = models.IntegerField(default=0)
     
+    # Profiling (see app/profiling.py)
+    profile_requested = models.BooleanField(default=False)
+    
     # Related report (created when task completes successfully)
     report = models.OneToOneField(
         'SupplyChainReport', 
@@ -71,8 +77,139 @@ class SupplyChainReport(models.Model):
     critical_alerts = models.JSONField(default=list)
     risk_metrics = models.JSONField(default=list)
     sources = models.JSONField(default=list, help_text="Source articles with URL and title")
+    analysis_meta = models.JSONField(default=dict, help_text="How the analysis was produced (model routing, latencies)")
+    
+    # Novelty check (see app/fingerprint.py)
+    fingerprint = models.CharField(max_length=64, blank=True, default='', help_text="sha256 of the research sources and passages")
+    minhash = models.JSONField(default=list, help_text="MinHash sketch of the research sources and passages")
+    carried_over_from = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='carry_overs',
+        help_text="Report whose analysis was reused because the research had not changed"
+    )
+    
+    created_at = models.DateTimeField(auto_now_add=True)
     
+    # Retention (see app/retention.py): sources, analysis_meta and minhash of old
+    # reports are moved to a gzip archive file; the summary fields stay here
+    archived_at = models.DateTimeField(null=True, blank=True)
+    archive_file = models.CharField(max_length=255, blank=True, default='', help_text="Archive path relative to RETENTION_ARCHIVE_DIR")
+
+    class Meta:
+        indexes = [
+            # Latest report per industry (see /reports/latest/)
+            models.Index(fields=['industry', 'created_at'], name='report_industry_created'),
+            # Reports still waiting to be archived
+            models.Index(
+                fields=['created_at'],
+                name='report_unarchived_created',
+                condition=models.Q(archived_at__isnull=True)
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.industry} Report - {self.created_at.date()}"
+
+    @property
+    def carried_over(self):
+        return self.carried_over_from_id is not None
+
+    @property
+    def archived(self):
+        return self.archived_at is not None
+
+class RiskMetric(models.Model):
+    """
+    One row per entry of SupplyChainReport.risk_metrics, so category-level
+    questions can use an index instead of parsing every report's JSON.
+    ``industry`` and ``created_at`` are copied from the report.
+    """
+
+    report = models.ForeignKey(
+        SupplyChainReport,
+        on_delete=models.CASCADE,
+        related_name='metric_rows'
+    )
+    industry = models.CharField(max_length=100)
+    category = models.CharField(max_length=100)
+    impact_score = models.IntegerField()
+    description = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['category', 'impact_score', 'created_at'], name='riskmetric_cat_impact_created'),
+            models.Index(fields=['industry', 'created_at'], name='riskmetric_industry_created'),
+        ]
+
+    def __str__(self):
+        return f"{self.category} ({self.impact_score}) - {self.industry}"
+
+    @classmethod
+    def rows_for(cls, report):
+        """
+        Unsaved RiskMetric rows for a saved report, ready for bulk_create. A
+        carried-over report repeats its origin's metrics, which already have
+        rows, so it gets none (they would count the same risks twice).
+        """
+        if report.carried_over_from_id:
+            return []
+        return [
+            cls(
+                report=report,
+                industry=report.industry,
+                category=str(metric.get('category', '')).strip()[:100],
+                impact_score=int(metric.get('impact_score') or 0),
+                description=metric.get('description') or '',
+                created_at=report.created_at,
+            )
+            for metric in report.risk_metrics
+            if isinstance(metric, dict)
+        ]
+
+
+class TaskProfile(models.Model):
+    """Profiler capture for a research task run (opt-in per task)"""
+
+    task_status = models.OneToOneField(
+        TaskStatus,
+        on_delete=models.CASCADE,
+        related_name='profile'
+    )
+    profiler = models.CharField(max_length=20, default='cProfile')
+    wall_time = models.FloatField(help_text="Wall-clock seconds spent in the profiled run")
+    summary = models.JSONField(default=dict, help_text="Hot functions and time breakdown by area")
+    stats = models.BinaryField(help_text="zlib-compressed marshalled pstats data")
+
     created_at = models.DateTimeField(auto_now_add=True)
 
     def __str__(self):
-        return f"{self.industry} Report - {self.created_at.date()}"
\ No newline at end of file
+        return f"Profile for task {self.task_status.task_id}"
+
+
+class ArticleContent(models.Model):
+    """Extracted article text, stored once per distinct text (keyed by its sha256)"""
+
+    sha256 = models.CharField(max_length=64, unique=True)
+    text = models.BinaryField(help_text="zlib-compressed UTF-8 article text")
+    size = models.IntegerField(help_text="Uncompressed size in bytes")
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"Article content {self.sha256[:12]} ({self.size} bytes)"
+
+
+class Article(models.Model):
+    """A fetched article URL; any later report citing it reuses the stored content"""
+
+    url = models.TextField()
+    url_hash = models.CharField(max_length=64, unique=True, help_text="sha256 of the normalized URL")
+    content = models.ForeignKey(ArticleContent, on_delete=models.CASCADE, related_name='articles')
+    fetched_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.url
+
@@ -0,0 +1,71 @@
+# app/prewarm.py
+# Build a worker's long-lived objects before its first task instead of during it:
+# the langchain/langgraph imports, Tavily and Gemini clients, the structured-output
+# wrappers of every analyst tier, the compiled graph, the state store, a DB
+# connection and (optionally) pooled provider connections.
+#
+# Wired to Celery signals in backend/celery.py. Every step is best-effort: a
+# failure is logged and the object is simply built on first use as before.
+import logging
+import time
+
+from django.conf import settings
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+
+def preload_modules():
+    """
+    Import the agent stack only. Safe in a prefork parent: children inherit the
+    loaded modules without any sockets or client state.
+    """
+    start = time.perf_counter()
+    from . import agent  # noqa: F401
+    logger.info(f"Preloaded agent modules in {time.perf_counter() - start:.2f}s")
+
+
+def _steps(db, connections):
+    from . import agent
+    from .state_store import get_state_store
+
+    steps = [
+        ('tavily_client', agent.get_tavily),
+        *(
+            (f"analyst:{tier['model']}", lambda model=tier['model']: agent.get_structured_llm(model))
+            for tier in settings.ANALYST_MODEL_CASCADE
+        ),
+        ('graph', agent.get_supply_chain_app),
+        ('state_store', get_state_store),
+    ]
+    # DB connections are per thread, so this only helps a process that runs its
+    # tasks on the thread that calls prewarm (prefork children)
+    if db and settings.DATABASES['default'].get('CONN_MAX_AGE'):
+        steps.append(('database', connection.ensure_connection))
+    if connections:
+        from .http_transport import warm_up
+        steps.append(('connections', warm_up))
+    return steps
+
+
+def prewarm(db=True, connections=None) -> dict:
+    """
+    Build and cache the per-process agent objects. ``connections`` defaults to
+    HTTP_WARMUP_ENABLED. Returns seconds spent per step (None for failed steps).
+    """
+    if connections is None:
+        connections = settings.HTTP_WARMUP_ENABLED
+
+    start = time.perf_counter()
+    steps = _steps(db, connections)
+    timings = {'imports': round(time.perf_counter() - start, 3)}
+    for name, build in steps:
+        start = time.perf_counter()
+        try:
+            build()
+            timings[name] = round(time.perf_counter() - start, 3)
+        except Exception as exc:
+            timings[name] = None
+            logger.warning(f"Prewarm step {name} failed, it will be built on first use: {exc!r}")
+    logger.info(f"Worker prewarm: {timings}")
+    return timings
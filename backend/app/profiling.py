@@ -0,0 +1,136 @@
+# app/profiling.py
+import cProfile
+import marshal
+import pstats
+import random
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from contextvars import ContextVar
+from django.conf import settings
+
+# Buckets used to attribute self-time, matched against "file:function" in order.
+# Anything unmatched is reported as 'other'.
+TIME_CATEGORIES = [
+    ('pydantic', ('pydantic',)),
+    ('database', ('django/db/', 'psycopg', 'sqlite', 'cursor')),
+    ('network', ('socket', 'ssl', 'http/client', 'urllib3', 'requests/', 'grpc', 'httpx', 'httpcore')),
+    ('prompt_assembly', ('langchain_core/prompts', 'langchain_core/messages', 'langchain_core/output_parsers')),
+    ('llm_sdk', ('langchain_google_genai', 'google/')),
+    ('graph', ('langgraph',)),
+    ('json', ('json/',)),
+]
+
+TOP_FUNCTIONS = 25
+
+# Provider calls of the run being captured. cProfile only sees the thread that
+# enabled it, while provider requests run in the provider executor and map-reduce
+# threads, so their wall time is taken from call_provider instead.
+_provider_calls = ContextVar('profile_provider_calls', default=None)
+
+
+class ProviderCalls:
+    """Call count and summed wall time per (provider, operation); shared by the run's threads"""
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def add(self, provider: str, operation: str, seconds: float):
+        with self._lock:
+            calls, total = self._calls.get((provider, operation), (0, 0.0))
+            self._calls[(provider, operation)] = (calls + 1, total + seconds)
+
+    def summary(self) -> list:
+        with self._lock:
+            rows = [
+                {'provider': provider, 'operation': operation, 'calls': calls, 'wall_time': round(total, 6)}
+                for (provider, operation), (calls, total) in self._calls.items()
+            ]
+        return sorted(rows, key=lambda r: -r['wall_time'])
+
+
+def record_provider_call(provider: str, operation: str, seconds: float):
+    """Add one provider call (attempt) to the profile being captured, if any"""
+    calls = _provider_calls.get()
+    if calls is not None:
+        calls.add(provider, operation, seconds)
+
+
+def should_profile(requested: bool = False) -> bool:
+    """Profile when explicitly requested, otherwise sample at RESEARCH_PROFILE_SAMPLE_RATE"""
+    return requested or random.random() < settings.RESEARCH_PROFILE_SAMPLE_RATE
+
+
+def _categorize(filename: str, function: str) -> str:
+    key = f"{filename}:{function}".replace('\\', '/').lower()
+    for category, needles in TIME_CATEGORIES:
+        if any(needle in key for needle in needles):
+            return category
+    return 'other'
+
+
+def _function_label(func):
+    filename, line, name = func
+    return {'function': name, 'file': filename, 'line': line}
+
+
+def summarize(stats: pstats.Stats) -> dict:
+    """Build a JSON-friendly summary of the hottest functions and time per area"""
+    breakdown = {}
+    rows = []
+    for func, (primitive_calls, calls, tottime, cumtime, _callers) in stats.stats.items():
+        category = _categorize(func[0], func[2])
+        breakdown[category] = breakdown.get(category, 0.0) + tottime
+        rows.append({
+            **_function_label(func),
+            'category': category,
+            'calls': calls,
+            'tottime': round(tottime, 6),
+            'cumtime': round(cumtime, 6),
+        })
+
+    return {
+        'total_time': round(stats.total_tt, 6),
+        'breakdown': {k: round(v, 6) for k, v in sorted(breakdown.items(), key=lambda kv: -kv[1])},
+        'hot_functions': sorted(rows, key=lambda r: -r['tottime'])[:TOP_FUNCTIONS],
+        'cumulative': sorted(rows, key=lambda r: -r['cumtime'])[:TOP_FUNCTIONS],
+    }
+
+
+@contextmanager
+def capture(task_status):
+    """
+    Run the enclosed block under cProfile and store the result as the task's TaskProfile,
+    with the wall time of the provider calls made from any thread of the run.
+    A retried task overwrites the profile of the previous attempt.
+    """
+    from .models import TaskProfile
+
+    profiler = cProfile.Profile()
+    provider_calls = ProviderCalls()
+    token = _provider_calls.set(provider_calls)
+    start = time.perf_counter()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        wall_time = time.perf_counter() - start
+        _provider_calls.reset(token)
+        stats = pstats.Stats(profiler)
+        TaskProfile.objects.update_or_create(
+            task_status=task_status,
+            defaults={
+                'profiler': 'cProfile',
+                'wall_time': wall_time,
+                'summary': {**summarize(stats), 'provider_calls': provider_calls.summary()},
+                'stats': zlib.compress(marshal.dumps(stats.stats)),
+            }
+        )
+
+
+def load_pstats_bytes(profile) -> bytes:
+    """Raw pstats file contents, loadable with pstats.Stats / snakeviz"""
+    return zlib.decompress(bytes(profile.stats))
@@ -0,0 +1,182 @@
+# app/providers.py
+import time
+import logging
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from django.conf import settings
+from .deadline import DeadlineExceeded
+from .http_transport import refresh_pool_metrics
+from .metrics import PROVIDER_LATENCY, PROVIDER_ERRORS, PROVIDER_RETRIES, PROVIDER_HEDGES
+from .profiling import record_provider_call
+
+logger = logging.getLogger(__name__)
+
+# Calls with a timeout run in their provider's executor so the caller can stop
+# waiting; a hedged call uses two slots. Each provider gets its own executor,
+# sized to its PROVIDER_CONCURRENCY, so calls waiting for one provider's slots
+# never hold the threads another provider needs. Abandoned calls are bounded by
+# the SDK-level request timeouts; one still waiting for a provider slot gives it
+# up without sending its request.
+_executors = {}
+_executor_lock = threading.Lock()
+
+
+def _get_executor(provider):
+    with _executor_lock:
+        if provider not in _executors:
+            _executors[provider] = ThreadPoolExecutor(
+                max_workers=settings.PROVIDER_CONCURRENCY.get(provider) or settings.PROVIDER_CALL_THREADS,
+                thread_name_prefix=f'provider-call-{provider}'
+            )
+        return _executors[provider]
+
+
+_provider_slots = {}
+
+
+def _slots(provider):
+    """Per-process semaphore capping concurrent requests to ``provider``"""
+    with _executor_lock:
+        if provider not in _provider_slots:
+            limit = settings.PROVIDER_CONCURRENCY.get(provider)
+            _provider_slots[provider] = threading.BoundedSemaphore(limit) if limit else None
+        return _provider_slots[provider]
+
+
+def _limited(provider, func, abandoned: threading.Event | None = None):
+    """
+    Wrap ``func`` so each request (including hedges) holds one provider slot.
+    Once ``abandoned`` is set, a call that only now gets its slot returns None
+    without sending the request: nobody waits for its result any more.
+    """
+    slots = _slots(provider)
+    if slots is None:
+        return func
+
+    def call(*args, **kwargs):
+        with slots:
+            if abandoned is not None and abandoned.is_set():
+                return None
+            return func(*args, **kwargs)
+    return call
+
+
+class LatencyTracker:
+    """Rolling per-(provider, operation) latency window for hedging decisions"""
+
+    def __init__(self, window: int = 200, min_samples: int = 20):
+        self.window = window
+        self.min_samples = min_samples
+        self._samples = {}
+        self._lock = threading.Lock()
+
+    def observe(self, key, seconds: float):
+        with self._lock:
+            self._samples.setdefault(key, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, key, q: float) -> float | None:
+        """q-th percentile (0-1) of recent successful calls, None until min_samples"""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+latency_tracker = LatencyTracker()
+
+
+def _run_with_deadline(provider, operation, func, args, kwargs, timeout, hedge):
+    """
+    Run ``func`` in the provider executor, waiting at most ``timeout`` seconds.
+    With ``hedge``, a duplicate request is issued once the call passes the recent
+    p95 latency; the first successful response wins.
+    """
+    executor = _get_executor(provider)
+    started = time.monotonic()
+    abandoned = threading.Event()
+    # Waiting for a slot counts against the timeout
+    func = _limited(provider, func, abandoned)
+    submitted = [executor.submit(func, *args, **kwargs)]
+    try:
+        hedge_after = latency_tracker.percentile((provider, operation), 0.95) if hedge else None
+        if hedge_after is not None and (timeout is None or hedge_after < timeout):
+            done, _ = wait(submitted, timeout=hedge_after)
+            if not done:
+                PROVIDER_HEDGES.labels(provider, operation).inc()
+                submitted.append(executor.submit(func, *args, **kwargs))
+
+        futures = list(submitted)
+        last_exc = None
+        while futures:
+            remaining = None if timeout is None else timeout - (time.monotonic() - started)
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = wait(futures, timeout=remaining, return_when=FIRST_COMPLETED)
+            if not done:
+                break
+            for future in done:
+                if future.exception() is None:
+                    return future.result()
+                last_exc = future.exception()
+            futures = list(pending)
+
+        if last_exc is not None and not futures:
+            raise last_exc
+        raise DeadlineExceeded(f"{provider} {operation} exceeded its {timeout:.1f}s budget")
+    finally:
+        # Calls still queued or waiting for a slot are dropped instead of sent
+        abandoned.set()
+        for future in submitted:
+            future.cancel()
+
+
+def call_provider(provider: str, operation: str, func, *args, no_retry=(), timeout=None, hedge=False, **kwargs):
+    """
+    Call an external provider (Tavily, Gemini) with latency/error metrics and retries.
+
+    Args:
+        provider: Provider label, e.g. 'tavily' or 'gemini'
+        operation: Operation label, e.g. 'search' or the model name
+        func: Callable performing the request
+        no_retry: Exception types that should fail immediately (bad key, bad request)
+        timeout: Total seconds for all attempts (see app/deadline.py); None waits indefinitely
+        hedge: Issue a duplicate request when an attempt passes the recent p95 latency
+    """
+    max_retries = settings.PROVIDER_MAX_RETRIES
+    expires = None if timeout is None else time.monotonic() + timeout
+
+    for attempt in range(max_retries + 1):
+        attempt_timeout = None if expires is None else expires - time.monotonic()
+        if attempt_timeout is not None and attempt_timeout <= 0:
+            raise DeadlineExceeded(f"{provider} {operation} has no time budget left")
+
+        start = time.perf_counter()
+        try:
+            try:
+                if attempt_timeout is None and not hedge:
+                    result = _limited(provider, func)(*args, **kwargs)
+                else:
+                    result = _run_with_deadline(provider, operation, func, args, kwargs, attempt_timeout, hedge)
+            finally:
+                # Measured before any retry backoff, which is not provider latency
+                elapsed = time.perf_counter() - start
+                PROVIDER_LATENCY.labels(provider, operation).observe(elapsed)
+                record_provider_call(provider, operation, elapsed)
+                refresh_pool_metrics()
+            latency_tracker.observe((provider, operation), elapsed)
+            return result
+        except Exception as exc:
+            PROVIDER_ERRORS.labels(provider, operation, type(exc).__name__).inc()
+            if isinstance(exc, (DeadlineExceeded, *no_retry)) or attempt == max_retries:
+                raise
+            delay = settings.PROVIDER_RETRY_BACKOFF * (2 ** attempt)
+            if expires is not None and time.monotonic() + delay >= expires:
+                raise
+            PROVIDER_RETRIES.labels(provider, operation).inc()
+            logger.warning(
+                f"{provider} {operation} failed ({exc!r}), retrying in {delay:.1f}s "
+                f"(attempt {attempt + 1}/{max_retries})"
+            )
+            time.sleep(delay)
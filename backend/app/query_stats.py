@@ -0,0 +1,157 @@
+# app/query_stats.py
+# SQL query stats per API request and per Celery task.
+#
+# An execute wrapper, added to every database connection as it is created (see
+# AppConfig.ready), adds each statement to the QueryStats held in a ContextVar.
+# Outside record() it only costs the ContextVar lookup. QueryStatsMiddleware
+# records API requests and the task_prerun/task_postrun handlers in
+# backend/celery.py record tasks. Both report counts and time to Prometheus and
+# log the slowest statements of anything over QUERY_BUDGET_* / QUERY_TIME_BUDGET_MS.
+import contextvars
+import heapq
+import logging
+import threading
+import time
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+
+from .metrics import DB_QUERIES, DB_QUERY_DURATION
+
+logger = logging.getLogger(__name__)
+
+COUNT_HEADER = 'X-DB-Query-Count'
+TIME_HEADER = 'X-DB-Query-Time-Ms'
+
+_current = contextvars.ContextVar('query_stats', default=None)
+_tasks = {}  # task_id -> (QueryStats, ContextVar token)
+
+
+class QueryStats:
+    """Query count, total time and the slowest statements of one request or task"""
+
+    def __init__(self, keep_slowest: int | None = None, parent: 'QueryStats | None' = None):
+        self.count = 0
+        self.duration = 0.0
+        self.keep_slowest = settings.QUERY_STATS_SLOWEST if keep_slowest is None else keep_slowest
+        self._slowest = []  # min-heap of (seconds, sequence, sql)
+        # Graph nodes and article fetches can query from several threads at once
+        self._lock = threading.Lock()
+        # Enclosing record() block, which counts the same statements
+        self.parent = parent
+
+    def add(self, sql: str, duration: float):
+        with self._lock:
+            self.count += 1
+            self.duration += duration
+            if self.keep_slowest:
+                entry = (duration, self.count, sql)
+                if len(self._slowest) < self.keep_slowest:
+                    heapq.heappush(self._slowest, entry)
+                else:
+                    heapq.heappushpop(self._slowest, entry)
+        if self.parent is not None:
+            self.parent.add(sql, duration)
+
+    @property
+    def slowest(self) -> list:
+        """(seconds, sql) of the slowest statements, slowest first"""
+        with self._lock:
+            return [(duration, sql) for duration, _, sql in sorted(self._slowest, reverse=True)]
+
+    def describe(self) -> str:
+        lines = [f"{self.count} queries in {self.duration * 1000:.1f}ms"]
+        lines += [f"  {duration * 1000:.1f}ms {sql[:500]}" for duration, sql in self.slowest]
+        return '\n'.join(lines)
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.add(sql, time.perf_counter() - start)
+
+
+def install(connection, **kwargs):
+    """connection_created receiver; also safe to call on an open connection"""
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+@contextmanager
+def record(stats: QueryStats | None = None):
+    """Collect the queries run inside the block (including sync_to_async calls); nested blocks also count in the outer one"""
+    stats = stats or QueryStats(parent=_current.get())
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def report(kind: str, name: str, stats: QueryStats, budget: int):
+    DB_QUERIES.labels(kind=kind, name=name).observe(stats.count)
+    DB_QUERY_DURATION.labels(kind=kind, name=name).observe(stats.duration)
+    if stats.count > budget or stats.duration * 1000 > settings.QUERY_TIME_BUDGET_MS:
+        logger.warning(
+            f"Query budget exceeded by {kind} {name} "
+            f"(budget {budget} queries / {settings.QUERY_TIME_BUDGET_MS:.0f}ms): {stats.describe()}"
+        )
+
+
+def start_task(task_id: str):
+    stats = QueryStats()
+    _tasks[task_id] = (stats, _current.set(stats))
+
+
+def finish_task(task_id: str, name: str):
+    entry = _tasks.pop(task_id, None)
+    if entry is None:
+        return
+    stats, token = entry
+    try:
+        _current.reset(token)
+    except ValueError:
+        # postrun ran in another context than prerun; nothing is left set here
+        pass
+    report('task', name, stats, settings.QUERY_BUDGET_TASK)
+
+
+class QueryStatsMiddleware:
+    """Record each request's queries and return them in X-DB-Query-* headers"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.QUERY_STATS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        with record() as stats:
+            response = self.get_response(request)
+        return self._finish(request, response, stats)
+
+    async def __acall__(self, request):
+        with record() as stats:
+            response = await self.get_response(request)
+        return self._finish(request, response, stats)
+
+    def _finish(self, request, response, stats):
+        match = request.resolver_match
+        report('http', match.route if match else 'unmatched', stats, settings.QUERY_BUDGET_REQUEST)
+        response[COUNT_HEADER] = str(stats.count)
+        response[TIME_HEADER] = f"{stats.duration * 1000:.1f}"
+        return response
@@ -0,0 +1,33 @@
+# app/queues.py
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+from .state_store import get_state_store
+
+
+@lru_cache(maxsize=1)
+def get_redis():
+    """Shared Redis connection for the Celery broker database"""
+    return redis.Redis.from_url(settings.CELERY_BROKER_URL)
+
+
+def queue_depths(queues=None) -> dict:
+    """Number of messages waiting in each Celery queue on the Redis broker"""
+    queues = queues or settings.METRICS_CELERY_QUEUES
+    client = get_redis()
+    pipe = client.pipeline()
+    for queue in queues:
+        pipe.llen(queue)
+    return dict(zip(queues, pipe.execute()))
+
+
+def in_flight_counts() -> dict:
+    """Number of PROCESSING research tasks, keyed by task_type (from live task state)"""
+    counts = {}
+    for state in get_state_store().all_active().values():
+        if state.get('status') == 'PROCESSING':
+            task_type = state.get('task_type', 'UNKNOWN')
+            counts[task_type] = counts.get(task_type, 0) + 1
+    return counts
@@ -0,0 +1,258 @@
+# app/retention.py
+# Retention policies for task and report history, applied daily by the
+# apply_retention_policies task (RETENTION_* settings, 0 disables a policy):
+#
+# - FAILED/CANCELLED TaskStatus rows (and their profiles) are deleted
+#   RETENTION_FAILED_TASK_DAYS after their last update.
+# - Reports older than RETENTION_REPORT_ARCHIVE_DAYS are archived. Their full
+#   record goes to a gzip JSON-lines file under RETENTION_ARCHIVE_DIR, and the
+#   bulky fields (sources, analysis_meta, minhash) are cleared in the database.
+#   The summary, score, alerts and metrics stay queryable.
+# - Monthly partitions are created ahead of time for the history tables that
+#   were converted with the partition_history command (Postgres only).
+#
+# Deleted tasks never show up as changes in task list deltas, so a prune that
+# deleted tasks is recorded in Redis (TASKS_PRUNED_KEY) and deltas whose cursor
+# predates it are answered with the full list.
+#
+# All passes work in small primary-key batches, each in its own short
+# transaction, so they never hold long locks on the hot tables.
+import gzip
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone as dt_timezone
+
+import redis
+from django.conf import settings
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+
+from .queues import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Tables that may be range-partitioned by month, with their partition column.
+# Only tables without incoming foreign keys or unique constraints qualify
+# (Postgres requires the partition column in every unique key).
+PARTITIONED_TABLES = {
+    'app_riskmetric': 'created_at',
+}
+
+# Epoch seconds of the last prune_tasks run that deleted tasks
+TASKS_PRUNED_KEY = 'retention:tasks_pruned_at'
+
+# Report fields moved to the archive; the rest stay in the database
+ARCHIVED_FIELDS = {'sources': list, 'analysis_meta': dict, 'minhash': list}
+
+
+def _pause():
+    if settings.RETENTION_BATCH_PAUSE_SECONDS:
+        time.sleep(settings.RETENTION_BATCH_PAUSE_SECONDS)
+
+
+def delete_in_batches(queryset, batch_size: int | None = None) -> int:
+    """Delete the rows of ``queryset`` by primary key in small batches; returns rows deleted (cascades included)"""
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    model = queryset.model
+    total = 0
+    while True:
+        batch = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not batch:
+            return total
+        deleted, _ = model.objects.filter(pk__in=batch).delete()
+        total += deleted
+        if len(batch) < batch_size:
+            return total
+        _pause()
+
+
+def prune_tasks(now=None) -> int:
+    """Delete FAILED/CANCELLED tasks last updated more than RETENTION_FAILED_TASK_DAYS ago"""
+    from .models import TaskStatus
+
+    if not settings.RETENTION_FAILED_TASK_DAYS:
+        return 0
+    cutoff = (now or timezone.now()) - timezone.timedelta(days=settings.RETENTION_FAILED_TASK_DAYS)
+    expired = TaskStatus.objects.filter(status__in=('FAILED', 'CANCELLED'), updated_at__lt=cutoff)
+    if not expired.exists():
+        return 0
+    try:
+        return delete_in_batches(expired)
+    finally:
+        # Also after a partial failure: some tasks may be gone
+        _mark_tasks_pruned()
+
+
+def _mark_tasks_pruned():
+    try:
+        get_redis().set(TASKS_PRUNED_KEY, time.time())
+    except redis.RedisError as exc:
+        logger.error(f"Could not record the task prune, task list deltas will not drop deleted tasks: {exc}")
+
+
+def tasks_pruned_at() -> float | None:
+    """When prune_tasks last deleted tasks (epoch seconds, None if never); raises redis.RedisError"""
+    value = get_redis().get(TASKS_PRUNED_KEY)
+    return float(value) if value is not None else None
+
+
+def _report_record(report) -> dict:
+    return {
+        'id': report.id,
+        'industry': report.industry,
+        'fragility_score': report.fragility_score,
+        'executive_summary': report.executive_summary,
+        'critical_alerts': report.critical_alerts,
+        'risk_metrics': report.risk_metrics,
+        'sources': report.sources,
+        'analysis_meta': report.analysis_meta,
+        'fingerprint': report.fingerprint,
+        'minhash': report.minhash,
+        'carried_over_from': report.carried_over_from_id,
+        'created_at': report.created_at.isoformat(),
+    }
+
+
+def _write_archive(relative_path: str, records: list):
+    """Write records as gzip JSON lines; written to a temp file and renamed, so re-runs just overwrite"""
+    path = os.path.join(settings.RETENTION_ARCHIVE_DIR, relative_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as archive:
+        for record in records:
+            archive.write(json.dumps(record, separators=(',', ':')) + '\n')
+    os.replace(tmp_path, path)
+
+
+def archive_reports(now=None, batch_size: int | None = None) -> dict:
+    """Archive reports created more than RETENTION_REPORT_ARCHIVE_DAYS ago"""
+    from .models import SupplyChainReport
+
+    if not settings.RETENTION_REPORT_ARCHIVE_DAYS:
+        return {'archived': 0, 'files': 0}
+    batch_size = batch_size or settings.RETENTION_BATCH_SIZE
+    now = now or timezone.now()
+    cutoff = now - timezone.timedelta(days=settings.RETENTION_REPORT_ARCHIVE_DAYS)
+    pending = SupplyChainReport.objects.filter(archived_at__isnull=True, created_at__lt=cutoff).order_by('pk')
+
+    archived = files = 0
+    while True:
+        batch = list(pending[:batch_size])
+        if not batch:
+            break
+        # One file per month and batch; the name only depends on the rows, so a
+        # batch that failed after writing its file is rewritten under the same name
+        by_month = {}
+        for report in batch:
+            by_month.setdefault(report.created_at.strftime('%Y-%m'), []).append(report)
+        for month, reports in by_month.items():
+            relative_path = os.path.join('reports', month, f"reports-{reports[0].id}-{reports[-1].id}.jsonl.gz")
+            _write_archive(relative_path, [_report_record(report) for report in reports])
+            with transaction.atomic():
+                SupplyChainReport.objects.filter(pk__in=[report.pk for report in reports]).update(
+                    archived_at=now,
+                    archive_file=relative_path,
+                    **{field: empty() for field, empty in ARCHIVED_FIELDS.items()}
+                )
+            archived += len(reports)
+            files += 1
+        if len(batch) < batch_size:
+            break
+        _pause()
+    return {'archived': archived, 'files': files}
+
+
+def read_archived_report(report) -> dict | None:
+    """Full archived record of ``report`` (None if it was not archived or the file is gone)"""
+    if not report.archive_file:
+        return None
+    path = os.path.join(settings.RETENTION_ARCHIVE_DIR, report.archive_file)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as archive:
+            for line in archive:
+                record = json.loads(line)
+                if record['id'] == report.id:
+                    return record
+    except FileNotFoundError:
+        logger.warning(f"Archive file {path} of report {report.id} is missing")
+    return None
+
+
+def _month_start(moment) -> datetime:
+    return datetime(moment.year, moment.month, 1, tzinfo=dt_timezone.utc)
+
+
+def _next_month(month: datetime) -> datetime:
+    return month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+
+
+def partition_name(table: str, month: datetime) -> str:
+    return f"{table}_{month:%Y%m}"
+
+
+def is_partitioned(table: str) -> bool:
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table p JOIN pg_class c ON c.oid = p.partrelid "
+            "WHERE c.relname = %s AND c.relnamespace = to_regnamespace(current_schema())",
+            [table]
+        )
+        return cursor.fetchone() is not None
+
+
+def partition_statements(table: str, start: datetime, months_ahead: int | None = None) -> list:
+    """(partition, CREATE statement) for each month of ``table`` from ``start`` to months_ahead after now"""
+    months_ahead = settings.RETENTION_PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead
+    quote = connection.ops.quote_name
+    last = _month_start(timezone.now())
+    for _ in range(months_ahead):
+        last = _next_month(last)
+
+    statements = []
+    month = _month_start(start)
+    while month <= last:
+        upper = _next_month(month)
+        name = partition_name(table, month)
+        statements.append((name, (
+            f"CREATE TABLE IF NOT EXISTS {quote(name)} PARTITION OF {quote(table)} "
+            f"FOR VALUES FROM ('{month.isoformat()}') TO ('{upper.isoformat()}')"
+        )))
+        month = upper
+    return statements
+
+
+def ensure_partitions() -> list:
+    """
+    Make sure this month's and the next RETENTION_PARTITION_MONTHS_AHEAD partitions
+    of every partitioned table exist; returns the partitions that are in place.
+    """
+    ensured = []
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(table):
+            continue
+        for name, statement in partition_statements(table, timezone.now()):
+            try:
+                with transaction.atomic(), connection.cursor() as cursor:
+                    cursor.execute(statement)
+                ensured.append(name)
+            except DatabaseError as exc:
+                # E.g. rows for that month already landed in the default partition
+                logger.error(f"Could not create partition {name}: {exc}")
+    return ensured
+
+
+def apply_policies() -> dict:
+    """Run every retention policy; each one is independent of the others' failures"""
+    results = {}
+    for name, policy in (('pruned_tasks', prune_tasks), ('reports', archive_reports), ('partitions', ensure_partitions)):
+        try:
+            results[name] = policy()
+        except Exception as exc:
+            logger.exception(f"Retention policy {name} failed: {exc}")
+            results[name] = None
+    logger.info(f"Retention: {results}")
+    return results
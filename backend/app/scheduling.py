@@ -0,0 +1,87 @@
+# app/scheduling.py
+# Staggered dispatch of scheduled research.
+#
+# One periodic task (dispatch_scheduled_research) replaces the per-industry
+# crontabs: it queues setup_scheduled_research for every industry with a
+# deterministic offset inside SCHEDULED_RESEARCH_WINDOW, so runs are spread out
+# instead of all starting at 09:00. On top of that, at most
+# SCHEDULED_RESEARCH_MAX_CONCURRENT scheduled runs execute at once; the others
+# are deferred (see run_research_task).
+import hashlib
+import logging
+
+import redis
+from django.conf import settings
+
+from .queues import get_redis
+
+logger = logging.getLogger(__name__)
+
+RUNNING_KEY = 'scheduled_research:running'
+
+
+def _industry_key(industry: str) -> int:
+    digest = hashlib.sha256(industry.strip().lower().encode()).digest()
+    return int.from_bytes(digest[:8], 'big')
+
+
+def dispatch_plan(industries=None, window: int = None) -> list:
+    """
+    (offset seconds, industry) for each industry, in run order. Industries are
+    ordered by a hash of their name (stable across processes and deploys) and
+    spaced evenly over the window.
+    """
+    industries = list(dict.fromkeys(industries or settings.SCHEDULED_RESEARCH_INDUSTRIES))
+    window = settings.SCHEDULED_RESEARCH_WINDOW if window is None else window
+    ordered = sorted(industries, key=_industry_key)
+    spacing = max(0, window) / max(1, len(ordered))
+    return [(int(index * spacing), industry) for index, industry in enumerate(ordered)]
+
+
+def _stale_after() -> float:
+    # A slot outlives its run only if the worker died without releasing it
+    budgets = settings.RESEARCH_DEADLINE_SECONDS
+    return budgets.get('SCHEDULED', budgets['DEFAULT']) * 2
+
+
+# Runs atomically in Redis and scores slots with the server clock (TIME), so
+# neither racing workers nor drifting worker clocks can exceed the cap.
+# KEYS[1]: slot set; ARGV: task id, stale-after seconds, cap.
+ACQUIRE_SCRIPT = """
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', now - tonumber(ARGV[2]))
+if redis.call('ZSCORE', KEYS[1], ARGV[1]) or redis.call('ZCARD', KEYS[1]) < tonumber(ARGV[3]) then
+    redis.call('ZADD', KEYS[1], now, ARGV[1])
+    return 1
+end
+return 0
+"""
+
+
+def acquire_slot(task_id: str) -> bool:
+    """
+    Take one of the SCHEDULED_RESEARCH_MAX_CONCURRENT run slots for ``task_id``.
+    Slots are members of a sorted set scored by start time (for stale slot
+    cleanup); a task that already holds one keeps it. Fails open when Redis is
+    unavailable.
+    """
+    limit = settings.SCHEDULED_RESEARCH_MAX_CONCURRENT
+    if limit <= 0:
+        return True
+
+    try:
+        acquired = get_redis().register_script(ACQUIRE_SCRIPT)(
+            keys=[RUNNING_KEY], args=[task_id, _stale_after(), limit]
+        )
+        return bool(acquired)
+    except redis.RedisError as exc:
+        logger.warning(f"Scheduled run cap unavailable, running {task_id}: {exc}")
+        return True
+
+
+def release_slot(task_id: str):
+    try:
+        get_redis().zrem(RUNNING_KEY, task_id)
+    except redis.RedisError as exc:
+        logger.warning(f"Could not release scheduled run slot of {task_id}: {exc}")
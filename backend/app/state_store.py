@@ -0,0 +1,224 @@
+# app/state_store.py
+# Live state for in-flight research tasks.
+#
+# Workers write status/progress/started_at here instead of re-saving the TaskStatus
+# row on every step; status polls overlay it on the durable row. TaskStatus is only
+# written on terminal transitions and by the periodic sync_task_state flush.
+import threading
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from functools import lru_cache
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+
+# DB statuses that live state may override. COMPLETED/CANCELLED rows are final.
+OVERRIDABLE_STATUSES = ('PENDING', 'PROCESSING', 'FAILED')
+
+INT_FIELDS = ('progress',)
+FLOAT_FIELDS = ('updated_at',)
+
+
+class TaskStateStore(ABC):
+    """Interface for live task state keyed by task_id"""
+
+    @abstractmethod
+    def set(self, task_id: str, **fields):
+        """Merge fields into the task's live state and bump its updated_at"""
+
+    @abstractmethod
+    def get(self, task_id: str) -> dict | None:
+        """Live state of the task, None if it has none (or it expired)"""
+
+    @abstractmethod
+    def get_many(self, task_ids) -> dict:
+        """Map of task_id -> state for the ids that have live state"""
+
+    @abstractmethod
+    def delete(self, task_id: str):
+        """Drop the task's live state"""
+
+    @abstractmethod
+    def all_active(self) -> dict:
+        """Map of task_id -> state for every task with live state"""
+
+    def changed_since(self, since: float) -> dict:
+        """Map of task_id -> state for the tasks whose live state was set after ``since`` (epoch seconds)"""
+        return {
+            task_id: state
+            for task_id, state in self.all_active().items()
+            if state['updated_at'] > since
+        }
+
+    async def aget(self, task_id: str) -> dict | None:
+        return await sync_to_async(self.get, thread_sensitive=False)(task_id)
+
+    async def aget_many(self, task_ids) -> dict:
+        return await sync_to_async(self.get_many, thread_sensitive=False)(task_ids)
+
+    async def aall_active(self) -> dict:
+        return await sync_to_async(self.all_active, thread_sensitive=False)()
+
+    async def achanged_since(self, since: float) -> dict:
+        return await sync_to_async(self.changed_since, thread_sensitive=False)(since)
+
+    @staticmethod
+    def _serialize(fields: dict) -> dict:
+        return {
+            key: value.isoformat() if isinstance(value, datetime) else value
+            for key, value in fields.items()
+            if value is not None
+        }
+
+    @staticmethod
+    def _deserialize(raw: dict) -> dict:
+        state = dict(raw)
+        for key in INT_FIELDS:
+            if key in state:
+                state[key] = int(state[key])
+        for key in FLOAT_FIELDS:
+            if key in state:
+                state[key] = float(state[key])
+        return state
+
+
+class InMemoryTaskStateStore(TaskStateStore):
+    """
+    Process-local store for tests and single-process development. Like the Redis
+    store, a task's state expires ``ttl`` seconds after its last update.
+    """
+
+    def __init__(self, ttl: int | None = None):
+        self.ttl = ttl
+        self._states = {}
+        self._lock = threading.Lock()
+
+    def _live(self, task_id):
+        """The task's raw state, dropping it when it has expired (call with the lock held)"""
+        state = self._states.get(task_id)
+        if state and self.ttl is not None and time.time() - state['updated_at'] > self.ttl:
+            del self._states[task_id]
+            return None
+        return state
+
+    def set(self, task_id, **fields):
+        with self._lock:
+            state = self._live(str(task_id)) or self._states.setdefault(str(task_id), {})
+            state.update(self._serialize(fields))
+            state['updated_at'] = time.time()
+
+    def get(self, task_id):
+        with self._lock:
+            state = self._live(str(task_id))
+            return self._deserialize(state) if state else None
+
+    def get_many(self, task_ids):
+        with self._lock:
+            states = {str(task_id): self._live(str(task_id)) for task_id in task_ids}
+            return {task_id: self._deserialize(state) for task_id, state in states.items() if state}
+
+    def delete(self, task_id):
+        with self._lock:
+            self._states.pop(str(task_id), None)
+
+    def all_active(self):
+        with self._lock:
+            states = {task_id: self._live(task_id) for task_id in list(self._states)}
+            return {task_id: self._deserialize(state) for task_id, state in states.items() if state}
+
+    def clear(self):
+        with self._lock:
+            self._states.clear()
+
+
+class RedisTaskStateStore(TaskStateStore):
+    """
+    One hash per task (``task_state:<id>``, expiring after TASK_STATE_TTL) plus a
+    sorted set of active task ids scored by their last update time.
+    """
+
+    KEY_PREFIX = 'task_state:'
+    ACTIVE_KEY = 'task_state:active'
+
+    def __init__(self, url: str, ttl: int):
+        import redis
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.ttl = ttl
+
+    def _key(self, task_id):
+        return f"{self.KEY_PREFIX}{task_id}"
+
+    def set(self, task_id, **fields):
+        now = time.time()
+        mapping = self._serialize(fields)
+        mapping['updated_at'] = now
+        pipe = self.client.pipeline()
+        pipe.hset(self._key(task_id), mapping=mapping)
+        pipe.expire(self._key(task_id), self.ttl)
+        pipe.zadd(self.ACTIVE_KEY, {str(task_id): now})
+        pipe.execute()
+
+    def get(self, task_id):
+        raw = self.client.hgetall(self._key(task_id))
+        return self._deserialize(raw) if raw else None
+
+    def get_many(self, task_ids):
+        task_ids = [str(task_id) for task_id in task_ids]
+        if not task_ids:
+            return {}
+        pipe = self.client.pipeline()
+        for task_id in task_ids:
+            pipe.hgetall(self._key(task_id))
+        return {
+            task_id: self._deserialize(raw)
+            for task_id, raw in zip(task_ids, pipe.execute())
+            if raw
+        }
+
+    def delete(self, task_id):
+        pipe = self.client.pipeline()
+        pipe.delete(self._key(task_id))
+        pipe.zrem(self.ACTIVE_KEY, str(task_id))
+        pipe.execute()
+
+    def all_active(self):
+        task_ids = self.client.zrange(self.ACTIVE_KEY, 0, -1)
+        states = self.get_many(task_ids)
+        # Hashes that expired without a terminal transition leave dangling members
+        expired = [task_id for task_id in task_ids if task_id not in states]
+        if expired:
+            self.client.zrem(self.ACTIVE_KEY, *expired)
+        return states
+
+    def changed_since(self, since):
+        # Members are scored by their last update, so only changed hashes are read
+        return self.get_many(self.client.zrangebyscore(self.ACTIVE_KEY, f"({since}", '+inf'))
+
+
+@lru_cache(maxsize=None)
+def _build_store(backend: str) -> TaskStateStore:
+    if backend == 'memory':
+        return InMemoryTaskStateStore(settings.TASK_STATE_TTL)
+    if backend == 'redis':
+        return RedisTaskStateStore(settings.TASK_STATE_REDIS_URL, settings.TASK_STATE_TTL)
+    raise ValueError(f"Unknown TASK_STATE_STORE backend: {backend}")
+
+
+def get_state_store() -> TaskStateStore:
+    """Store selected by settings.TASK_STATE_STORE ('redis' or 'memory')"""
+    return _build_store(settings.TASK_STATE_STORE)
+
+
+def apply_live_state(task_status, state: dict | None):
+    """
+    Overlay live state on a TaskStatus instance (in memory, nothing is saved).
+    Returns the instance for convenience.
+    """
+    if not state or task_status.status not in OVERRIDABLE_STATUSES:
+        return task_status
+    task_status.status = state.get('status', task_status.status)
+    task_status.progress = state.get('progress', task_status.progress)
+    if state.get('started_at'):
+        task_status.started_at = datetime.fromisoformat(state['started_at'])
+    return task_status
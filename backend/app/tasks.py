@@ -1,15 +1,112 @@
 # app/tasks.py
 import uuid
 import traceback
+from contextlib import nullcontext
 from datetime import datetime
 from celery import shared_task
+from django.conf import settings
 from django.utils import timezone
-from django.db import transaction
-from .models import TaskStatus, SupplyChainReport
-from .agent import supply_chain_app
+from django.db import connection, transaction
+from .models import TaskStatus, SupplyChainReport, RiskMetric
+from .deadline import DeadlineExceeded, deadline_for
+from .metrics import record_task_outcome
+from .profiling import capture, should_profile
+from .state_store import OVERRIDABLE_STATUSES, apply_live_state, get_state_store
+from .retention import apply_policies, delete_in_batches
+from .scheduling import acquire_slot, dispatch_plan, release_slot
 
 
-@shared_task(bind=True, autoretry_for=(Exception,), retry_kwargs={'max_retries': 3, 'countdown': 60})
+def _execute_research(task_status, industry):
+    """Run the agent graph for a task and persist its report. Returns the report."""
+    # Progress lives in the state store; TaskStatus is written once, at the end
+    store = get_state_store()
+    task_id = str(task_status.task_id)
+    
+    task_status.status = 'PROCESSING'
+    task_status.started_at = timezone.now()
+    store.set(
+        task_id,
+        status='PROCESSING',
+        progress=10,
+        started_at=task_status.started_at,
+        task_type=task_status.task_type
+    )
+    
+    # Update progress
+    store.set(task_id, progress=25)
+    
+    # Initial State for the LangGraph
+    initial_state = {
+        "industry": industry,
+        "raw_data": [],
+        "sources": [],
+        "risk_report": "",
+        "critical_alerts": [],
+        "fragility_score": 0,
+        "risk_metrics": [],
+        "analyst_route": [],
+        "deadline": deadline_for(task_status.task_type),
+        "hedge": task_status.task_type in settings.HEDGE_TASK_TYPES,
+        "fingerprint": "",
+        "minhash": [],
+        "novelty": {},
+        "carried_over_from": None,
+        "analysis_mode": {}
+    }
+    
+    store.set(task_id, progress=50)
+    
+    if settings.RESEARCH_RELEASE_DB_DURING_RUN:
+        # Nothing needs the connection while we wait on the network; it is
+        # reopened on the next query.
+        connection.close()
+    
+    # Run the Agent (Gemini + Tavily logic happens here).
+    # Imported here so only workers pay for the langchain/langgraph stack.
+    from .agent import get_supply_chain_app
+    final_state = get_supply_chain_app().invoke(initial_state)
+    
+    store.set(task_id, progress=90)
+    
+    # Create report and update task status in a transaction
+    with transaction.atomic():
+        report = SupplyChainReport.objects.create(
+            industry=industry,
+            fragility_score=final_state["fragility_score"],
+            executive_summary=final_state["risk_report"],
+            critical_alerts=final_state["critical_alerts"],
+            risk_metrics=final_state["risk_metrics"],
+            sources=final_state.get("sources", []),
+            analysis_meta={
+                "model_route": final_state.get("analyst_route", []),
+                "novelty": final_state.get("novelty", {}),
+                "analysis": final_state.get("analysis_mode", {})
+            },
+            fingerprint=final_state.get("fingerprint", ""),
+            minhash=final_state.get("minhash", []),
+            carried_over_from_id=final_state.get("carried_over_from")
+        )
+        RiskMetric.objects.bulk_create(RiskMetric.rows_for(report))
+        
+        # Update task status to completed
+        task_status.status = 'COMPLETED'
+        task_status.progress = 100
+        task_status.completed_at = timezone.now()
+        task_status.report = report
+        task_status.save()
+    
+    store.delete(task_id)
+    return report
+
+
+# A run that blew its deadline is not retried: the budget is spent and for
+# interactive requests a late answer is no better than a failure.
+@shared_task(
+    bind=True,
+    autoretry_for=(Exception,),
+    dont_autoretry_for=(DeadlineExceeded,),
+    retry_kwargs={'max_retries': 3, 'countdown': settings.RESEARCH_RETRY_COUNTDOWN}
+)
 def run_research_task(self, task_id: str, industry: str):
     """
     Celery task for running supply chain research asynchronously.
@@ -18,56 +115,28 @@ def run_research_task(self, task_id: str, industry: str):
         task_id: UUID string of the TaskStatus record
         industry: Industry to research
     """
+    capped = False
     try:
-        # Get or update task status
         task_status = TaskStatus.objects.get(task_id=task_id)
-        task_status.status = 'PROCESSING'
-        task_status.started_at = timezone.now()
-        task_status.progress = 10
-        task_status.save()
-        
-        # Update progress
-        task_status.progress = 25
-        task_status.save()
-        
-        # Initial State for the LangGraph
-        initial_state = {
-            "industry": industry,
-            "raw_data": [],
-            "sources": [],
-            "risk_report": "",
-            "critical_alerts": [],
-            "fragility_score": 0,
-            "risk_metrics": []
-        }
-        
-        task_status.progress = 50
-        task_status.save()
         
-        # Run the Agent (Gemini + Tavily logic happens here)
-        final_state = supply_chain_app.invoke(initial_state)
+        # Scheduled runs share SCHEDULED_RESEARCH_MAX_CONCURRENT slots; when they
+        # are all taken the run is queued again for later (as a new message, so
+        # it doesn't use up the retries meant for failures)
+        if task_status.task_type == 'SCHEDULED':
+            if not acquire_slot(task_id):
+                run_research_task.apply_async(
+                    args=[task_id, industry], countdown=settings.SCHEDULED_RESEARCH_DEFER_SECONDS
+                )
+                record_task_outcome(task_status.task_type, 'DEFERRED')
+                return {'task_id': task_id, 'status': 'DEFERRED', 'industry': industry}
+            capped = True
         
-        task_status.progress = 90
-        task_status.save()
-        
-        # Create report and update task status in a transaction
-        with transaction.atomic():
-            report = SupplyChainReport.objects.create(
-                industry=industry,
-                fragility_score=final_state["fragility_score"],
-                executive_summary=final_state["risk_report"],
-                critical_alerts=final_state["critical_alerts"],
-                risk_metrics=final_state["risk_metrics"],
-                sources=final_state.get("sources", [])
-            )
-            
-            # Update task status to completed
-            task_status.status = 'COMPLETED'
-            task_status.progress = 100
-            task_status.completed_at = timezone.now()
-            task_status.report = report
-            task_status.save()
+        # Opt-in profiling, stored as the task's TaskProfile
+        profiler = capture(task_status) if task_status.profile_requested else nullcontext()
+        with profiler:
+            report = _execute_research(task_status, industry)
         
+        record_task_outcome(task_status.task_type, 'COMPLETED')
         return {
             'task_id': task_id,
             'status': 'COMPLETED',
@@ -77,6 +146,7 @@ def run_research_task(self, task_id: str, industry: str):
         
     except TaskStatus.DoesNotExist:
         # Task status record was deleted, task should be cancelled
+        record_task_outcome('UNKNOWN', 'CANCELLED')
         return {
             'task_id': task_id,
             'status': 'CANCELLED',
@@ -84,17 +154,30 @@ def run_research_task(self, task_id: str, industry: str):
         }
     except Exception as exc:
         # Update task status to failed
+        store = get_state_store()
         try:
             task_status = TaskStatus.objects.get(task_id=task_id)
+            # Keep started_at from the live state, which may never have been flushed
+            apply_live_state(task_status, store.get(task_id))
             task_status.status = 'FAILED'
             task_status.error_message = str(exc)
             task_status.completed_at = timezone.now()
             task_status.save()
+            # autoretry_for will schedule another attempt until max_retries is reached
+            will_retry = (
+                self.request.retries < self.max_retries
+                and not isinstance(exc, DeadlineExceeded)
+            )
+            record_task_outcome(task_status.task_type, 'RETRIED' if will_retry else 'FAILED')
         except TaskStatus.DoesNotExist:
             pass
+        store.delete(task_id)
         
         # Re-raise exception to trigger Celery retry mechanism
         raise
+    finally:
+        if capped:
+            release_slot(task_id)
 
 
 @shared_task
@@ -107,51 +190,123 @@ def setup_scheduled_research(industries=None, force_update=False):
         industries: List of industries to research (default: all key industries)
         force_update: If True, ignore recent report check and create tasks anyway
     """
-    # Default key industries to monitor
-    default_industries = [
-        'Automotive',
-        'Technology',
-        'Healthcare',
-        'Manufacturing',
-        'Energy',
-        'Pharmaceuticals',
-        'Semiconductors'
-    ]
-    
-    # Use provided industries or default
-    industries_to_check = industries or default_industries
+    # Use provided industries or the key industries we monitor
+    industries_to_check = industries or settings.SCHEDULED_RESEARCH_INDUSTRIES
     
-    created_tasks = []
+    # Industries with a report from the last 7 days, in one query
+    recent_industries = set(
+        SupplyChainReport.objects.filter(
+            industry__in=industries_to_check,
+            created_at__gte=timezone.now() - timezone.timedelta(days=7)
+        ).values_list('industry', flat=True).distinct()
+    )
     
-    for industry in industries_to_check:
-        # Check if we already have a recent report for this industry
-        recent_report = SupplyChainReport.objects.filter(
+    # Create the scheduled research tasks in one insert, then queue them
+    task_statuses = TaskStatus.objects.bulk_create([
+        TaskStatus(
+            task_id=str(uuid.uuid4()),
+            task_type='SCHEDULED',
             industry=industry,
-            created_at__gte=timezone.now() - timezone.timedelta(days=7)  # Within last 7 days
-        ).exists()
-        
-        if not recent_report or force_update:
-            # Create a new scheduled research task
-            task_id = str(uuid.uuid4())
-            
-            task_status = TaskStatus.objects.create(
-                task_id=task_id,
-                task_type='SCHEDULED',
-                industry=industry,
-                status='PENDING'
-            )
-            
-            # Queue the research task
-            run_research_task.delay(task_id, industry)
-            
-            created_tasks.append({
-                'task_id': task_id,
-                'industry': industry,
-                'task_status_id': task_status.id
-            })
+            status='PENDING',
+            profile_requested=should_profile()
+        )
+        for industry in industries_to_check
+        if force_update or industry not in recent_industries
+    ])
+    
+    created_tasks = []
+    for task_status in task_statuses:
+        run_research_task.delay(str(task_status.task_id), task_status.industry)
+        created_tasks.append(str(task_status.task_id))
     
+    # Keep the result compact: it is either ignored or held briefly in Redis
+    # (see CELERY_RESULT_POLICY), TaskStatus holds the details.
     return {
-        'created_tasks': created_tasks,
+        'created_task_ids': created_tasks,
         'total_created': len(created_tasks),
-        'industries_checked': industries_to_check
-    }
\ No newline at end of file
+        'industries_checked': len(industries_to_check)
+    }
+
+
+@shared_task(ignore_result=True)
+def dispatch_scheduled_research(industries=None, force_update=True, window=None):
+    """
+    Daily entry point for scheduled research: queue setup_scheduled_research for
+    each industry at its deterministic offset within SCHEDULED_RESEARCH_WINDOW.
+    """
+    plan = dispatch_plan(industries, window)
+    for offset, industry in plan:
+        setup_scheduled_research.apply_async(
+            kwargs={'industries': [industry], 'force_update': force_update},
+            countdown=offset
+        )
+    return {'dispatched': [{'industry': industry, 'offset': offset} for offset, industry in plan]}
+
+
+@shared_task(ignore_result=True)
+def cleanup_celery_results(batch_size=1000):
+    """
+    Delete django_celery_results rows older than CELERY_DB_RESULT_RETENTION_DAYS.
+    Runs in small batches so it never holds long locks on the results table.
+    """
+    from django_celery_results.models import TaskResult
+    
+    cutoff = timezone.now() - timezone.timedelta(days=settings.CELERY_DB_RESULT_RETENTION_DAYS)
+    return delete_in_batches(TaskResult.objects.filter(date_done__lt=cutoff), batch_size)
+
+
+@shared_task(ignore_result=True)
+def apply_retention_policies():
+    """
+    Daily retention pass: prune old failed/cancelled tasks, archive old reports
+    and create upcoming partitions (see app/retention.py).
+    """
+    return apply_policies()
+
+
+@shared_task(ignore_result=True)
+def sync_task_state():
+    """
+    Periodic flush of live task state to TaskStatus, plus crash reconciliation.
+    
+    - Live state is written to non-final TaskStatus rows (status, progress, started_at).
+    - Live state not updated for TASK_STATE_STALE_SECONDS belongs to a worker that died
+      without a terminal transition (and wasn't redelivered); the task is marked FAILED.
+    - PROCESSING rows with no live state at all (e.g. Redis was flushed) are failed
+      once their started_at is older than the same threshold.
+    """
+    store = get_state_store()
+    now = timezone.now()
+    stale_before = now.timestamp() - settings.TASK_STATE_STALE_SECONDS
+    lost_message = "Worker lost while processing (reconciled from live task state)"
+    
+    flushed = failed = 0
+    active = store.all_active()
+    for task_id, state in active.items():
+        rows = TaskStatus.objects.filter(task_id=task_id, status__in=OVERRIDABLE_STATUSES)
+        if state['updated_at'] < stale_before:
+            failed += rows.update(
+                status='FAILED',
+                error_message=lost_message,
+                completed_at=now,
+                updated_at=now
+            )
+            store.delete(task_id)
+            continue
+        
+        fields = {key: state[key] for key in ('status', 'progress') if key in state}
+        if state.get('started_at'):
+            fields['started_at'] = datetime.fromisoformat(state['started_at'])
+        flushed += rows.update(**fields, updated_at=now)
+    
+    failed += TaskStatus.objects.filter(
+        status='PROCESSING',
+        started_at__lt=now - timezone.timedelta(seconds=settings.TASK_STATE_STALE_SECONDS)
+    ).exclude(task_id__in=list(active)).update(
+        status='FAILED',
+        error_message=lost_message,
+        completed_at=now,
+        updated_at=now
+    )
+    
+    return {'flushed': flushed, 'failed': failed}
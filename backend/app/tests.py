@@ -1,3 +1,1512 @@
-from django.test import TestCase
+import contextvars
+import cProfile
+import importlib
+import json
+import os
+import pstats
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone as dt_timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+import redis
+from prometheus_client import REGISTRY
+from asgiref.sync import async_to_sync
+
+from django.conf import settings
+from django.db import connection
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from django.utils.connection import ConnectionDoesNotExist
+
+from app.agent import (
+    AnalystOutput, build_workflow, chunk_sources, get_structured_llm, get_tavily, map_reduce_analysis, reduce_analyses, route_analyst_model,
+)
+from app.articles import ArticleFetcher, extract_text, get_article_session, get_articles
+from app.db_router import ReplicaRouter, primary_reads, replica_reads, stick_to_primary
+from app.deadline import DeadlineExceeded, node_timeout
+from app.fingerprint import content_fingerprint, minhash, shingles, similarity
+from app.http_transport import get_session, pool_stats
+from app.metrics import QueueHealthCollector, observe_node, record_llm_usage
+from app.models import Article, ArticleContent, RiskMetric, SupplyChainReport, TaskProfile, TaskStatus
+from app.prewarm import prewarm
+from app.profiling import capture, summarize
+from app.providers import LatencyTracker, call_provider
+from app.query_stats import COUNT_HEADER, install, record
+from app.retention import TASKS_PRUNED_KEY, archive_reports, delete_in_batches, prune_tasks, read_archived_report
+from app.scheduling import RUNNING_KEY, acquire_slot, dispatch_plan
+from app.state_store import InMemoryTaskStateStore, TaskStateStore, get_state_store
+from app.tasks import cleanup_celery_results, run_research_task, setup_scheduled_research, sync_task_state
+from backend.celery import app as celery_app, prewarm_worker
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+class WebProcessImportBudgetTest(SimpleTestCase):
+    """
+    Guard web-process startup: loading the URLconf (and with it every API router)
+    must not pull in the agent stack, and must stay within a time/memory budget.
+    """
+
+    # Generous enough for slow CI machines; the agent stack alone costs ~1.5s / ~90MB
+    IMPORT_TIME_BUDGET_SECONDS = 2.0
+    RSS_BUDGET_MB = 110
+
+    HEAVY_MODULES = (
+        'langgraph',
+        'langchain_core',
+        'langchain_google_genai',
+        'tavily',
+        'app.agent',
+        'app.tasks',
+    )
+
+    PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import django
+django.setup()
+import backend.urls
+elapsed = time.perf_counter() - start
+try:
+    # Peak of this process only: ru_maxrss also counts the forking test runner
+    with open('/proc/self/status') as status:
+        rss_kb = next(int(line.split()[1]) for line in status if line.startswith('VmHWM:'))
+except OSError:
+    rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({
+    'elapsed': elapsed,
+    'rss_mb': rss_kb / 1024,
+    'modules': sorted(sys.modules),
+}))
+"""
+
+    def run_probe(self):
+        env = {
+            **os.environ,
+            'DJANGO_SETTINGS_MODULE': 'backend.settings',
+            # Without lazy imports, building TavilyClient would fail on a missing key
+            'TAVILY_API_KEY': '',
+            'GOOGLE_API_KEY': '',
+        }
+        result = subprocess.run(
+            [sys.executable, '-c', self.PROBE],
+            cwd=BACKEND_DIR, env=env, capture_output=True, text=True, check=True
+        )
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_api_does_not_import_agent_stack(self):
+        probe = self.run_probe()
+        loaded = [m for m in self.HEAVY_MODULES if m in probe['modules']]
+        self.assertEqual(loaded, [], f"Web process imported worker-only modules: {loaded}")
+
+    def test_startup_within_budget(self):
+        # Best of three to smooth out cold disk caches
+        probes = [self.run_probe() for _ in range(3)]
+        elapsed = min(p['elapsed'] for p in probes)
+        rss_mb = min(p['rss_mb'] for p in probes)
+        self.assertLess(elapsed, self.IMPORT_TIME_BUDGET_SECONDS)
+        self.assertLess(rss_mb, self.RSS_BUDGET_MB)
+
+
+ARTICLE_HTML = """
+<html><head><title>Port strike</title><script>var tracking = "ignore me";</script></head>
+<body>
+  <nav><a href="/">Home</a> <a href="/news">News</a></nav>
+  <article>
+    <h1>Dockworkers strike at the Port of Rotterdam</h1>
+    <p>Container handling at the largest port in Europe stopped on Monday as dockworkers walked out.</p>
+    <p>Shippers expect delays of up to two weeks for automotive parts bound for German plants.</p>
+  </article>
+  <footer>Copyright Example News. All rights reserved worldwide.</footer>
+</body></html>
+"""
+
+
+class _ArticleHandler(BaseHTTPRequestHandler):
+    """
+    Serves ARTICLE_HTML (slowly under /slow/, in an unknown charset under /bad-charset/,
+    without a Content-Type charset under /no-charset/ and /meta-charset/) and records hits and concurrency
+    """
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits.append(self.path)
+            server.active += 1
+            server.peak = max(server.peak, server.active)
+        try:
+            time.sleep(server.delay * (5 if self.path.startswith('/slow/') else 1))
+            body = ARTICLE_HTML.encode()
+            content_type = 'text/html; charset=x-unknown' if self.path.startswith('/bad-charset/') else 'text/html; charset=utf-8'
+            if self.path.startswith('/no-charset/'):
+                body, content_type = ARTICLE_HTML.replace('Monday', 'Montag in Zürich').encode(), 'text/html'
+            elif self.path.startswith('/meta-charset/'):
+                html = ARTICLE_HTML.replace('<head>', '<head><meta charset="windows-1252">')
+                body, content_type = html.replace('Monday', 'Montag in Zürich').encode('cp1252'), 'text/html'
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        finally:
+            with server.lock:
+                server.active -= 1
+
+    def log_message(self, *args):
+        pass
+
+
+class ArticleFetcherTest(TestCase):
+    """Full-article fetching and the compressed article store, against a local HTTP server"""
+
+    def setUp(self):
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), _ArticleHandler)
+        self.server.lock = threading.Lock()
+        self.server.hits, self.server.active, self.server.peak, self.server.delay = [], 0, 0, 0.0
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.base_url = f'http://127.0.0.1:{self.server.server_port}'
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def test_extracts_main_text(self):
+        text = extract_text(ARTICLE_HTML)
+        self.assertIn('Dockworkers strike at the Port of Rotterdam', text)
+        self.assertIn('automotive parts bound for German plants', text)
+        self.assertNotIn('tracking', text)
+        self.assertNotIn('Home', text)
+        self.assertNotIn('Copyright', text)
+
+    def test_articles_are_fetched_once_and_stored_compressed(self):
+        urls = [f'{self.base_url}/a', f'{self.base_url}/b']
+
+        first = get_articles(urls)
+        self.assertEqual(set(first), set(urls))
+        self.assertEqual(len(self.server.hits), 2)
+        # Same text at two URLs is stored once
+        self.assertEqual(ArticleContent.objects.count(), 1)
+        self.assertEqual(Article.objects.count(), 2)
+        content = ArticleContent.objects.get()
+        self.assertLess(len(bytes(content.text)), content.size)
+
+        second = get_articles(urls + [f'{self.base_url}/a/'])
+        self.assertEqual(second[urls[0]], first[urls[0]])
+        self.assertEqual(len(self.server.hits), 2, "Stored articles must not be downloaded again")
+
+    def test_per_host_limit(self):
+        self.server.delay = 0.1
+        fetcher = ArticleFetcher(concurrency=8, per_host=2, timeout=5)
+        results = fetcher.fetch([f'{self.base_url}/{i}' for i in range(6)])
+        self.assertEqual(len(results), 6)
+        self.assertLessEqual(self.server.peak, 2)
+
+    def test_budget_leaves_out_slow_articles(self):
+        self.server.delay = 0.2
+        fetcher = ArticleFetcher(concurrency=4, per_host=4, timeout=5)
+        results = fetcher.fetch([f'{self.base_url}/fast', f'{self.base_url}/slow/1'], budget=0.6)
+        self.assertEqual(list(results), [f'{self.base_url}/fast'])
+
+    def test_bad_page_does_not_fail_the_batch(self):
+        fetcher = ArticleFetcher(concurrency=2, per_host=2, timeout=5)
+        results = fetcher.fetch([f'{self.base_url}/good', f'{self.base_url}/bad-charset/1'])
+        self.assertEqual(list(results), [f'{self.base_url}/good'])
+        self.assertIsNot(get_article_session(), get_session())
+
+    def test_pages_without_a_charset_header(self):
+        fetcher = ArticleFetcher(concurrency=2, per_host=2, timeout=5)
+        results = fetcher.fetch([f'{self.base_url}/no-charset/1', f'{self.base_url}/meta-charset/1'])
+        self.assertEqual(len(results), 2)
+        for url, text in results.items():
+            self.assertIn('Montag in Zürich', text, url)
+
+
+class QueryBudgetMixin:
+    """assertQueryBudget fails a test whose block runs more SQL queries than allowed"""
+
+    @contextmanager
+    def assertQueryBudget(self, budget):
+        install(connection)
+        with record() as stats:
+            yield stats
+        self.assertLessEqual(stats.count, budget, f"Query budget of {budget} exceeded: {stats.describe()}")
+
+
+@override_settings(TASK_STATE_STORE='memory')
+class QueryBudgetTest(QueryBudgetMixin, TestCase):
+    """Query counts of the hot endpoints and tasks must not grow with the data"""
+
+    API = '/api/supply-chain'
+
+    def setUp(self):
+        patcher = mock.patch('app.retention.get_redis', return_value=_FakeRedis())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        get_state_store().clear()
+
+    def create_tasks(self, count, status='COMPLETED'):
+        tasks = []
+        for index in range(count):
+            report = SupplyChainReport.objects.create(
+                industry=f'Industry {index}',
+                fragility_score=5,
+                executive_summary='Summary',
+                critical_alerts=[],
+                risk_metrics=[],
+            ) if status == 'COMPLETED' else None
+            tasks.append(TaskStatus.objects.create(
+                task_id=uuid.uuid4(), industry=f'Industry {index}', status=status, report=report
+            ))
+        return tasks
+
+    def test_list_tasks(self):
+        self.create_tasks(30)
+        self.create_tasks(5, status='PROCESSING')
+        with self.assertQueryBudget(1):
+            response = self.client.get(f'{self.API}/research/requests/?limit=50')
+        self.assertEqual(len(response.json()), 35)
+        with self.assertQueryBudget(1):
+            self.client.get(f'{self.API}/research/requests/?status=PROCESSING&since=1')
+
+    def test_get_task_report(self):
+        task = self.create_tasks(1)[0]
+        with self.assertQueryBudget(1):
+            response = self.client.get(f'{self.API}/research/requests/{task.task_id}/report')
+        self.assertEqual(response.status_code, 200)
+
+    def test_latest_reports_summary(self):
+        start = timezone.now() - timezone.timedelta(days=10)
+        for industry in ('Energy', 'Retail'):
+            for day, score in enumerate((3, 5, 8)):
+                report = SupplyChainReport.objects.create(
+                    industry=industry, fragility_score=score, executive_summary='', critical_alerts=['a'] * day, risk_metrics=[]
+                )
+                SupplyChainReport.objects.filter(pk=report.pk).update(created_at=start + timezone.timedelta(days=day))
+        SupplyChainReport.objects.create(
+            industry='Mining', fragility_score=4, executive_summary='', critical_alerts=[], risk_metrics=[]
+        )
+        with self.assertQueryBudget(1) as stats:
+            response = self.client.get(f'{self.API}/reports/latest/')
+        # No window over the whole table: latest and previous rows come from indexed subqueries
+        self.assertNotIn(' OVER ', stats.slowest[0][1].upper())
+        summaries = {row['industry']: row for row in response.json()}
+        self.assertEqual(list(summaries), ['Energy', 'Mining', 'Retail'])
+        self.assertEqual(summaries['Energy']['fragility_score'], 8)
+        self.assertEqual(summaries['Energy']['previous_fragility_score'], 5)
+        self.assertEqual(summaries['Energy']['alert_count'], 2)
+        self.assertIsNone(summaries['Mining']['previous_fragility_score'])
+
+    @mock.patch('app.tasks.run_research_task.delay')
+    def test_setup_scheduled_research_does_not_query_per_industry(self, delay):
+        SupplyChainReport.objects.create(
+            industry='Industry 0', fragility_score=5, executive_summary='', critical_alerts=[], risk_metrics=[]
+        )
+        industries = [f'Industry {index}' for index in range(10)]
+        with self.assertQueryBudget(2) as stats:
+            result = setup_scheduled_research(industries=industries)
+        self.assertEqual(result['total_created'], 9)
+        self.assertEqual(delay.call_count, 9)
+
+        with self.assertQueryBudget(stats.count):
+            setup_scheduled_research(industries=industries * 3, force_update=True)
+
+    @override_settings(QUERY_STATS_ENABLED=True, QUERY_BUDGET_REQUEST=0)
+    def test_middleware_reports_queries(self):
+        self.create_tasks(2)
+        with self.assertLogs('app.query_stats', 'WARNING') as logs:
+            response = self.client.get(f'{self.API}/research/requests/')
+        self.assertEqual(response[COUNT_HEADER], '1')
+        self.assertIn('api/supply-chain/research/requests/', logs.output[0])
+        self.assertIn('SELECT', logs.output[0])
+
+
+class _FakeRedis:
+    """The few Redis commands the tests need, kept in a dict (expiry is ignored)"""
+
+    def __init__(self):
+        self.data = {}
+
+    def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def exists(self, key):
+        return int(key in self.data)
+
+    def incr(self, key):
+        self.data[key] = int(self.data.get(key, 0)) + 1
+        return self.data[key]
+
+    def expire(self, key, seconds):
+        return key in self.data
+
+    def pipeline(self):
+        return _FakePipeline(self)
+
+
+class _FakePipeline:
+    """Queues calls and runs them against the _FakeRedis on execute()"""
+
+    def __init__(self, redis):
+        self.redis = redis
+        self.calls = []
+
+    def __getattr__(self, name):
+        method = getattr(self.redis, name)
+        return lambda *args, **kwargs: self.calls.append((method, args, kwargs))
+
+    def execute(self):
+        results = [method(*args, **kwargs) for method, args, kwargs in self.calls]
+        self.calls = []
+        return results
+
+
+@override_settings(DATABASE_REPLICAS=['replica0'], TASK_STATE_STORE='memory')
+class ReplicaRouterTest(TestCase):
+    """Read routing of @replica_reads views, stickiness after writes and the Redis fallback"""
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        for target in ('app.db_router.get_redis', 'app.retention.get_redis'):
+            patcher = mock.patch(target, return_value=self.redis)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.router = ReplicaRouter()
+        self.request = RequestFactory().get('/', REMOTE_ADDR='10.0.0.1')
+        self.view = replica_reads(lambda request: self.read_db())
+
+    def read_db(self):
+        return self.router.db_for_read(TaskStatus)
+
+    def test_reads_use_replica_only_inside_decorated_views(self):
+        self.assertEqual(self.read_db(), 'default')
+        self.assertEqual(self.view(self.request), 'replica0')
+        self.assertEqual(self.read_db(), 'default')
+        self.assertEqual(self.router.db_for_write(TaskStatus), 'default')
+
+    def test_async_view(self):
+        async def view(request):
+            return self.read_db()
+
+        self.assertEqual(async_to_sync(replica_reads(view))(self.request), 'replica0')
+        self.assertEqual(self.read_db(), 'default')
+
+    def test_primary_reads_inside_view(self):
+        def view(request):
+            with primary_reads():
+                return self.read_db()
+
+        self.assertEqual(replica_reads(view)(self.request), 'default')
+
+    def test_sticks_to_primary_after_write(self):
+        stick_to_primary(self.request)
+        self.assertEqual(self.view(self.request), 'default')
+        self.assertEqual(self.view(RequestFactory().get('/', REMOTE_ADDR='10.0.0.2')), 'replica0')
+
+    def test_redis_failure_falls_back_to_primary(self):
+        self.redis.exists = self.redis.set = mock.Mock(side_effect=redis.RedisError)
+        stick_to_primary(self.request)
+        self.assertEqual(self.view(self.request), 'default')
+
+    def test_task_deltas_read_the_primary(self):
+        # 'replica0' has no connection settings here, so a query routed to it fails
+        with self.assertRaises(ConnectionDoesNotExist):
+            self.client.get('/api/supply-chain/research/requests/')
+        response = self.client.get('/api/supply-chain/research/requests/?since=1')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['tasks'], [])
+
+
+def _analysis(score, metrics=(), alerts=(), urls=()):
+    return AnalystOutput(
+        executive_summary=f'Score {score}',
+        fragility_score=score,
+        risk_metrics=[
+            {'category': category, 'impact_score': impact, 'description': description}
+            for category, impact, description in metrics
+        ],
+        critical_alerts=list(alerts),
+        sources=[{'url': url, 'title': url} for url in urls],
+    )
+
+
+class MapReduceAnalysisTest(SimpleTestCase):
+    """Chunking, merging and model routing of map-reduce analysis"""
+
+    def test_chunk_sources(self):
+        sources = ['a' * 40, 'b' * 40, 'c' * 30, 'd' * 150, 'e' * 10]
+        self.assertEqual(
+            [[item[0] for item in chunk] for chunk in chunk_sources(sources, 100)],
+            [['a', 'b'], ['c'], ['d'], ['e']]
+        )
+        self.assertEqual(chunk_sources([], 100), [])
+        self.assertEqual(chunk_sources(sources, 1000), [sources])
+
+    def test_reduce_analyses(self):
+        partials = [
+            (_analysis(3, [('Logistics', 4, 'Port  congestion'), ('Labor', 2, 'Strike')], ['Delay'], ['u1']), 4),
+            (_analysis(9, [('logistics ', 7, 'port congestion')], ['Delay', 'Shortage'], ['u1', 'u2']), 1),
+        ]
+        merged = reduce_analyses(partials, fallback_sources=[{'url': 'fallback', 'title': ''}])
+        # Weighted mean is 4, but the worst chunk keeps it within one point of 9
+        self.assertEqual(merged['fragility_score'], 8)
+        self.assertEqual([(m['category'], m['impact_score']) for m in merged['risk_metrics']], [('logistics ', 7), ('Labor', 2)])
+        self.assertEqual(merged['critical_alerts'], ['Delay', 'Shortage'])
+        self.assertEqual([source['url'] for source in merged['sources']], ['u1', 'u2'])
+        self.assertEqual(merged['risk_report'], 'Score 9\n\nScore 3')
+
+        merged = reduce_analyses([(_analysis(4), 2), (_analysis(6), 2)], fallback_sources=[{'url': 'fallback', 'title': ''}])
+        self.assertEqual(merged['fragility_score'], 5)
+        self.assertEqual(merged['sources'], [{'url': 'fallback', 'title': ''}])
+
+    @override_settings(
+        ANALYST_LOW_SIGNAL_SOURCES=2, ANALYST_CHUNK_CHARS=20000,
+        ANALYST_MODEL_CASCADE=[
+            {'model': 'small', 'max_input_chars': 8000},
+            {'model': 'medium', 'max_input_chars': 60000},
+            {'model': 'large', 'max_input_chars': None},
+        ],
+    )
+    def test_chunks_are_routed_by_size(self):
+        calls = []
+
+        def invoke(model, messages, timeout=None, hedge=False):
+            calls.append(model)
+            return {'parsed': _analysis(5), 'raw': None, 'parsing_error': None}
+
+        with mock.patch('app.agent.invoke_analyst', side_effect=invoke):
+            result = map_reduce_analysis({'industry': 'Energy'}, ['x' * 15000] * 4)
+        # A one-source chunk would count as low signal, but 15k characters need the medium tier
+        self.assertEqual(calls, ['medium'] * 4)
+        self.assertEqual({entry['reason'] for entry in result['analyst_route']}, {'size'})
+        self.assertEqual(result['analysis_mode'], {'mode': 'map_reduce', 'chunks': 4, 'failed_chunks': 0})
+
+
+@override_settings(PROVIDER_CONCURRENCY={'test': 1}, PROVIDER_MAX_RETRIES=0)
+class ProviderCallTest(SimpleTestCase):
+    """Provider slots, deadlines and abandoned calls"""
+
+    def setUp(self):
+        for target in ('app.providers._provider_slots', 'app.providers._executors'):
+            patcher = mock.patch.dict(target, clear=True)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_abandoned_call_does_not_take_a_slot_later(self):
+        sent = []
+
+        def request(name, seconds):
+            sent.append(name)
+            time.sleep(seconds)
+            return name
+
+        holder = threading.Thread(target=call_provider, args=('test', 'op', request, 'first', 0.3))
+        holder.start()
+        time.sleep(0.05)
+        # Times out while the first call holds the only slot
+        with self.assertRaises(DeadlineExceeded):
+            call_provider('test', 'op', request, 'second', 0, timeout=0.1)
+        holder.join()
+        time.sleep(0.05)
+        self.assertEqual(sent, ['first'])
+        self.assertEqual(call_provider('test', 'op', request, 'third', 0, timeout=1), 'third')
+
+    @override_settings(PROVIDER_CONCURRENCY={'slow': 1, 'fast': 1}, PROVIDER_CALL_THREADS=2)
+    def test_calls_waiting_for_one_provider_do_not_block_another(self):
+        release = threading.Event()
+        self.addCleanup(release.set)
+
+        def blocked():
+            release.wait(5)
+            return 'slow'
+
+        waiting = [
+            threading.Thread(target=call_provider, args=('slow', 'op', blocked), kwargs={'timeout': 5})
+            for _ in range(3)
+        ]
+        for thread in waiting:
+            thread.start()
+        time.sleep(0.05)
+        # One slow call runs and two wait for its only slot; the fast provider is unaffected
+        self.assertEqual(call_provider('fast', 'op', lambda: 'fast', timeout=0.5), 'fast')
+        release.set()
+        for thread in waiting:
+            thread.join()
+
+
+class InMemoryTaskStateStoreTest(SimpleTestCase):
+    """The process-local live state store behaves like the Redis one"""
+
+    def test_interface_is_abstract(self):
+        with self.assertRaises(TypeError):
+            TaskStateStore()
+
+    def test_set_merges_and_get(self):
+        store = InMemoryTaskStateStore(ttl=60)
+        task_id = uuid.uuid4()
+        store.set(task_id, status='PROCESSING', progress=10, started_at=timezone.now())
+        store.set(str(task_id), progress=40, error_message=None)
+        state = store.get(task_id)
+        self.assertEqual((state['status'], state['progress']), ('PROCESSING', 40))
+        self.assertIsInstance(state['started_at'], str)
+        self.assertNotIn('error_message', state)
+        self.assertEqual(list(store.get_many([task_id, uuid.uuid4()])), [str(task_id)])
+        self.assertEqual(list(store.changed_since(state['updated_at'] - 1)), [str(task_id)])
+        self.assertEqual(store.changed_since(state['updated_at']), {})
+        store.delete(task_id)
+        self.assertIsNone(store.get(task_id))
+
+    def test_state_expires_after_ttl(self):
+        store = InMemoryTaskStateStore(ttl=60)
+        with mock.patch('app.state_store.time.time', return_value=1000.0):
+            store.set('old', status='PROCESSING')
+            store.set('renewed', status='PROCESSING')
+        with mock.patch('app.state_store.time.time', return_value=1050.0):
+            store.set('renewed', progress=50)
+        with mock.patch('app.state_store.time.time', return_value=1061.0):
+            self.assertIsNone(store.get('old'))
+            self.assertEqual(list(store.all_active()), ['renewed'])
+            self.assertEqual(store.get('renewed')['progress'], 50)
+
+
+@override_settings(TASK_STATE_STORE='memory', TASK_STATE_STALE_SECONDS=60)
+class LiveTaskStateTest(TestCase):
+    """sync_task_state flushes and reconciles live state; task lists overlay it"""
+
+    def setUp(self):
+        self.store = get_state_store()
+
+    def tearDown(self):
+        self.store.clear()
+
+    def create_task(self, status, **fields):
+        return TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status=status, **fields)
+
+    def test_sync_flushes_live_state(self):
+        task = self.create_task('PENDING')
+        started = timezone.now()
+        self.store.set(task.task_id, status='PROCESSING', progress=30, started_at=started)
+
+        self.assertEqual(sync_task_state(), {'flushed': 1, 'failed': 0})
+        task.refresh_from_db()
+        self.assertEqual((task.status, task.progress, task.started_at), ('PROCESSING', 30, started))
+        # Live state stays until the terminal transition deletes it
+        self.assertIsNotNone(self.store.get(task.task_id))
+
+    def test_sync_fails_lost_tasks(self):
+        stale = self.create_task('PROCESSING')
+        with mock.patch('app.state_store.time.time', return_value=time.time() - 120):
+            self.store.set(stale.task_id, progress=50)
+        orphan = self.create_task('PROCESSING', started_at=timezone.now() - timezone.timedelta(minutes=5))
+        running = self.create_task('PROCESSING', started_at=timezone.now())
+        finished = self.create_task('COMPLETED')
+        with mock.patch('app.state_store.time.time', return_value=time.time() - 120):
+            self.store.set(finished.task_id, progress=100)
+
+        self.assertEqual(sync_task_state(), {'flushed': 0, 'failed': 2})
+        statuses = dict(TaskStatus.objects.values_list('task_id', 'status'))
+        self.assertEqual(statuses[stale.task_id], 'FAILED')
+        self.assertEqual(statuses[orphan.task_id], 'FAILED')
+        self.assertEqual(statuses[running.task_id], 'PROCESSING')
+        self.assertEqual(statuses[finished.task_id], 'COMPLETED')
+        self.assertIsNone(self.store.get(stale.task_id))
+
+    def test_status_filter_uses_live_state(self):
+        entering = self.create_task('PENDING')
+        leaving = self.create_task('PROCESSING')
+        staying = self.create_task('PROCESSING')
+        done = self.create_task('COMPLETED')
+        self.store.set(entering.task_id, status='PROCESSING', progress=10)
+        self.store.set(leaving.task_id, status='FAILED')
+        # Final rows ignore live state
+        self.store.set(done.task_id, status='PROCESSING')
+
+        def listed(status):
+            response = self.client.get(f'/api/supply-chain/research/requests/?status={status}')
+            return {task['task_id']: task for task in response.json()}
+
+        processing = listed('PROCESSING')
+        self.assertEqual(set(processing), {str(entering.task_id), str(staying.task_id)})
+        self.assertEqual(processing[str(entering.task_id)]['progress'], 10)
+        self.assertEqual(set(listed('PENDING')), set())
+        self.assertEqual(set(listed('FAILED')), {str(leaving.task_id)})
+        self.assertEqual(set(listed('COMPLETED')), {str(done.task_id)})
+
+
+class ProfilingTest(TestCase):
+    """Task profiles: time categories and provider calls made outside the profiled thread"""
+
+    def test_summary_categories(self):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        json.dumps({'values': list(range(20000))})
+        AnalystOutput(executive_summary='', fragility_score=1, risk_metrics=[], critical_alerts=[], sources=[])
+        profiler.disable()
+        summary = summarize(pstats.Stats(profiler))
+        self.assertIn('json', summary['breakdown'])
+        self.assertIn('pydantic', summary['breakdown'])
+        hot = {row['function']: row['category'] for row in summary['hot_functions']}
+        self.assertEqual(hot.get('dumps'), 'json')
+
+    @override_settings(PROVIDER_CONCURRENCY={}, PROVIDER_MAX_RETRIES=0)
+    def test_provider_calls_from_other_threads(self):
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status='PROCESSING')
+
+        def search():
+            time.sleep(0.05)
+            return []
+
+        with capture(task):
+            # Map-reduce style: a worker thread running in a copy of the task's context
+            worker = threading.Thread(
+                target=contextvars.copy_context().run, args=(call_provider, 'tavily', 'search', search)
+            )
+            worker.start()
+            worker.join()
+            call_provider('gemini', 'flash', lambda: None, timeout=1)
+
+        summary = TaskProfile.objects.get(task_status=task).summary
+        calls = {(row['provider'], row['operation']): row for row in summary['provider_calls']}
+        self.assertEqual(set(calls), {('tavily', 'search'), ('gemini', 'flash')})
+        self.assertGreaterEqual(calls[('tavily', 'search')]['wall_time'], 0.05)
+        self.assertEqual(calls[('tavily', 'search')]['calls'], 1)
+
+    @override_settings(PROVIDER_CONCURRENCY={}, PROVIDER_MAX_RETRIES=1, PROVIDER_RETRY_BACKOFF=0.2)
+    def test_retry_backoff_is_not_provider_time(self):
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status='PROCESSING')
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError('reset')
+
+        with capture(task):
+            call_provider('tavily', 'search', flaky)
+
+        row, = TaskProfile.objects.get(task_status=task).summary['provider_calls']
+        self.assertEqual(row['calls'], 2)
+        self.assertLess(row['wall_time'], 0.1)
+
+
+@override_settings(
+    ADMISSION_CONTROL_ENABLED=True, ADMISSION_USER_RATE=2, ADMISSION_USER_RATE_WINDOW=60,
+    ADMISSION_MAX_QUEUE_DEPTH=10, ADMISSION_MAX_IN_FLIGHT=10, TASK_STATE_STORE='memory',
+)
+class AdmissionTest(TestCase):
+    """Research submissions over capacity or over the caller's rate get 429 with Retry-After"""
+
+    URL = '/api/supply-chain/research/requests/'
+
+    def setUp(self):
+        self.redis = _FakeRedis()
+        self.backlog = {'queued': 0, 'in_flight': 0, 'expected_wait_seconds': 0.0, 'average_run_seconds': 45.0}
+        for target, kwargs in (
+            ('app.admission.get_redis', {'return_value': self.redis}),
+            ('app.admission.backlog', {'side_effect': lambda: dict(self.backlog)}),
+            ('app.api.enqueue_research', {}),
+        ):
+            patcher = mock.patch(target, **kwargs)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def submit(self):
+        return self.client.post(self.URL, {'industry': 'Energy'}, content_type='application/json')
+
+    def test_queue_full(self):
+        self.backlog.update(queued=10, expected_wait_seconds=312.4)
+        response = self.submit()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '312')
+        self.assertEqual(response.json()['reason'], 'queue_depth')
+        self.assertEqual(TaskStatus.objects.count(), 0)
+
+    def test_too_many_in_flight(self):
+        self.backlog.update(in_flight=10)
+        response = self.submit()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response['Retry-After'], '45')
+        self.assertEqual(response.json()['reason'], 'in_flight')
+
+    def test_capacity_rejections_do_not_use_rate_quota(self):
+        self.backlog.update(queued=10)
+        for _ in range(3):
+            self.assertEqual(self.submit().status_code, 429)
+        self.backlog.update(queued=0)
+        self.assertEqual(self.submit().status_code, 200)
+        self.assertEqual(self.submit().status_code, 200)
+
+    def test_user_rate(self):
+        self.assertEqual(self.submit().status_code, 200)
+        self.assertEqual(self.submit().status_code, 200)
+        response = self.submit()
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.json()['reason'], 'user_rate')
+        self.assertTrue(1 <= int(response['Retry-After']) <= 60)
+        self.assertEqual(TaskStatus.objects.count(), 2)
+
+
+class _SearchHandler(BaseHTTPRequestHandler):
+    """Minimal Tavily search endpoint; HTTP/1.1 so connections are kept alive"""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        body = json.dumps({'results': [{'url': 'https://example.com', 'content': 'Port strike'}]}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class ProviderTransportTest(SimpleTestCase):
+    """Provider clients share the pooled HTTP transport; workers warm it up before the first task"""
+
+    @override_settings(TAVILY_API_KEY='test-key')
+    def test_tavily_searches_reuse_pooled_connections(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), _SearchHandler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        get_tavily.cache_clear()
+        self.addCleanup(get_tavily.cache_clear)
+
+        client = get_tavily()
+        client.base_url = f'http://127.0.0.1:{server.server_port}'
+        for _ in range(3):
+            self.assertEqual(client.search('semiconductor supply chain')['results'][0]['content'], 'Port strike')
+        stats = {stat['host']: stat for stat in pool_stats()}[f'http://127.0.0.1:{server.server_port}']
+        self.assertEqual(stats['requests'], 3)
+        self.assertEqual(stats['connections_opened'], 1)
+
+    @override_settings(WORKER_PREWARM_ENABLED=False, HTTP_WARMUP_ENABLED=True)
+    def test_thread_pool_worker_warms_up_connections(self):
+        with mock.patch('app.http_transport.warm_up') as warm_up:
+            prewarm_worker(sender=mock.Mock(pool_cls='threads'))
+            warm_up.assert_called_once_with()
+            warm_up.reset_mock()
+            # Prefork children warm up in worker_process_init instead
+            prewarm_worker(sender=mock.Mock(pool_cls='prefork'))
+            warm_up.assert_not_called()
+
+
+@override_settings(
+    RETENTION_FAILED_TASK_DAYS=30, RETENTION_REPORT_ARCHIVE_DAYS=30,
+    RETENTION_BATCH_SIZE=2, RETENTION_BATCH_PAUSE_SECONDS=0, TASK_STATE_STORE='memory',
+)
+class RetentionTest(TestCase):
+    """Task pruning and report archival, in batches and safe to re-run"""
+
+    def setUp(self):
+        archive_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(archive_dir.cleanup)
+        patcher = override_settings(RETENTION_ARCHIVE_DIR=archive_dir.name)
+        patcher.enable()
+        self.addCleanup(patcher.disable)
+        self.archive_dir = archive_dir.name
+        self.redis = _FakeRedis()
+        redis_patcher = mock.patch('app.retention.get_redis', return_value=self.redis)
+        redis_patcher.start()
+        self.addCleanup(redis_patcher.stop)
+
+    def create_report(self, created_at, industry='Energy'):
+        report = SupplyChainReport.objects.create(
+            industry=industry, fragility_score=6, executive_summary='Summary', critical_alerts=['Strike'],
+            risk_metrics=[], sources=[{'url': f'https://example.com/{industry}/{created_at:%j}', 'title': 'Strike'}],
+            analysis_meta={'mode': 'single'}, minhash=[1, 2, 3],
+        )
+        SupplyChainReport.objects.filter(pk=report.pk).update(created_at=created_at)
+        report.refresh_from_db()
+        return report
+
+    def test_archive_reports(self):
+        now = datetime(2026, 6, 1, tzinfo=dt_timezone.utc)
+        # Batches of two: the March pair shares a file, January gets its own
+        old = [
+            self.create_report(datetime(2026, month, day, tzinfo=dt_timezone.utc))
+            for month, day in ((3, 5), (3, 20), (1, 10))
+        ]
+        recent = self.create_report(datetime(2026, 5, 20, tzinfo=dt_timezone.utc))
+
+        self.assertEqual(archive_reports(now=now), {'archived': 3, 'files': 2})
+        for original in old:
+            report = SupplyChainReport.objects.get(pk=original.pk)
+            self.assertTrue(report.archived)
+            self.assertEqual((report.sources, report.analysis_meta, report.minhash), ([], {}, []))
+            self.assertEqual(report.executive_summary, 'Summary')
+            record = read_archived_report(report)
+            self.assertEqual(record['sources'], original.sources)
+            self.assertEqual(record['minhash'], [1, 2, 3])
+            self.assertEqual(record['created_at'], original.created_at.isoformat())
+        self.assertFalse(SupplyChainReport.objects.get(pk=recent.pk).archived)
+
+        def archive_files():
+            return sorted(str(path.relative_to(self.archive_dir)) for path in Path(self.archive_dir).rglob('*.*'))
+
+        files = archive_files()
+        self.assertEqual(files, [
+            f'reports/2026-01/reports-{old[2].pk}-{old[2].pk}.jsonl.gz',
+            f'reports/2026-03/reports-{old[0].pk}-{old[1].pk}.jsonl.gz',
+        ])
+        # A second run finds nothing left to do and leaves the archive as it is
+        self.assertEqual(archive_reports(now=now), {'archived': 0, 'files': 0})
+        self.assertEqual(archive_files(), files)
+
+    def test_task_report_reads_archived_sources(self):
+        report = self.create_report(timezone.now() - timezone.timedelta(days=60))
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status='COMPLETED', report=report)
+        archive_reports()
+
+        response = self.client.get(f'/api/supply-chain/research/requests/{task.task_id}/report')
+        self.assertTrue(response.json()['archived'])
+        self.assertEqual(response.json()['sources'], report.sources)
+
+    def test_prune_tasks(self):
+        def create_task(status, days_ago):
+            task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status=status)
+            TaskStatus.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timezone.timedelta(days=days_ago))
+            return task
+
+        expired = [create_task('FAILED', 40), create_task('CANCELLED', 31), create_task('FAILED', 90)]
+        TaskProfile.objects.create(task_status=expired[0], wall_time=1.0, summary={}, stats=b'')
+        kept = [create_task('FAILED', 5), create_task('COMPLETED', 90), create_task('PROCESSING', 90)]
+
+        # Three tasks and one profile, deleted two tasks per batch
+        self.assertEqual(prune_tasks(), 4)
+        self.assertEqual(set(TaskStatus.objects.values_list('pk', flat=True)), {task.pk for task in kept})
+        self.assertFalse(TaskProfile.objects.exists())
+        pruned_at = self.redis.get(TASKS_PRUNED_KEY)
+        self.assertAlmostEqual(pruned_at, time.time(), delta=5)
+        # Nothing deleted: the marker stays as it was
+        self.assertEqual(prune_tasks(), 0)
+        self.assertEqual(self.redis.get(TASKS_PRUNED_KEY), pruned_at)
+
+    def test_delete_in_batches(self):
+        reports = [self.create_report(timezone.now(), industry=f'Industry {index}') for index in range(5)]
+        with mock.patch('app.retention._pause') as pause:
+            deleted = delete_in_batches(SupplyChainReport.objects.exclude(pk=reports[0].pk), batch_size=2)
+        self.assertEqual(deleted, 4)
+        self.assertEqual(pause.call_count, 2)
+        self.assertEqual(list(SupplyChainReport.objects.values_list('pk', flat=True)), [reports[0].pk])
+
+
+@override_settings(SCHEDULED_RESEARCH_MAX_CONCURRENT=2, SCHEDULED_RESEARCH_DEFER_SECONDS=120, TASK_STATE_STORE='memory')
+class ScheduledResearchTest(TestCase):
+    """Staggered dispatch plan and the cap on concurrent scheduled runs"""
+
+    def test_dispatch_plan(self):
+        industries = ['Energy', 'Retail', 'Automotive', 'Semiconductors']
+        plan = dispatch_plan(industries, window=1200)
+        self.assertEqual([offset for offset, _ in plan], [0, 300, 600, 900])
+        self.assertEqual(sorted(industry for _, industry in plan), sorted(industries))
+        # Same order whatever the input order; duplicates run once
+        self.assertEqual(dispatch_plan(industries[::-1] + ['Energy'], window=1200), plan)
+        self.assertEqual([offset for offset, _ in dispatch_plan(industries, window=0)], [0, 0, 0, 0])
+
+    def test_acquire_slot(self):
+        script = mock.Mock(return_value=0)
+        client = mock.Mock(**{'register_script.return_value': script})
+        with mock.patch('app.scheduling.get_redis', return_value=client):
+            self.assertFalse(acquire_slot('task-1'))
+            script.assert_called_once_with(keys=[RUNNING_KEY], args=['task-1', mock.ANY, 2])
+            script.return_value = 1
+            self.assertTrue(acquire_slot('task-1'))
+            # Redis being down must not stop scheduled research
+            script.side_effect = redis.RedisError
+            self.assertTrue(acquire_slot('task-1'))
+            with override_settings(SCHEDULED_RESEARCH_MAX_CONCURRENT=0):
+                script.reset_mock()
+                self.assertTrue(acquire_slot('task-2'))
+                script.assert_not_called()
+
+    def test_capped_run_is_deferred(self):
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', task_type='SCHEDULED', status='PENDING')
+        with mock.patch('app.tasks.acquire_slot', return_value=False), \
+                mock.patch('app.tasks.release_slot') as release_slot, \
+                mock.patch('app.tasks._execute_research') as execute, \
+                mock.patch.object(run_research_task, 'apply_async') as apply_async:
+            result = run_research_task(str(task.task_id), 'Energy')
+        self.assertEqual(result['status'], 'DEFERRED')
+        apply_async.assert_called_once_with(args=[str(task.task_id), 'Energy'], countdown=120)
+        execute.assert_not_called()
+        release_slot.assert_not_called()
+        task.refresh_from_db()
+        self.assertEqual(task.status, 'PENDING')
+
+    def test_run_releases_its_slot(self):
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', task_type='SCHEDULED', status='PENDING')
+        report = SupplyChainReport.objects.create(
+            industry='Energy', fragility_score=5, executive_summary='', critical_alerts=[], risk_metrics=[]
+        )
+        with mock.patch('app.tasks.acquire_slot', return_value=True), \
+                mock.patch('app.tasks.release_slot') as release_slot, \
+                mock.patch('app.tasks._execute_research', return_value=report):
+            result = run_research_task(str(task.task_id), 'Energy')
+        self.assertEqual(result['status'], 'COMPLETED')
+        release_slot.assert_called_once_with(str(task.task_id))
+
+
+@override_settings(
+    ANALYST_LOW_SIGNAL_SOURCES=2,
+    ANALYST_MODEL_CASCADE=[
+        {'model': 'small', 'max_input_chars': 8000},
+        {'model': 'medium', 'max_input_chars': 60000},
+        {'model': 'large', 'max_input_chars': None},
+    ],
+)
+class AnalystRoutingTest(SimpleTestCase):
+    """Starting tier of the analyst model cascade"""
+
+    def route(self, sources, chars, **kwargs):
+        return route_analyst_model(['x'] * sources, 'x' * chars, **kwargs)
+
+    def test_low_signal_starts_on_first_tier(self):
+        self.assertEqual(self.route(1, 100), (0, 'low_signal'))
+        self.assertEqual(self.route(2, 100000), (0, 'low_signal'))
+        self.assertEqual(self.route(2, 100000, chunked=True), (2, 'size'))
+
+    def test_size_thresholds(self):
+        self.assertEqual(self.route(3, 8000), (0, 'size'))
+        self.assertEqual(self.route(3, 8001), (1, 'size'))
+        self.assertEqual(self.route(3, 60000), (1, 'size'))
+        self.assertEqual(self.route(3, 60001), (2, 'size'))
+
+    def test_oversized_input_uses_last_tier(self):
+        cascade = [{'model': 'small', 'max_input_chars': 10}, {'model': 'medium', 'max_input_chars': 20}]
+        with override_settings(ANALYST_MODEL_CASCADE=cascade):
+            self.assertEqual(self.route(3, 50), (1, 'size'))
+
+
+@override_settings(NODE_BUDGET_SHARES={'researcher_node': 0.3, 'risk_analyst_node': 0.7})
+class NodeTimeoutTest(SimpleTestCase):
+    """Splitting the run deadline across graph nodes"""
+
+    def test_no_deadline(self):
+        self.assertIsNone(node_timeout({}, 'researcher_node'))
+
+    def test_share_of_what_is_left(self):
+        state = {'deadline': time.time() + 100}
+        self.assertAlmostEqual(node_timeout(state, 'researcher_node'), 30, delta=1)
+        # The last node gets everything that is left
+        self.assertAlmostEqual(node_timeout(state, 'risk_analyst_node'), 100, delta=1)
+        self.assertAlmostEqual(node_timeout(state, 'other_node'), 100, delta=1)
+
+    def test_passed_deadline(self):
+        with self.assertRaises(DeadlineExceeded):
+            node_timeout({'deadline': time.time() - 1}, 'researcher_node')
+
+
+@override_settings(PROVIDER_CONCURRENCY={}, PROVIDER_MAX_RETRIES=0)
+class HedgingTest(SimpleTestCase):
+    """p95 tracking and hedged provider calls"""
+
+    def test_percentile_needs_min_samples(self):
+        tracker = LatencyTracker(window=50, min_samples=20)
+        for i in range(19):
+            tracker.observe('key', i / 100)
+        self.assertIsNone(tracker.percentile('key', 0.95))
+        tracker.observe('key', 0.19)
+        self.assertEqual(tracker.percentile('key', 0.95), 0.19)
+        self.assertIsNone(tracker.percentile('other', 0.95))
+
+    def test_window_keeps_recent_samples(self):
+        tracker = LatencyTracker(window=20, min_samples=20)
+        for _ in range(20):
+            tracker.observe('key', 5.0)
+        for _ in range(20):
+            tracker.observe('key', 0.1)
+        self.assertEqual(tracker.percentile('key', 0.95), 0.1)
+
+    def test_hedge_after_p95(self):
+        tracker = LatencyTracker(min_samples=20)
+        for _ in range(20):
+            tracker.observe(('hedge', 'op'), 0.05)
+        release = threading.Event()
+        self.addCleanup(release.set)
+        calls = []
+
+        def request():
+            calls.append(time.monotonic())
+            if len(calls) == 1:
+                release.wait(5)
+                return 'slow'
+            return 'fast'
+
+        with mock.patch('app.providers.latency_tracker', tracker):
+            started = time.monotonic()
+            self.assertEqual(call_provider('hedge', 'op', request, timeout=5, hedge=True), 'fast')
+        self.assertEqual(len(calls), 2)
+        self.assertGreaterEqual(calls[1] - started, 0.04)
+
+    def test_no_hedge_without_history(self):
+        calls = []
+
+        def request():
+            calls.append(1)
+            time.sleep(0.1)
+            return 'done'
+
+        with mock.patch('app.providers.latency_tracker', LatencyTracker()):
+            self.assertEqual(call_provider('hedge', 'op', request, timeout=5, hedge=True), 'done')
+        self.assertEqual(calls, [1])
+
+
+class FingerprintTest(SimpleTestCase):
+    """Exact fingerprints and MinHash similarity of research content"""
+
+    def passages(self, start, stop):
+        return [' '.join(f'word{i}' for i in range(start, stop))]
+
+    def test_shingles(self):
+        self.assertEqual(shingles('One two, THREE'), {'one two three'})
+        self.assertEqual(len(shingles(self.passages(0, 10)[0])), 6)
+        self.assertEqual(shingles(''), set())
+
+    def test_fingerprint_ignores_order_and_formatting(self):
+        sources = [{'url': 'https://a.example'}, {'url': 'https://b.example'}]
+        self.assertEqual(
+            content_fingerprint(sources, ['Port strike.', 'Chip shortage']),
+            content_fingerprint(sources[::-1], ['chip  shortage', 'port strike'])
+        )
+        self.assertNotEqual(
+            content_fingerprint(sources, ['Port strike']),
+            content_fingerprint(sources[:1], ['Port strike'])
+        )
+
+    def test_similarity_estimates_jaccard(self):
+        sources = [{'url': 'https://a.example'}]
+        sketch = minhash(sources, self.passages(0, 204))
+        self.assertEqual(len(sketch), 128)
+        self.assertEqual(similarity(sketch, minhash(sources, self.passages(0, 204))), 1.0)
+        self.assertLess(similarity(sketch, minhash([], self.passages(1000, 1204))), 0.1)
+        # 100 of the 200 shingles (and the URL) shared out of 301 distinct tokens: Jaccard ~0.34
+        overlap = similarity(sketch, minhash(sources, self.passages(100, 304)))
+        self.assertAlmostEqual(overlap, 101 / 301, delta=0.15)
+
+    def test_incomparable_sketches(self):
+        sketch = minhash([], self.passages(0, 20))
+        self.assertEqual(similarity(sketch, minhash([], self.passages(0, 20), num_perm=64)), 0.0)
+        self.assertEqual(similarity([], []), 0.0)
+        empty = minhash([], [])
+        self.assertEqual(len(empty), 128)
+        self.assertLess(similarity(sketch, empty), 0.1)
+
+
+class MetricsTest(SimpleTestCase):
+    """Prometheus series for nodes, tokens, providers and queue health"""
+
+    def sample(self, name, **labels):
+        return REGISTRY.get_sample_value(name, labels) or 0
+
+    def test_observe_node(self):
+        @observe_node
+        def metrics_test_node(state):
+            return {'seen': state['value']}
+
+        before = self.sample('supply_chain_agent_node_duration_seconds_count', node='metrics_test_node')
+        self.assertEqual(metrics_test_node({'value': 1}), {'seen': 1})
+        self.assertEqual(
+            self.sample('supply_chain_agent_node_duration_seconds_count', node='metrics_test_node'), before + 1
+        )
+
+    def test_record_llm_usage(self):
+        record_llm_usage('metrics-test', {'input_tokens': 120, 'output_tokens': 30})
+        record_llm_usage('metrics-test', None)
+        self.assertEqual(self.sample('supply_chain_llm_tokens_total', model='metrics-test', kind='prompt'), 120)
+        self.assertEqual(self.sample('supply_chain_llm_tokens_total', model='metrics-test', kind='completion'), 30)
+
+    @override_settings(PROVIDER_CONCURRENCY={}, PROVIDER_MAX_RETRIES=1, PROVIDER_RETRY_BACKOFF=0.2)
+    def test_retry_backoff_is_not_provider_latency(self):
+        attempts = []
+
+        def flaky():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise ConnectionError('reset')
+            return 'ok'
+
+        labels = {'provider': 'metrics-test', 'operation': 'op'}
+        self.assertEqual(call_provider('metrics-test', 'op', flaky), 'ok')
+        self.assertEqual(self.sample('supply_chain_provider_request_duration_seconds_count', **labels), 2)
+        self.assertLess(self.sample('supply_chain_provider_request_duration_seconds_sum', **labels), 0.1)
+        self.assertEqual(self.sample('supply_chain_provider_retries_total', **labels), 1)
+        self.assertEqual(
+            self.sample('supply_chain_provider_errors_total', error='ConnectionError', **labels), 1
+        )
+
+    def test_queue_health(self):
+        with mock.patch('app.queues.queue_depths', return_value={'research': 4, 'celery': 0}), \
+                mock.patch('app.queues.in_flight_counts', return_value={'MANUAL': 2}):
+            families = {family.name: family for family in QueueHealthCollector().collect()}
+        depths = {sample.labels['queue']: sample.value for sample in families['supply_chain_celery_queue_depth'].samples}
+        self.assertEqual(depths, {'research': 4, 'celery': 0})
+        self.assertEqual(families['supply_chain_tasks_in_flight'].samples[0].labels, {'task_type': 'MANUAL'})
+        self.assertEqual(families['supply_chain_tasks_in_flight'].samples[0].value, 2)
+
+    def test_queue_health_survives_redis_errors(self):
+        with mock.patch('app.queues.queue_depths', side_effect=redis.ConnectionError), \
+                mock.patch('app.queues.in_flight_counts', side_effect=redis.ConnectionError):
+            families = list(QueueHealthCollector().collect())
+        self.assertEqual([family.samples for family in families], [[], []])
+
+    def test_metrics_endpoint(self):
+        record_llm_usage('metrics-endpoint', {'input_tokens': 1, 'output_tokens': 1})
+        with mock.patch('app.queues.queue_depths', return_value={'research': 3}), \
+                mock.patch('app.queues.in_flight_counts', return_value={}):
+            response = self.client.get('/metrics')
+        self.assertEqual(response.status_code, 200)
+        body = response.content.decode()
+        self.assertIn('supply_chain_celery_queue_depth{queue="research"} 3.0', body)
+        self.assertIn('supply_chain_llm_tokens_total{kind="prompt",model="metrics-endpoint"} 1.0', body)
+
+
+class CeleryResultsTest(TestCase):
+    """Result policy for fire-and-forget tasks and cleanup of legacy result rows"""
+
+    def test_fire_and_forget_tasks_store_no_result(self):
+        celery_app.finalize()
+        for name in settings.FIRE_AND_FORGET_TASKS:
+            with self.subTest(name):
+                self.assertTrue(celery_app.tasks[name].ignore_result)
+
+    @override_settings(CELERY_DB_RESULT_RETENTION_DAYS=7)
+    def test_cleanup_deletes_expired_results_in_batches(self):
+        from django_celery_results.models import TaskResult
+
+        for i in range(6):
+            TaskResult.objects.create(task_id=f'result-{i}', status='SUCCESS')
+        TaskResult.objects.exclude(task_id='result-5').update(date_done=timezone.now() - timezone.timedelta(days=8))
+
+        with mock.patch('app.retention._pause') as pause:
+            self.assertEqual(cleanup_celery_results(batch_size=2), 5)
+        self.assertEqual(pause.call_count, 2)
+        self.assertEqual(list(TaskResult.objects.values_list('task_id', flat=True)), ['result-5'])
+
+
+def _metrics(*entries):
+    return [{'category': category, 'impact_score': impact, 'description': description} for category, impact, description in entries]
+
+
+@override_settings(TASK_STATE_STORE='memory', RESEARCH_RELEASE_DB_DURING_RUN=False)
+class RiskMetricTest(TestCase):
+    """One RiskMetric row per report metric, and the endpoints aggregating them"""
+
+    def create_report(self, industry, metrics, days_ago=0, **kwargs):
+        report = SupplyChainReport.objects.create(
+            industry=industry, fragility_score=5, executive_summary='', critical_alerts=[], risk_metrics=metrics, **kwargs
+        )
+        if days_ago:
+            SupplyChainReport.objects.filter(pk=report.pk).update(created_at=timezone.now() - timezone.timedelta(days=days_ago))
+            report.refresh_from_db()
+        RiskMetric.objects.bulk_create(RiskMetric.rows_for(report))
+        return report
+
+    def run_task(self, **final_state):
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status='PENDING')
+        graph = mock.Mock(**{'invoke.side_effect': lambda state: {**state, **final_state}})
+        with mock.patch('app.agent.get_supply_chain_app', return_value=graph):
+            run_research_task(str(task.task_id), 'Energy')
+        task.refresh_from_db()
+        return task.report
+
+    def test_completed_run_writes_a_row_per_metric(self):
+        report = self.run_task(fragility_score=6, risk_metrics=[
+            *_metrics(('Logistics', 7, 'Port strike'), ('Geopolitical', 4, '')),
+            'not a metric',
+        ])
+        rows = {row.category: row for row in report.metric_rows.all()}
+        self.assertEqual(set(rows), {'Logistics', 'Geopolitical'})
+        self.assertEqual(rows['Logistics'].impact_score, 7)
+        self.assertEqual(rows['Logistics'].industry, 'Energy')
+        self.assertEqual(rows['Logistics'].created_at, report.created_at)
+
+    def test_carried_over_run_writes_no_rows(self):
+        origin = self.create_report('Energy', _metrics(('Logistics', 7, 'Port strike')))
+        report = self.run_task(risk_metrics=origin.risk_metrics, carried_over_from=origin.id)
+        self.assertEqual(report.carried_over_from, origin)
+        self.assertFalse(report.metric_rows.exists())
+        self.assertEqual(RiskMetric.objects.count(), 1)
+
+    def test_backfill_migration(self):
+        from django.apps import apps
+
+        report = self.create_report('Energy', _metrics(('Logistics', 7, ''), ('Labor', 3, '')))
+        RiskMetric.objects.all().delete()
+        migration = importlib.import_module('app.migrations.0006_backfill_risk_metrics')
+        migration.backfill_risk_metrics(apps, None)
+        self.assertEqual(sorted(report.metric_rows.values_list('category', flat=True)), ['Labor', 'Logistics'])
+
+    def test_list_metrics_filters(self):
+        self.create_report('Energy', _metrics(('Logistics', 9, 'Port strike'), ('Labor', 3, 'Walkout')))
+        self.create_report('Retail', _metrics(('Logistics', 6, 'Canal closure')))
+        self.create_report('Energy', _metrics(('Logistics', 10, 'Old news')), days_ago=40)
+
+        def descriptions(query):
+            response = self.client.get(f'/api/supply-chain/risks/metrics/?{query}')
+            self.assertEqual(response.status_code, 200)
+            return [row['description'] for row in response.json()]
+
+        self.assertEqual(descriptions('category=Logistics'), ['Port strike', 'Canal closure'])
+        self.assertEqual(descriptions('category=Logistics&industry=Retail'), ['Canal closure'])
+        self.assertEqual(descriptions('min_impact=5&limit=1'), ['Port strike'])
+        self.assertEqual(descriptions('category=Logistics&days=60'), ['Old news', 'Port strike', 'Canal closure'])
+
+    def test_category_summary(self):
+        self.create_report('Energy', _metrics(('Logistics', 9, ''), ('Logistics', 5, ''), ('Labor', 3, '')))
+        origin = self.create_report('Retail', _metrics(('Logistics', 6, '')))
+        # Repeats the Retail analysis: counted once
+        self.create_report('Retail', origin.risk_metrics, carried_over_from=origin)
+        self.create_report('Energy', _metrics(('Labor', 10, '')), days_ago=40)
+
+        response = self.client.get('/api/supply-chain/risks/categories/')
+        self.assertEqual(response.json(), [
+            {'category': 'Logistics', 'metric_count': 3, 'report_count': 2, 'avg_impact': 6.67, 'max_impact': 9},
+            {'category': 'Labor', 'metric_count': 1, 'report_count': 1, 'avg_impact': 3.0, 'max_impact': 3},
+        ])
+        summary = self.client.get('/api/supply-chain/risks/categories/?industry=Energy&days=60').json()
+        self.assertEqual([(row['category'], row['metric_count']) for row in summary], [('Labor', 2), ('Logistics', 2)])
+
+
+SEARCH_RESULTS = [
+    {
+        'url': f'https://news.example/{i}',
+        'title': f'Story {i}',
+        'content': ' '.join(f'disruption{i} port{j} strike shipping delay' for j in range(12)),
+    }
+    for i in range(5)
+]
+
+
+@override_settings(
+    NOVELTY_CHECK_ENABLED=True, NOVELTY_SIMILARITY_THRESHOLD=0.8, NOVELTY_MAX_AGE_DAYS=7,
+    ARTICLE_FETCH_ENABLED=False, PROVIDER_MAX_RETRIES=0,
+)
+class NoveltyGraphTest(TestCase):
+    """Near-duplicate research carries the last analysis over instead of re-running the analyst"""
+
+    def setUp(self):
+        self.visited = []
+
+        def analyst(state):
+            self.visited.append('analyst')
+            return {'risk_report': 'Fresh analysis', 'fragility_score': 4, 'critical_alerts': [], 'risk_metrics': []}
+
+        def synthesizer(state):
+            self.visited.append('synthesizer')
+            return {}
+
+        self.results = [dict(result) for result in SEARCH_RESULTS]
+        tavily = mock.Mock(**{'search.side_effect': lambda **kwargs: {'results': self.results}})
+        for target, value in (
+            ('app.agent.get_tavily', mock.Mock(return_value=tavily)),
+            ('app.agent.risk_analyst_node', analyst),
+            ('app.agent.synthesizer_node', synthesizer),
+        ):
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def previous_report(self, days_ago=1):
+        # Stored from the same search results as the run will see
+        passages = [f"Source: {r['url']}\nContent: {r['content']}" for r in SEARCH_RESULTS]
+        sources = [{'url': r['url'], 'title': r['title']} for r in SEARCH_RESULTS]
+        report = SupplyChainReport.objects.create(
+            industry='Energy', fragility_score=7, executive_summary='Previous analysis', critical_alerts=['Strike'],
+            risk_metrics=[], sources=sources,
+            fingerprint=content_fingerprint(sources, passages), minhash=minhash(sources, passages),
+        )
+        SupplyChainReport.objects.filter(pk=report.pk).update(created_at=timezone.now() - timezone.timedelta(days=days_ago))
+        return report
+
+    def run_graph(self):
+        # One story changed slightly: not identical, but nearly the same news
+        self.results[0]['content'] += ' rerouted'
+        return build_workflow().compile().invoke({'industry': 'Energy'})
+
+    def test_near_duplicate_is_carried_over(self):
+        previous = self.previous_report()
+        state = self.run_graph()
+        self.assertEqual(self.visited, [])
+        self.assertEqual(state['carried_over_from'], previous.id)
+        self.assertEqual(state['risk_report'], 'Previous analysis')
+        self.assertEqual(state['novelty']['outcome'], 'carried_over')
+        # Matched on similarity, not on the exact fingerprint
+        self.assertNotEqual(state['fingerprint'], previous.fingerprint)
+        self.assertGreaterEqual(state['novelty']['similarity'], 0.8)
+
+    def test_carry_over_points_at_the_analysed_report(self):
+        origin = self.previous_report(days_ago=2)
+        SupplyChainReport.objects.create(
+            industry='Energy', fragility_score=7, executive_summary='Previous analysis', critical_alerts=[],
+            risk_metrics=[], fingerprint=origin.fingerprint, minhash=origin.minhash, carried_over_from=origin,
+        )
+        self.assertEqual(self.run_graph()['carried_over_from'], origin.id)
+
+    def test_old_report_is_not_carried_over(self):
+        self.previous_report(days_ago=8)
+        state = self.run_graph()
+        self.assertEqual(self.visited, ['analyst', 'synthesizer'])
+        self.assertIsNone(state['carried_over_from'])
+        self.assertEqual(state['novelty']['outcome'], 'expired')
+        self.assertEqual(state['risk_report'], 'Fresh analysis')
+
+    def test_check_disabled(self):
+        self.previous_report()
+        with override_settings(NOVELTY_CHECK_ENABLED=False):
+            state = self.run_graph()
+        self.assertEqual(self.visited, ['analyst', 'synthesizer'])
+        self.assertIsNone(state['carried_over_from'])
+        self.assertFalse(state.get('novelty'))
+        # Still fingerprinted, so the next run can compare against it
+        self.assertEqual(len(state['minhash']), 128)
+
+
+@override_settings(ANALYST_MODEL_CASCADE=[
+    {'model': 'small', 'max_input_chars': 8000},
+    {'model': 'large', 'max_input_chars': None},
+])
+class PrewarmTest(SimpleTestCase):
+    """Per-process agent objects are built once, ahead of the first task"""
+
+    def test_structured_llm_is_cached(self):
+        get_structured_llm.cache_clear()
+        self.addCleanup(get_structured_llm.cache_clear)
+        llms = {'small': mock.Mock(), 'large': mock.Mock()}
+        with mock.patch('app.agent.get_llm', side_effect=llms.get) as get_llm:
+            first = get_structured_llm('small')
+            self.assertIs(get_structured_llm('small'), first)
+            self.assertIsNot(get_structured_llm('large'), first)
+        self.assertEqual(get_llm.call_args_list, [mock.call('small'), mock.call('large')])
+        self.assertIs(first, llms['small'].with_structured_output.return_value)
+        llms['small'].with_structured_output.assert_called_once_with(AnalystOutput, include_raw=True)
+
+    def test_steps_run_and_survive_failures(self):
+        patches = {
+            'app.agent.get_tavily': mock.Mock(side_effect=RuntimeError('no key')),
+            'app.agent.get_structured_llm': mock.Mock(),
+            'app.agent.get_supply_chain_app': mock.Mock(),
+            'app.state_store.get_state_store': mock.Mock(),
+            'app.http_transport.warm_up': mock.Mock(),
+        }
+        for target, value in patches.items():
+            patcher = mock.patch(target, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+        with self.assertLogs('app.prewarm', 'WARNING'):
+            timings = prewarm(db=False, connections=True)
+        self.assertIsNone(timings['tavily_client'])
+        for step in ('analyst:small', 'analyst:large', 'graph', 'state_store', 'connections'):
+            self.assertIsInstance(timings[step], float, step)
+        self.assertEqual(patches['app.agent.get_structured_llm'].call_args_list, [mock.call('small'), mock.call('large')])
+        patches['app.agent.get_supply_chain_app'].assert_called_once_with()
+        patches['app.http_transport.warm_up'].assert_called_once_with()
+
+        patches['app.http_transport.warm_up'].reset_mock()
+        self.assertNotIn('connections', prewarm(db=False, connections=False))
+        patches['app.http_transport.warm_up'].assert_not_called()
+
+
+@override_settings(TASK_STATE_STORE='memory')
+class TaskDeltaTest(TestCase):
+    """Task list deltas: cursors, resets and tasks moving through a status filter"""
+
+    URL = '/api/supply-chain/research/requests/'
+
+    def setUp(self):
+        self.store = get_state_store()
+        self.addCleanup(self.store.clear)
+        self.redis = _FakeRedis()
+        patcher = mock.patch('app.retention.get_redis', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def create_task(self, status='PENDING', seconds_ago=60):
+        task = TaskStatus.objects.create(task_id=uuid.uuid4(), industry='Energy', status=status)
+        TaskStatus.objects.filter(pk=task.pk).update(updated_at=timezone.now() - timezone.timedelta(seconds=seconds_ago))
+        return str(task.task_id)
+
+    def poll(self, since, **params):
+        query = '&'.join(f'{key}={value}' for key, value in {**params, 'since': since}.items())
+        response = self.client.get(f'{self.URL}?{query}')
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def ids(self, delta):
+        return {task['task_id'] for task in delta['tasks']}
+
+    def test_first_poll_is_a_reset(self):
+        task = self.create_task()
+        delta = self.poll(0)
+        self.assertTrue(delta['reset'])
+        self.assertEqual(self.ids(delta), {task})
+        # The cursor overlaps the last CURSOR_OVERLAP_SECONDS, so late commits are not lost
+        self.assertAlmostEqual(float(delta['cursor']), time.time() - 5, delta=1)
+
+    def test_only_changes_after_the_cursor(self):
+        changed = self.create_task(seconds_ago=7)
+        self.create_task(seconds_ago=60)
+        delta = self.poll(f'{time.time() - 10:.6f}')
+        self.assertFalse(delta['reset'])
+        self.assertEqual(self.ids(delta), {changed})
+        # Polling again with the returned cursor re-sends changes inside the overlap only
+        self.assertEqual(self.ids(self.poll(delta['cursor'])), set())
+
+    def test_reset_when_more_changed_than_the_limit(self):
+        tasks = [self.create_task(seconds_ago=1) for _ in range(3)]
+        delta = self.poll(f'{time.time() - 10:.6f}', limit=2)
+        self.assertTrue(delta['reset'])
+        self.assertEqual(self.ids(delta), set(tasks[1:]))
+
+    def test_live_state_changes(self):
+        task = self.create_task(seconds_ago=600)
+        since = f'{time.time() - 10:.6f}'
+        self.assertEqual(self.poll(since)['tasks'], [])
+        self.store.set(task, status='PROCESSING', progress=40)
+        row, = self.poll(since)['tasks']
+        self.assertEqual((row['task_id'], row['status'], row['progress']), (task, 'PROCESSING', 40))
+
+    def test_tasks_entering_and_leaving_a_filter(self):
+        entering = self.create_task('PENDING', seconds_ago=600)
+        leaving = self.create_task('PROCESSING', seconds_ago=600)
+        self.store.set(entering, status='PROCESSING', progress=10)
+        self.assertEqual(self.ids(self.poll(0, status='PROCESSING')), {entering, leaving})
+
+        since = f'{time.time() - 10:.6f}'
+        TaskStatus.objects.filter(task_id=leaving).update(status='COMPLETED', updated_at=timezone.now())
+        # Both come back whatever their status: the client adds one and drops the other
+        statuses = {task['task_id']: task['status'] for task in self.poll(since, status='PROCESSING')['tasks']}
+        self.assertEqual(statuses, {entering: 'PROCESSING', leaving: 'COMPLETED'})
+
+    def test_reset_after_tasks_were_pruned(self):
+        task = self.create_task(seconds_ago=600)
+        since = time.time() - 10
+        self.redis.set(TASKS_PRUNED_KEY, since - 60)
+        self.assertFalse(self.poll(f'{since:.6f}')['reset'])
+        # Deleted tasks never appear as changes, so the client gets the full list
+        self.redis.set(TASKS_PRUNED_KEY, since + 1)
+        delta = self.poll(f'{since:.6f}')
+        self.assertTrue(delta['reset'])
+        self.assertEqual(self.ids(delta), {task})
+        with mock.patch('app.retention.get_redis', side_effect=redis.ConnectionError):
+            self.assertTrue(self.poll(f'{since:.6f}')['reset'])
+
+    def test_invalid_cursor(self):
+        self.assertEqual(self.client.get(f'{self.URL}?since=yesterday').status_code, 400)
@@ -1,3 +1,8 @@
-from django.shortcuts import render
+from django.http import HttpResponse
 
-# Create your views here.
+from .metrics import CONTENT_TYPE_LATEST, render_latest
+
+
+def metrics_view(request):
+    """Prometheus exposition endpoint for the web process and queue health"""
+    return HttpResponse(render_latest(), content_type=CONTENT_TYPE_LATEST)
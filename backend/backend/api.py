@@ -2,6 +2,7 @@
 from ninja import NinjaAPI
 from app.api import router as supply_chain_router
 from app.auth_api import router as auth_router
+from app.admission import AdmissionRejected
 
 api = NinjaAPI(
     title="Supply Chain Intelligence API",
@@ -13,4 +14,15 @@ api = NinjaAPI(
 api.add_router("/supply-chain", supply_chain_router)
 
 # Auth routes
-api.add_router("/auth", auth_router)
\ No newline at end of file
+api.add_router("/auth", auth_router)
+
+
+@api.exception_handler(AdmissionRejected)
+def admission_rejected(request, exc):
+    response = api.create_response(
+        request,
+        {"detail": exc.detail, "reason": exc.reason, "retry_after": exc.retry_after},
+        status=429
+    )
+    response["Retry-After"] = str(exc.retry_after)
+    return response
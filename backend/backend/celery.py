@@ -1,6 +1,7 @@
 # celery.py
 import os
 from celery import Celery
+from celery.signals import task_postrun, task_prerun, worker_init, worker_process_init, worker_process_shutdown
 
 # Set the default Django settings module for the 'celery' program.
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
@@ -17,4 +18,75 @@ app.autodiscover_tasks()
 
 @app.task(bind=True, ignore_result=True)
 def debug_task(self):
-    print(f'Request: {self.request!r}')
\ No newline at end of file
+    print(f'Request: {self.request!r}')
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    """Expose worker metrics over HTTP when CELERY_METRICS_PORT is set"""
+    from django.conf import settings
+    if settings.CELERY_METRICS_PORT:
+        from app.metrics import start_worker_metrics_server
+        start_worker_metrics_server(settings.CELERY_METRICS_PORT)
+
+
+def _forks_children(worker):
+    """True for the prefork pool, whose tasks run in forked child processes"""
+    from celery.concurrency import get_implementation
+    return get_implementation(worker.pool_cls).__module__.endswith('prefork')
+
+
+@worker_init.connect
+def prewarm_worker(sender=None, **kwargs):
+    """
+    Prewarm before the first task. Prefork parents only import the agent stack
+    (children inherit it, sockets would not survive the fork); thread/solo pools
+    run tasks in this process, so everything is built here. Those pools never
+    fire worker_process_init, so connection warm-up without prewarm happens here too.
+    """
+    from django.conf import settings
+    forks = sender is not None and _forks_children(sender)
+    if settings.WORKER_PREWARM_ENABLED:
+        if forks:
+            from app.prewarm import preload_modules
+            preload_modules()
+        else:
+            from app.prewarm import prewarm
+            prewarm(db=False)
+    elif settings.HTTP_WARMUP_ENABLED and not forks:
+        from app.http_transport import warm_up
+        warm_up()
+
+
+@worker_process_init.connect
+def prewarm_worker_process(**kwargs):
+    """Build clients, graph and connections in each new prefork child"""
+    from django.conf import settings
+    if settings.WORKER_PREWARM_ENABLED:
+        from app.prewarm import prewarm
+        prewarm()
+    elif settings.HTTP_WARMUP_ENABLED:
+        from app.http_transport import warm_up
+        warm_up()
+
+
+@task_prerun.connect
+def start_query_stats(task_id=None, **kwargs):
+    """Count the SQL queries of each task (see app/query_stats.py)"""
+    from django.conf import settings
+    if settings.QUERY_STATS_ENABLED:
+        from app.query_stats import start_task
+        start_task(task_id)
+
+
+@task_postrun.connect
+def finish_query_stats(task_id=None, task=None, **kwargs):
+    from django.conf import settings
+    if settings.QUERY_STATS_ENABLED:
+        from app.query_stats import finish_task
+        finish_task(task_id, task.name if task else 'unknown')
+
+
+@worker_process_shutdown.connect
+def cleanup_metrics(pid=None, **kwargs):
+    from app.metrics import mark_process_dead
+    mark_process_dead(pid)
@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 import os
+import json
 import dj_database_url
 from pathlib import Path
 
@@ -55,6 +56,7 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'app.query_stats.QueryStatsMiddleware',  # Outermost app middleware so auth/session queries count too
     'corsheaders.middleware.CorsMiddleware',  # CORS middleware (must be before CommonMiddleware)
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -90,11 +92,33 @@ WSGI_APPLICATION = 'backend.wsgi.application'
 DATABASES = {
     'default': dj_database_url.config(
         default=os.environ.get('DATABASE_URL', f"sqlite:///{BASE_DIR / 'db.sqlite3'}"),
-        conn_max_age=600,
+        # Set DB_CONN_MAX_AGE=0 when serving over ASGI: async views run ORM calls
+        # in worker threads, so persistent connections are not reused reliably.
+        conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600')),
         conn_health_checks=True,
     )
 }
 
+# Read replicas (see app/db_router.py): comma-separated database URLs. Read-only
+# dashboard endpoints read from them; writes and everything else use 'default'.
+# Locally, two SQLite files work too (migrate the replica with --database replica0).
+DATABASE_REPLICA_URLS = [url.strip() for url in os.environ.get('DATABASE_REPLICA_URLS', '').split(',') if url.strip()]
+DATABASE_REPLICAS = []
+for _index, _url in enumerate(DATABASE_REPLICA_URLS):
+    DATABASES[f'replica{_index}'] = {
+        **dj_database_url.parse(
+            _url,
+            conn_max_age=int(os.environ.get('DB_CONN_MAX_AGE', '600')),
+            conn_health_checks=True,
+        ),
+        # Tests read the test 'default' database through the replica aliases
+        'TEST': {'MIRROR': 'default'},
+    }
+    DATABASE_REPLICAS.append(f'replica{_index}')
+DATABASE_ROUTERS = ['app.db_router.ReplicaRouter']
+# After a submit or cancel, the client's reads stay on the primary this long (read-your-writes)
+DATABASE_REPLICA_STICKY_SECONDS = int(os.environ.get('DATABASE_REPLICA_STICKY_SECONDS', '10'))
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -134,7 +158,6 @@ STATIC_URL = 'static/'
 
 # Celery Configuration
 CELERY_BROKER_URL = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
-CELERY_RESULT_BACKEND = os.environ.get('REDIS_URL', 'redis://localhost:6379/0')
 CELERY_ACCEPT_CONTENT = ['json']
 CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
@@ -147,8 +170,195 @@ CELERY_TASK_ACKS_LATE = True
 CELERY_WORKER_PREFETCH_MULTIPLIER = 1
 CELERY_TASK_REJECT_ON_WORKER_LOST = True
 
+# Research runs go to their own queue so they can be served by the I/O-optimized
+# worker profile (threads pool, see docker-compose.yml) instead of prefork.
+RESEARCH_QUEUE = os.environ.get('RESEARCH_QUEUE', 'research')
+CELERY_TASK_ROUTES = {
+    'app.tasks.run_research_task': {'queue': RESEARCH_QUEUE},
+}
+# Close the task's DB connection while the agent graph waits on Tavily/Gemini,
+# so a threads-pool worker with dozens of runs doesn't hold dozens of idle connections
+RESEARCH_RELEASE_DB_DURING_RUN = os.environ.get('RESEARCH_RELEASE_DB_DURING_RUN', 'True').lower() == 'true'
+
 # Celery Result Backend
-CELERY_RESULT_BACKEND = 'django-db'
+# TaskStatus is the durable record of research runs, so Celery results are only
+# kept briefly in Redis (with a TTL) instead of as django_celery_results rows.
+CELERY_RESULT_BACKEND = os.environ.get('CELERY_RESULT_BACKEND', CELERY_BROKER_URL)
+CELERY_RESULT_EXPIRES = int(os.environ.get('CELERY_RESULT_EXPIRES', '3600'))
+CELERY_RESULT_EXTENDED = False
+
+# Result policy: 'ignore' stores no result for fire-and-forget tasks,
+# 'store' keeps their compact result dicts for CELERY_RESULT_EXPIRES seconds.
+CELERY_RESULT_POLICY = os.environ.get('CELERY_RESULT_POLICY', 'ignore')
+FIRE_AND_FORGET_TASKS = [
+    'app.tasks.run_research_task',
+    'app.tasks.setup_scheduled_research',
+]
+CELERY_TASK_ANNOTATIONS = {
+    task_name: {'ignore_result': CELERY_RESULT_POLICY == 'ignore'}
+    for task_name in FIRE_AND_FORGET_TASKS
+}
+
+# Legacy django_celery_results rows older than this are removed by cleanup_celery_results
+CELERY_DB_RESULT_RETENTION_DAYS = int(os.environ.get('CELERY_DB_RESULT_RETENTION_DAYS', '7'))
+
+# Retention (see app/retention.py), applied daily by apply_retention_policies; 0 disables a policy
+# FAILED/CANCELLED tasks (and their profiles) are deleted this many days after their last update
+RETENTION_FAILED_TASK_DAYS = int(os.environ.get('RETENTION_FAILED_TASK_DAYS', '30'))
+# Reports older than this keep their summary in the database, the rest moves to gzip files
+RETENTION_REPORT_ARCHIVE_DAYS = int(os.environ.get('RETENTION_REPORT_ARCHIVE_DAYS', '0'))
+RETENTION_ARCHIVE_DIR = os.environ.get('RETENTION_ARCHIVE_DIR', str(BASE_DIR / 'archive'))
+# Deletes/updates run in batches of this size with a pause in between, so they never hold long locks
+RETENTION_BATCH_SIZE = int(os.environ.get('RETENTION_BATCH_SIZE', '1000'))
+RETENTION_BATCH_PAUSE_SECONDS = float(os.environ.get('RETENTION_BATCH_PAUSE_SECONDS', '0.05'))
+# Monthly partitions created ahead of time for partitioned history tables (Postgres, see partition_history)
+RETENTION_PARTITION_MONTHS_AHEAD = int(os.environ.get('RETENTION_PARTITION_MONTHS_AHEAD', '3'))
+
+# Live task state (see app/state_store.py)
+# 'redis' in every deployment; 'memory' is a process-local stand-in for tests
+TASK_STATE_STORE = os.environ.get('TASK_STATE_STORE', 'redis')
+TASK_STATE_REDIS_URL = os.environ.get('TASK_STATE_REDIS_URL', CELERY_BROKER_URL)
+TASK_STATE_TTL = int(os.environ.get('TASK_STATE_TTL', str(60 * 60 * 24)))
+# How often sync_task_state flushes live state to TaskStatus
+TASK_STATE_FLUSH_INTERVAL = int(os.environ.get('TASK_STATE_FLUSH_INTERVAL', '30'))
+# Live state older than this is treated as a crashed worker and reconciled to FAILED
+TASK_STATE_STALE_SECONDS = int(os.environ.get('TASK_STATE_STALE_SECONDS', str(60 * 15)))
+
+# Metrics
+# Queues reported by the /metrics queue depth gauge
+METRICS_CELERY_QUEUES = os.environ.get('METRICS_CELERY_QUEUES', f'celery,{RESEARCH_QUEUE}').split(',')
+# Port for the Celery worker's own metrics endpoint (0 disables it)
+CELERY_METRICS_PORT = int(os.environ.get('CELERY_METRICS_PORT', '0'))
+# Per-request/per-task SQL query stats (see app/query_stats.py): X-DB-Query-* response
+# headers, metrics and a warning with the slowest statements when over budget.
+# On by default in DEBUG; enable it in staging.
+QUERY_STATS_ENABLED = os.environ.get('QUERY_STATS_ENABLED', str(DEBUG)).lower() == 'true'
+QUERY_BUDGET_REQUEST = int(os.environ.get('QUERY_BUDGET_REQUEST', '20'))
+QUERY_BUDGET_TASK = int(os.environ.get('QUERY_BUDGET_TASK', '100'))
+QUERY_TIME_BUDGET_MS = float(os.environ.get('QUERY_TIME_BUDGET_MS', '500'))
+# Slowest statements kept for the over-budget log
+QUERY_STATS_SLOWEST = int(os.environ.get('QUERY_STATS_SLOWEST', '3'))
+
+# Outbound provider calls (Tavily, Gemini)
+PROVIDER_MAX_RETRIES = int(os.environ.get('PROVIDER_MAX_RETRIES', '2'))
+PROVIDER_RETRY_BACKOFF = float(os.environ.get('PROVIDER_RETRY_BACKOFF', '1.0'))
+# Max concurrent requests per provider in one worker process (app/providers.py)
+PROVIDER_CONCURRENCY = {
+    'tavily': int(os.environ.get('TAVILY_CONCURRENCY', '8')),
+    'gemini': int(os.environ.get('GEMINI_CONCURRENCY', '16')),
+}
+# Calls that run under a timeout or are hedged use one executor per provider
+# (app/providers.py), sized to its PROVIDER_CONCURRENCY; this many threads for
+# providers without a limit
+PROVIDER_CALL_THREADS = int(os.environ.get('PROVIDER_CALL_THREADS', '32'))
+# SDK-level request timeouts; these bound calls abandoned after a deadline or hedge
+TAVILY_REQUEST_TIMEOUT = int(os.environ.get('TAVILY_REQUEST_TIMEOUT', '60'))
+GEMINI_REQUEST_TIMEOUT = int(os.environ.get('GEMINI_REQUEST_TIMEOUT', '120'))
+
+# Shared pooled HTTP transport for Tavily and Gemini (app/http_transport.py)
+# 'rest' sends Gemini calls through the shared pool; 'grpc' uses its own HTTP/2 channel
+GEMINI_TRANSPORT = os.environ.get('GEMINI_TRANSPORT', 'rest')
+HTTP_POOL_CONNECTIONS = int(os.environ.get('HTTP_POOL_CONNECTIONS', '10'))  # hosts kept
+HTTP_POOL_MAXSIZE = int(os.environ.get('HTTP_POOL_MAXSIZE', '32'))  # connections per host
+HTTP_POOL_BLOCK = os.environ.get('HTTP_POOL_BLOCK', 'False').lower() == 'true'
+HTTP_KEEPALIVE_IDLE = int(os.environ.get('HTTP_KEEPALIVE_IDLE', '60'))
+HTTP_WARMUP_ENABLED = os.environ.get('HTTP_WARMUP_ENABLED', 'True').lower() == 'true'
+HTTP_WARMUP_URLS = [
+    'https://api.tavily.com/',
+    'https://generativelanguage.googleapis.com/',
+]
+HTTP_WARMUP_TIMEOUT = float(os.environ.get('HTTP_WARMUP_TIMEOUT', '5'))
+# Build agent clients, analyst wrappers and the compiled graph when a worker
+# process starts rather than in its first task (app/prewarm.py)
+WORKER_PREWARM_ENABLED = os.environ.get('WORKER_PREWARM_ENABLED', 'True').lower() == 'true'
+
+# End-to-end deadline per research run, by task_type (see app/deadline.py)
+RESEARCH_DEADLINE_SECONDS = {
+    'MANUAL': int(os.environ.get('RESEARCH_DEADLINE_MANUAL', '120')),
+    'DEFAULT': int(os.environ.get('RESEARCH_DEADLINE_DEFAULT', '600')),
+}
+# How the remaining deadline is split between nodes with outbound calls, in graph order
+NODE_BUDGET_SHARES = {
+    'researcher_node': 0.3,
+    'article_fetcher_node': 0.15,
+    'risk_analyst_node': 0.7,
+}
+# Task types whose provider calls are hedged once they pass the recent p95 latency
+HEDGE_TASK_TYPES = os.environ.get('HEDGE_TASK_TYPES', 'MANUAL').split(',')
+# Countdown before a failed research run is retried
+RESEARCH_RETRY_COUNTDOWN = int(os.environ.get('RESEARCH_RETRY_COUNTDOWN', '60'))
+
+# Scheduled research (see app/scheduling.py)
+SCHEDULED_RESEARCH_INDUSTRIES = os.environ.get(
+    'SCHEDULED_RESEARCH_INDUSTRIES',
+    'Automotive,Technology,Healthcare,Manufacturing,Energy,Pharmaceuticals,Semiconductors'
+).split(',')
+# The daily dispatch spreads industries over this many seconds (deterministic offsets)
+SCHEDULED_RESEARCH_WINDOW = int(os.environ.get('SCHEDULED_RESEARCH_WINDOW', str(2 * 60 * 60)))
+# At most this many scheduled runs at once (0 = no cap); others wait DEFER_SECONDS and try again
+SCHEDULED_RESEARCH_MAX_CONCURRENT = int(os.environ.get('SCHEDULED_RESEARCH_MAX_CONCURRENT', '3'))
+SCHEDULED_RESEARCH_DEFER_SECONDS = int(os.environ.get('SCHEDULED_RESEARCH_DEFER_SECONDS', '120'))
+# Countdown tasks are held unacknowledged by a worker; with the Redis broker they are
+# redelivered after visibility_timeout, so it must outlast the dispatch window
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'visibility_timeout': max(60 * 60, SCHEDULED_RESEARCH_WINDOW + 60 * 60),
+}
+
+# Admission control for research submissions (see app/admission.py)
+ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', 'True').lower() == 'true'
+# Reject new runs while this many are waiting in RESEARCH_QUEUE / running
+ADMISSION_MAX_QUEUE_DEPTH = int(os.environ.get('ADMISSION_MAX_QUEUE_DEPTH', '100'))
+ADMISSION_MAX_IN_FLIGHT = int(os.environ.get('ADMISSION_MAX_IN_FLIGHT', '200'))
+# Submissions per user (or client IP when anonymous) per window
+ADMISSION_USER_RATE = int(os.environ.get('ADMISSION_USER_RATE', '10'))
+ADMISSION_USER_RATE_WINDOW = int(os.environ.get('ADMISSION_USER_RATE_WINDOW', '60'))
+# Research runs served concurrently (sum of research worker concurrency), for wait estimates
+ADMISSION_WORKER_SLOTS = int(os.environ.get('ADMISSION_WORKER_SLOTS', os.environ.get('RESEARCH_WORKER_CONCURRENCY', '32')))
+# Run duration assumed until there are completed runs to average
+ADMISSION_DEFAULT_RUN_SECONDS = float(os.environ.get('ADMISSION_DEFAULT_RUN_SECONDS', '60'))
+
+# Profiling
+# Fraction of research tasks profiled even without an explicit profile=true request
+RESEARCH_PROFILE_SAMPLE_RATE = float(os.environ.get('RESEARCH_PROFILE_SAMPLE_RATE', '0'))
+
+# Analyst model cascade (see route_analyst_model in app/agent.py)
+# Inputs start on the first tier whose max_input_chars fits (None = no limit);
+# a structured-output parse failure escalates to the next tier.
+ANALYST_MODEL_CASCADE = json.loads(os.environ.get('ANALYST_MODEL_CASCADE', 'null')) or [
+    {'model': 'gemini-2.5-flash-lite', 'max_input_chars': 8000},
+    {'model': 'gemini-2.5-flash', 'max_input_chars': 60000},
+    {'model': 'gemini-2.5-pro', 'max_input_chars': None},
+]
+# Research with this many sources or fewer always starts on the first tier (map-reduce chunks excepted)
+ANALYST_LOW_SIGNAL_SOURCES = int(os.environ.get('ANALYST_LOW_SIGNAL_SOURCES', '2'))
+# Above this many characters of research, sources are analysed in parallel chunks
+# of about ANALYST_CHUNK_CHARS and the partial analyses merged (map-reduce)
+ANALYST_MAP_REDUCE_THRESHOLD_CHARS = int(os.environ.get('ANALYST_MAP_REDUCE_THRESHOLD_CHARS', '60000'))
+ANALYST_CHUNK_CHARS = int(os.environ.get('ANALYST_CHUNK_CHARS', '20000'))
+ANALYST_MAP_CONCURRENCY = int(os.environ.get('ANALYST_MAP_CONCURRENCY', '8'))
+
+# Full-article fetching (optional graph stage, see app/articles.py)
+# Replaces Tavily's snippets with the extracted article text; fetched articles are
+# stored compressed in the database and never downloaded again.
+ARTICLE_FETCH_ENABLED = os.environ.get('ARTICLE_FETCH_ENABLED', 'False').lower() == 'true'
+ARTICLE_FETCH_CONCURRENCY = int(os.environ.get('ARTICLE_FETCH_CONCURRENCY', '8'))
+ARTICLE_FETCH_PER_HOST = int(os.environ.get('ARTICLE_FETCH_PER_HOST', '2'))
+ARTICLE_FETCH_TIMEOUT = float(os.environ.get('ARTICLE_FETCH_TIMEOUT', '10'))  # per request
+ARTICLE_MAX_BYTES = int(os.environ.get('ARTICLE_MAX_BYTES', str(2 * 1024 * 1024)))
+# Characters of each article passed to the analyst
+ARTICLE_MAX_CHARS = int(os.environ.get('ARTICLE_MAX_CHARS', '20000'))
+if not ARTICLE_FETCH_ENABLED:
+    # The stage is left out of the graph, so its deadline share goes to the other nodes
+    NODE_BUDGET_SHARES.pop('article_fetcher_node')
+
+# Novelty check (see app/fingerprint.py and novelty_node in app/agent.py)
+# When a run's research is this similar (estimated Jaccard of MinHash sketches) to
+# the industry's last report, the analyst is skipped and that analysis carried over.
+NOVELTY_CHECK_ENABLED = os.environ.get('NOVELTY_CHECK_ENABLED', 'True').lower() == 'true'
+NOVELTY_SIMILARITY_THRESHOLD = float(os.environ.get('NOVELTY_SIMILARITY_THRESHOLD', '0.9'))
+# An analysis is carried over for at most this many days before a fresh one is forced
+NOVELTY_MAX_AGE_DAYS = int(os.environ.get('NOVELTY_MAX_AGE_DAYS', '7'))
+MINHASH_PERMUTATIONS = int(os.environ.get('MINHASH_PERMUTATIONS', '128'))
 
 # API Keys
 TAVILY_API_KEY = os.environ.get("TAVILY_API_KEY", "")
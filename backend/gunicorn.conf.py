@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+# Production ASGI serving: gunicorn manages multiple uvicorn worker processes,
+# each running backend.asgi:application on an event loop.
+#
+#   gunicorn backend.asgi:application -c gunicorn.conf.py
+import multiprocessing
+import os
+
+bind = os.environ.get('GUNICORN_BIND', '0.0.0.0:8000')
+workers = int(os.environ.get('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+worker_class = 'uvicorn_worker.UvicornWorker'
+
+# Long-poll status requests hold a connection, not a thread, so keep-alive can be generous
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', '30'))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.environ.get('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+
+# Recycle workers periodically to bound memory growth
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', '5000'))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', '500'))
+
+accesslog = '-'
+errorlog = '-'
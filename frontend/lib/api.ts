@@ -1,6 +1,6 @@
 // API utilities for Supply Chain Intelligence Dashboard
 
-import { Report, TaskStatus, ResearchRequest } from './types';
+import { Report, TaskStatus, TaskDelta, ResearchRequest } from './types';
 import { getAuthToken } from './auth-context';
 
 // Use the backend URL directly
@@ -47,6 +47,28 @@ async function fetchApi<T>(endpoint: string, options?: RequestInit): Promise<T>
   }
 }
 
+// Task lists kept between polls, keyed by filter; listTasks only fetches what changed
+const taskLists = new Map<string, { cursor: string; tasks: TaskStatus[] }>();
+
+function mergeTaskDelta(
+  previous: TaskStatus[],
+  delta: TaskDelta,
+  status: string | undefined,
+  limit: number
+): TaskStatus[] {
+  if (delta.reset) return delta.tasks;
+
+  const byId = new Map(previous.map(task => [task.task_id, task]));
+  for (const task of delta.tasks) {
+    // Changes come regardless of the filter: drop tasks that left it
+    if (status && task.status !== status) byId.delete(task.task_id);
+    else byId.set(task.task_id, task);
+  }
+  return Array.from(byId.values())
+    .sort((a, b) => b.created_at.localeCompare(a.created_at))
+    .slice(0, limit);
+}
+
 // Research API endpoints
 export const api = {
   // Submit a new research request
@@ -64,14 +86,27 @@ export const api = {
   getTaskReport: (taskId: string): Promise<Report> =>
     fetchApi(`/api/supply-chain/research/requests/${taskId}/report`),
 
-  // List all tasks with optional filtering
-  listTasks: (params?: { status?: string; limit?: number }): Promise<TaskStatus[]> => {
+  // List all tasks with optional filtering. Repeated calls with the same filter
+  // only download the tasks changed since the previous call.
+  listTasks: async (params?: { status?: string; limit?: number }): Promise<TaskStatus[]> => {
+    const limit = params?.limit ?? 50;
+    const key = `${params?.status ?? ''}|${limit}`;
+    const cached = taskLists.get(key);
+
     const queryParams = new URLSearchParams();
     if (params?.status) queryParams.append('status', params.status);
-    if (params?.limit) queryParams.append('limit', params.limit.toString());
-    
-    const query = queryParams.toString();
-    return fetchApi(`/api/supply-chain/research/requests/${query ? `?${query}` : ''}`);
+    queryParams.append('limit', limit.toString());
+    queryParams.append('since', cached?.cursor ?? '0');
+
+    const delta = await fetchApi<TaskDelta>(`/api/supply-chain/research/requests/?${queryParams}`);
+    const tasks = mergeTaskDelta(cached?.tasks ?? [], delta, params?.status, limit);
+    if (!delta.reset && tasks.length < limit && (cached?.tasks.length ?? 0) >= limit) {
+      // A task left a full list; older ones may now belong in it, so resync next time
+      taskLists.delete(key);
+    } else {
+      taskLists.set(key, { cursor: delta.cursor, tasks });
+    }
+    return tasks;
   },
 
   // Cancel a task
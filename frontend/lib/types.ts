@@ -21,6 +21,9 @@ export interface Report {
   sources: Source[];
   created_at: string;
   task_id?: string;
+  carried_over?: boolean;
+  carried_over_from?: number | null;
+  archived?: boolean; // sources moved to the retention archive
 }
 
 export interface TaskStatus {
@@ -36,6 +39,13 @@ export interface TaskStatus {
   duration?: number;
 }
 
+// Response of listTasks with a `since` cursor
+export interface TaskDelta {
+  tasks: TaskStatus[];
+  cursor: string;
+  reset: boolean; // true when `tasks` is the complete list
+}
+
 export interface ResearchRequest {
   industry: string;
 }